@@ -5,9 +5,28 @@ import tkinter as tk
 from tkinter import messagebox
 import sqlite3
 from config import COLORS
+from db import get_conn, transaction
 from widgets import WeChatButton
+from worker import run_async
 from dialogs import center_window  # 确保正确导入
 
+def _check_login(user, password):
+    c = get_conn().cursor()
+    c.execute("SELECT id FROM user WHERE user=? AND password=?", (user, password))
+    row = c.fetchone()
+    return row[0] if row else None
+
+
+def _register(user, password):
+    """注册用户，用户名已存在时返回 False"""
+    try:
+        with transaction() as c:
+            c.execute("INSERT INTO user (user, password) VALUES (?,?)", (user, password))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+
 def show_login_page(parent, on_login_success):
     """显示登录页面"""
     frame = tk.Frame(parent, bg=COLORS['bg'])
@@ -33,15 +52,16 @@ def show_login_page(parent, on_login_success):
     def do_login():
         user = entry_user.get().strip()
         password = entry_pass.get()
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT id FROM user WHERE user=? AND password=?", (user, password))
-        row = c.fetchone()
-        conn.close()
-        if row:
-            on_login_success(row[0])
-        else:
-            messagebox.showerror("错误", "用户名或密码错误", parent=parent)
+
+        def done(user_id):
+            if user_id:
+                on_login_success(user_id)
+            else:
+                messagebox.showerror("错误", "用户名或密码错误", parent=parent)
+
+        # 在数据库线程中排在启动时的数据库初始化之后执行，初始化未完成时点登录也不会查到半成品的库
+        run_async(_check_login, user, password, on_done=done,
+                  on_error=lambda e: messagebox.showerror("错误", f"登录失败: {e}", parent=parent), key='login')
 
     def show_register():
         show_register_dialog(parent)
@@ -94,15 +114,14 @@ def show_register_dialog(parent):
         if len(p) < 6 or len(p) > 20 or not any(c.isdigit() for c in p) or not any(c.isalpha() for c in p):
             messagebox.showerror("错误", "密码6-20位含字母数字", parent=win)
             return
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        try:
-            c.execute("INSERT INTO user (user, password) VALUES (?,?)", (u, p))
-            conn.commit()
-            messagebox.showinfo("成功", "注册成功", parent=win)
-            win.destroy()
-        except sqlite3.IntegrityError:
-            messagebox.showerror("错误", "用户名已存在", parent=win)
-        conn.close()
+        def done(ok):
+            if ok:
+                messagebox.showinfo("成功", "注册成功", parent=win)
+                win.destroy()
+            else:
+                messagebox.showerror("错误", "用户名已存在", parent=win)
+
+        run_async(_register, u, p, on_done=done,
+                  on_error=lambda e: messagebox.showerror("错误", f"注册失败: {e}", parent=win))
 
     WeChatButton(card, text="注册", width=15, command=reg).grid(row=3,column=0,columnspan=2,pady=20)
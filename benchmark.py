@@ -0,0 +1,319 @@
+# benchmark.py
+"""性能测试模块 - 生成指定规模的模拟数据，并对各页面背后的查询计时，输出 JSON 报告便于不同版本对比
+
+全部在命令行运行，不需要图形界面：
+    python manage.py --db bench.db gen --rooms 10000
+    python manage.py bench --sizes 1000,10000,100000 --output report.json
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import datetime
+import platform
+import statistics
+import tempfile
+import contextlib
+import subprocess
+
+import db
+import queries
+from database import init_db, regroup_renters, update_all_costs
+from payments import PAY_MONTHS, add_months
+
+SURNAMES = "王李张刘陈杨黄赵吴周徐孙马朱胡郭何高林罗"
+GIVEN = "伟芳娜敏静丽强磊军洋勇艳杰娟涛明超秀霞平刚桂英华"
+FURNITURE = ("床", "衣柜", "书桌", "椅子", "空调", "冰箱", "洗衣机", "热水器", "沙发", "电视")
+CHUNK = 5000
+
+
+def scaled_counts(rooms):
+    """按房间数推算一套比例合理的数据规模"""
+    return {
+        'users': 1,
+        'houses': max(1, rooms // 20),
+        'rooms': rooms,
+        'furniture': rooms * 3,
+        'renters': rooms * 6 // 5,
+        'links': rooms // 10,
+        'contracts': rooms * 2,
+    }
+
+
+def _chunks(rows):
+    """把行生成器按 CHUNK 行分块"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= CHUNK:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(sql, rows):
+    """分块事务写入，返回写入后的最大 rowid 范围 (首个ID, 末个ID)"""
+    first = last = None
+    for chunk in _chunks(rows):
+        with db.transaction() as c:
+            c.executemany(sql, chunk)
+            last = c.execute("SELECT last_insert_rowid()").fetchone()[0]
+            if first is None:
+                first = last - len(chunk) + 1
+    return first, last
+
+
+def generate(users=1, houses=50, rooms=1000, furniture=3000, renters=1200, links=100, contracts=2000,
+             seed=1, today=None):
+    """在当前数据库中生成模拟数据（数据平均分给 users 个用户，第一个用户为 admin），返回各表写入行数"""
+    rnd = random.Random(seed)
+    today = today or datetime.date.today()
+    conn = db.get_conn()
+    user_ids = [row[0] for row in conn.execute("SELECT id FROM user ORDER BY id LIMIT ?", (users,))]
+    with db.transaction() as c:
+        for i in range(len(user_ids), users):
+            c.execute("INSERT INTO user (user, password) VALUES (?, ?)", (f"bench{i}_{seed}", "bench"))
+            user_ids.append(c.lastrowid)
+
+    def owner(i):
+        return user_ids[i % users]
+
+    # 楼栋、房间：房间按序号分到楼栋，同一楼栋的房间属于同一用户
+    first, _ = _insert("INSERT INTO house (user_id, house_name, house_add, house_floor, house_status) VALUES (?, ?, ?, ?, '可用')",
+                       ((owner(i), f"{i + 1}号楼", f"测试路{i + 1}号", rnd.randint(3, 30)) for i in range(houses)))
+    house_ids = list(range(first, first + houses)) if houses else []
+    room_rows = []
+    for i in range(rooms):
+        h = i % houses
+        room_rows.append((owner(h), house_ids[h], f"{h + 1}-{i // houses + 1:03d}", rnd.randint(12, 60),
+                          rnd.choice((800, 1000, 1200, 1500, 2000)), rnd.choice(("空置", "空置", "空置", "维修中", "自住"))))
+    first, _ = _insert("INSERT INTO room (user_id, house_id, room_name, room_area, room_rent, room_status) VALUES (?, ?, ?, ?, ?, ?)",
+                       room_rows)
+    room_owner = {first + i: row[0] for i, row in enumerate(room_rows)}
+    room_rent = {first + i: row[4] for i, row in enumerate(room_rows)}
+    room_ids = list(room_owner)
+
+    def furniture_rows():
+        for _ in range(furniture):
+            room_id = rnd.choice(room_ids)
+            count, cost = rnd.randint(1, 3), rnd.choice((100, 300, 800, 1500, 3000))
+            yield (room_owner[room_id], room_id, rnd.choice(FURNITURE), "", count, cost, count * cost)
+    if room_ids:
+        _insert("INSERT INTO furniture (user_id, room_id, furniture, note, count, furniture_cost, total_cost) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                furniture_rows())
+
+    def renter_rows():
+        for i in range(renters):
+            name = rnd.choice(SURNAMES) + ''.join(rnd.choice(GIVEN) for _ in range(rnd.randint(1, 2)))
+            idcard = f"{rnd.randint(110000, 659999)}{rnd.randint(1960, 2005)}{rnd.randint(1, 12):02d}{rnd.randint(1, 28):02d}{rnd.randint(0, 9999):04d}"
+            yield (owner(i), name, idcard, f"1{rnd.randint(3, 9)}{rnd.randint(0, 999999999):09d}", f"wx{i}", "", 0)
+    first, _ = _insert("""INSERT INTO renter (user_id, renter_name, renter_idcard, renter_tel, renter_wechat, note, is_blacklisted)
+                          VALUES (?, ?, ?, ?, ?, ?, ?)""", renter_rows())
+    renter_ids = list(range(first, first + renters)) if renters else []
+    renters_by_user = {}
+    for i, renter_id in enumerate(renter_ids):
+        renters_by_user.setdefault(owner(i), []).append(renter_id)
+
+    # 关联租客：从同一用户的租客中挑出互不重复的 (副租客, 主租客)，主租客自己不再关联别人
+    subs = set()
+    link_rows = []
+    for _ in range(links * 3):
+        if len(link_rows) >= links or not renter_ids:
+            break
+        pool = renters_by_user[owner(rnd.randrange(users))]
+        sub, main = rnd.choice(pool), rnd.choice(pool)
+        if sub == main or sub in subs or main in subs:
+            continue
+        subs.add(sub)
+        link_rows.append((sub, main))
+    _insert("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", link_rows)
+    with db.transaction() as c:
+        regroup_renters(c)
+
+    # 合同：开始日期分布在过去三年到未来一个月，状态按日期推算；每个房间、租客最多一份履行中的合同。
+    # 合同先以"未交租"写入，再按期写收租流水，由流水触发器累计已交租金和已付截止日期
+    busy_rooms, busy_renters = set(), set()
+    eligible = {user_id: [r for r in pool if r not in subs] for user_id, pool in renters_by_user.items()}
+    contract_rows, paid_periods = [], []
+    for _ in range(contracts if room_ids else 0):
+        room_id = rnd.choice(room_ids)
+        user_id = room_owner[room_id]
+        renter_id = rnd.choice(eligible.get(user_id) or [None])
+        start = today - datetime.timedelta(days=rnd.randint(-30, 1095))
+        end = add_months(start, rnd.choice((6, 12, 12, 24))) - datetime.timedelta(days=1)
+        if start > today:
+            status = "待开始"
+        elif end < today:
+            status = "已终止"
+        elif room_id in busy_rooms or renter_id in busy_renters:
+            status = "已结束"
+            end = today - datetime.timedelta(days=1)
+        else:
+            status = "履行中"
+            busy_rooms.add(room_id)
+            busy_renters.add(renter_id)
+        method = rnd.choice(tuple(PAY_MONTHS))
+        rent = room_rent[room_id]
+        contract_rows.append((user_id, room_id, renter_id, start, end, rent, rent, status, method,
+                              0.0, rent, start - datetime.timedelta(days=1), ""))
+        # 大部分合同按期交满，少数拖欠一到两期
+        months = PAY_MONTHS[method]
+        periods = []
+        period_start = start
+        while period_start <= min(end, today) and rnd.random() > 0.03:
+            period_end = min(end, add_months(period_start, months) - datetime.timedelta(days=1))
+            periods.append((period_start, period_end, rent * months, period_start))
+            period_start = period_end + datetime.timedelta(days=1)
+        paid_periods.append(periods)
+    first, _ = _insert("""INSERT INTO contract (user_id, room_id, renter_id, start_date, end_date, rent, pledge, status,
+                              payment_method, total_rent, total_cash, paid_until_date, note)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""", contract_rows)
+    _insert("""INSERT INTO payment (user_id, contract_id, period_start, period_end, amount, paid_date)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            ((row[0], first + i, *period) for i, (row, periods) in enumerate(zip(contract_rows, paid_periods))
+             for period in periods))
+    with db.transaction() as c:
+        c.execute("""UPDATE room SET room_status='出租中'
+                     WHERE room_id IN (SELECT room_id FROM contract WHERE status='履行中')""")
+        c.execute("""SELECT ct.contract_id, m.group_id FROM contract ct JOIN renter m ON m.renter_id = ct.renter_id
+                     WHERE ct.status = '履行中'""")
+        c.executemany("UPDATE renter SET contract_id=? WHERE group_id=?", c.fetchall())
+    for user_id in user_ids:
+        update_all_costs(user_id)
+
+    return {name: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for name, table in (('users', 'user'), ('houses', 'house'), ('rooms', 'room'), ('furniture', 'furniture'),
+                                ('renters', 'renter'), ('links', 'renter_link'), ('contracts', 'contract'),
+                                ('payments', 'payment'))}
+
+
+# ------------------- 计时 -------------------
+def _page(count_sql, page_sql, user_id, size=200):
+    """与 VirtualTree 首次刷新相同：总行数 + 第一页"""
+    c = db.get_conn().cursor()
+    c.execute(count_sql, (user_id,)).fetchone()
+    c.execute(page_sql.rstrip() + "\nLIMIT ? OFFSET ?", (user_id, size, 0)).fetchall()
+
+
+def _last_page(count_sql, page_sql, user_id, size=200):
+    """滚动到列表末尾的一页"""
+    c = db.get_conn().cursor()
+    total = c.execute(count_sql, (user_id,)).fetchone()[0]
+    c.execute(page_sql.rstrip() + "\nLIMIT ? OFFSET ?", (user_id, size, max(0, total - size))).fetchall()
+
+
+def _full(sql, user_id):
+    db.get_conn().execute(sql, (user_id,)).fetchall()
+
+
+def benchmark_cases(user_id=1, today=None):
+    """[(名称, 无参函数)]：各页面加载时实际执行的查询"""
+    from dashboard import _query_dashboard
+    today = today or datetime.date.today()
+    cases = [('load_houses', lambda: _full(queries.HOUSE_LIST, user_id))]
+    for name, count_sql, page_sql in (
+            ('load_rooms', queries.ROOM_COUNT, queries.ROOM_LIST),
+            ('load_furnitures', queries.FURNITURE_COUNT, queries.FURNITURE_LIST),
+            ('load_renters', queries.RENTER_COUNT, queries.RENTER_LIST),
+            ('load_contracts', queries.CONTRACT_COUNT, queries.CONTRACT_LIST)):
+        cases.append((f"{name}/first_page", lambda c=count_sql, p=page_sql: _page(c, p, user_id)))
+        cases.append((f"{name}/last_page", lambda c=count_sql, p=page_sql: _last_page(c, p, user_id)))
+        cases.append((f"{name}/full", lambda p=page_sql: _full(p, user_id)))
+    cases.append(('load_dashboard_data', lambda: _query_dashboard(user_id, today)))
+    cases.append(('update_all_costs', lambda: update_all_costs(user_id)))
+    return cases
+
+
+def time_cases(cases, repeat=5):
+    """每个用例先预热一次再计时 repeat 次，返回 {名称: {min_ms, median_ms, max_ms}}"""
+    results = {}
+    for name, fn in cases:
+        fn()
+        samples = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            samples.append((time.perf_counter() - start) * 1000)
+        results[name] = {
+            'min_ms': round(min(samples), 3),
+            'median_ms': round(statistics.median(samples), 3),
+            'max_ms': round(max(samples), 3),
+        }
+    return results
+
+
+def _source_version():
+    """当前代码的 git 版本（git describe），不在仓库中时返回 None"""
+    try:
+        out = subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=os.path.dirname(os.path.abspath(__file__)),
+                             capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+def run(sizes, repeat=5, seed=1, workdir=None, keep=False, progress=print):
+    """对每个规模（房间数）生成一个新数据库并计时，返回报告 dict"""
+    workdir = workdir or tempfile.mkdtemp(prefix="househunter-bench-")
+    old_path = db.get_db_path()
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'version': _source_version(),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'seed': seed,
+        'runs': [],
+    }
+    try:
+        for size in sizes:
+            path = os.path.join(workdir, f"bench_{size}.db")
+            if os.path.exists(path):
+                os.remove(path)
+            db.set_db_path(path)
+            with contextlib.redirect_stdout(sys.stderr):   # 升级提示不混入输出到标准输出的报告
+                init_db()
+            counts = scaled_counts(size)
+            progress(f"生成数据: {counts}")
+            start = time.perf_counter()
+            actual = generate(seed=seed, **counts)
+            generate_s = time.perf_counter() - start
+            progress(f"生成完成 {generate_s:.1f}s，开始计时")
+            timings = time_cases(benchmark_cases(), repeat)
+            report['runs'].append({'size': size, 'counts': actual, 'generate_s': round(generate_s, 3),
+                                   'timings': timings})
+            for name, t in timings.items():
+                progress(f"  {name:<28} {t['median_ms']:>10.2f} ms")
+            db.close_all()
+            if not keep:
+                os.remove(path)
+    finally:
+        db.set_db_path(old_path)
+    return report
+
+
+def compare(old, new):
+    """对比两份报告中相同规模、相同用例的中位数耗时，返回 [(规模, 用例, 旧ms, 新ms, 比值)]"""
+    old_runs = {run['size']: run['timings'] for run in old['runs']}
+    rows = []
+    for run in new['runs']:
+        before = old_runs.get(run['size'], {})
+        for name, t in run['timings'].items():
+            if name in before:
+                ratio = t['median_ms'] / before[name]['median_ms'] if before[name]['median_ms'] else float('inf')
+                rows.append((run['size'], name, before[name]['median_ms'], t['median_ms'], ratio))
+    return rows
+
+
+def write_report(report, path=None):
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        sys.stdout.write(text + "\n")
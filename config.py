@@ -12,3 +12,33 @@ COLORS = {
     'exit': '#FF9800',         # 橙色 for exit
     'exit_hover': '#F57C00',
 }
+
+# 数据库配置
+DB_PATH = 'landlord.db'          # 可通过环境变量 HOUSEHUNTER_DB 覆盖
+DB_BUSY_TIMEOUT = 5000           # 毫秒，锁等待时间
+DB_STATEMENT_CACHE = 256         # 每个连接缓存的预编译语句数
+DB_PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('cache_size', -32000),      # 负数表示 KB，约 32MB
+    ('mmap_size', 268435456),    # 256MB
+    ('temp_store', 'MEMORY'),
+]
+
+# 查询计时（诊断用）
+QUERY_LOG = False                # 是否记录每条查询的耗时，也可用环境变量 HOUSEHUNTER_QUERY_LOG=1 开启
+SLOW_QUERY_MS = 200              # 超过该耗时（毫秒）的查询连同执行计划写入慢查询日志
+SLOW_QUERY_LOG = 'slow_queries.log'
+
+# 启动耗时报告
+STARTUP_REPORT = False           # 是否在首次绘制后输出启动耗时报告，也可用 HOUSEHUNTER_STARTUP_REPORT=1 或 --startup-report 开启
+STARTUP_LOG = 'startup_report.jsonl'
+
+# 外部修改检测：多人共用同一个数据库文件时，每隔多少毫秒检查一次其他人的修改（0 表示不检查）
+DATA_POLL_MS = 1000
+
+# 大列表分批插入：每批最多占用界面线程多少毫秒（第一屏总是立即显示）
+RENDER_CHUNK_MS = 12
+
+# 提醒配置
+RENT_REMINDER_DAYS = 10          # 租金催缴提醒：距下次交租日期多少天内开始提醒（已逾期的始终显示）
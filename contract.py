@@ -3,11 +3,17 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 import datetime
 import calendar
 from config import COLORS
-from widgets import WeChatButton
+from db import get_conn, transaction
+from database import assign_group_contract
+import queries
+import lookups
+from widgets import WeChatButton, is_alive
+from virtual_tree import VirtualTree
+from payments import open_payment_dialog
+import events
 
 try:
     from tkcalendar import DateEntry
@@ -21,59 +27,24 @@ except ImportError:
 class ContractManager:
     """合同管理器"""
     
-    def __init__(self, content, user_id, update_rooms_callback, update_dashboard_callback):
+    # 列表显示的数据来源（房间、租客名称、累计租金随收租流水变化）
+    TOPICS = (events.CONTRACT, events.ROOM, events.RENTER, events.PAYMENT)
+
+    def __init__(self, content, user_id):
         self.content = content
         self.user_id = user_id
-        self.update_rooms_callback = update_rooms_callback
-        self.update_dashboard_callback = update_dashboard_callback
         self.tree = None
-        self._upgrade_db_schema()
+        self.list = None
         
-    def _upgrade_db_schema(self):
-        """升级数据库结构"""
-        try:
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("PRAGMA table_info(contract)")
-            columns = [col[1] for col in c.fetchall()]
-            
-            if 'renter_id' not in columns:
-                print("升级数据库: 添加 renter_id...")
-                c.execute("ALTER TABLE contract ADD COLUMN renter_id INTEGER")
-                c.execute("""
-                    UPDATE contract 
-                    SET renter_id = (
-                        SELECT renter_id FROM renter 
-                        WHERE renter.contract_id = contract.contract_id 
-                        LIMIT 1
-                    )
-                """)
-            
-            if 'payment_method' not in columns:
-                print("升级数据库: 添加 payment_method...")
-                c.execute("ALTER TABLE contract ADD COLUMN payment_method TEXT DEFAULT '月付'")
-                c.execute("UPDATE contract SET payment_method='月付' WHERE payment_method IS NULL")
-
-            if 'last_payment_date' not in columns:
-                print("升级数据库: 添加 last_payment_date...")
-                c.execute("ALTER TABLE contract ADD COLUMN last_payment_date DATE")
-                c.execute("UPDATE contract SET last_payment_date=start_date WHERE last_payment_date IS NULL")
-
-            if 'paid_until_date' not in columns:
-                print("升级数据库: 添加 paid_until_date...")
-                c.execute("ALTER TABLE contract ADD COLUMN paid_until_date DATE")
-                
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"数据库升级警告: {e}")
-
     def create_page(self):
         """创建合同管理页面"""
         tk.Label(self.content, text="合同管理", font=('Microsoft YaHei UI',18,'bold'),
                  bg=COLORS['bg'], fg=COLORS['text']).pack(pady=25)
 
-        self.tree = ttk.Treeview(self.content, columns=("contract_id","room_name","renter_names","start_date","end_date","rent","pledge","status","total_rent","total_cash"), show="headings", height=18)
+        self.list = VirtualTree(self.content, ("contract_id","room_name","renter_names","start_date","end_date","rent","pledge","status","total_rent","total_cash"),
+                                queries.CONTRACT_COUNT, queries.CONTRACT_LIST, (self.user_id,), self._format_contract,
+                                position_sql=queries.CONTRACT_POSITION)
+        self.tree = self.list.tree
         cols = [
             ("contract_id","ID",60),
             ("room_name","房间",140),
@@ -94,7 +65,7 @@ class ContractManager:
         self.tree.tag_configure('ended', background='#CCCCCC')
         self.tree.tag_configure('pending', background='#90EE90')
         
-        self.tree.pack(fill='both', expand=True, padx=30, pady=10)
+        self.list.pack(fill='both', expand=True, padx=30, pady=10)
 
         btns = tk.Frame(self.content, bg=COLORS['bg'])
         btns.pack(pady=10)
@@ -109,43 +80,29 @@ class ContractManager:
     
     def load_contracts(self):
         """加载合同数据"""
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("""
-            SELECT c.contract_id, rm.room_name, 
-                   GROUP_CONCAT(rt.renter_name, ', ') as renter_names,
-                   c.start_date, c.end_date, c.rent, c.pledge, c.status, c.total_rent, c.total_cash
-            FROM contract c 
-            LEFT JOIN room rm ON c.room_id = rm.room_id 
-            LEFT JOIN renter rt ON c.renter_id = rt.renter_id
-            WHERE c.user_id=?
-            GROUP BY c.contract_id, rm.room_name, c.start_date, c.end_date, c.rent, c.pledge, c.status, c.total_rent, c.total_cash
-            ORDER BY c.contract_id
-        """, (self.user_id,))
-        
-        for row in c.fetchall():
-            row = list(row)
-            status = row[7]
-            if status == '履行中':
-                tag = 'active'
-            elif status in ['已结束', '已终止']:
-                tag = 'ended'
-            else:
-                tag = 'pending'
-            
-            row.append(row[5])
-            row.append(row[6])
-            row.append(row[8])
-            
-            row[5] = f"¥{row[5]:,.2f}" if row[5] is not None else ''
-            row[6] = f"¥{row[6]:,.2f}" if row[6] is not None else ''
-            row[8] = f"¥{row[8]:,.2f}" if row[8] is not None else ''
-            row[9] = f"¥{row[9]:,.2f}" if row[9] is not None else ''
-            
-            self.tree.insert("", "end", values=row, tags=(tag,)) 
-        conn.close()
+        if is_alive(self.tree):
+            self.list.refresh()
+
+    def reveal(self, contract_id):
+        """定位并选中指定合同（搜索结果跳转）"""
+        if is_alive(self.tree):
+            self.list.reveal(contract_id)
+
+    def _format_contract(self, row):
+        row = list(row)
+        status = row[7]
+        if status == '履行中':
+            tag = 'active'
+        elif status in ['已结束', '已终止']:
+            tag = 'ended'
+        else:
+            tag = 'pending'
+
+        row[5] = f"¥{row[5]:,.2f}" if row[5] is not None else ''
+        row[6] = f"¥{row[6]:,.2f}" if row[6] is not None else ''
+        row[8] = f"¥{row[8]:,.2f}" if row[8] is not None else ''
+        row[9] = f"¥{row[9]:,.2f}" if row[9] is not None else ''
+        return row, (tag,)
 
     def _add_months_local(self, sourcedate, months):
         """内部辅助函数：增加月份"""
@@ -156,73 +113,13 @@ class ContractManager:
         return datetime.date(year, month, day)
 
     def open_rental_record(self):
-        """打开租金记录窗口（编辑已付截止日期）"""
+        """打开租金记录窗口（登记收租、查看和删除收租流水）"""
         sel = self.tree.selection()
         if not sel:
             return messagebox.showwarning("提示", "请先选择一条合同", parent=self.content.master)
-        
-        values = self.tree.item(sel[0])["values"]
-        cid = values[0]
-        
-        from dialogs import center_window
-        win = tk.Toplevel(self.content.master)
-        win.title("租金记录")
-        center_window(win, 350, 250, self.content.master)
-        win.configure(bg=COLORS['bg'])
-        win.transient(self.content.master)
-        win.grab_set()
-        win.attributes('-topmost', True)
-
-        f = tk.Frame(win, bg='white')
-        f.pack(expand=True, fill='both', padx=40, pady=30)
-
-        # 获取当前信息
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT room_id, renter_id, paid_until_date, payment_method FROM contract WHERE contract_id=?", (cid,))
-        info = c.fetchone()
-        
-        c.execute("SELECT room_name FROM room WHERE room_id=?", (info[0],))
-        rname = c.fetchone()[0]
-        c.execute("SELECT renter_name FROM renter WHERE renter_id=?", (info[1],))
-        rtname = c.fetchone()[0] if info[1] else "未知"
-        
-        current_paid_until = info[2]
-        pay_method = info[3] if len(info) > 3 else '月付'
-        conn.close()
-
-        tk.Label(f, text=f"房间: {rname}", bg='white', font=('Microsoft YaHei UI', 10, 'bold'), anchor='w').pack(fill='x', pady=(10, 5))
-        tk.Label(f, text=f"租客: {rtname}", bg='white', font=('Microsoft YaHei UI', 10, 'bold'), anchor='w').pack(fill='x', pady=(0, 5))
-        
-        tk.Label(f, text="租金已付截止日期:", bg='white', font=('Microsoft YaHei UI', 10, 'bold'), anchor='w').pack(fill='x', pady=(10, 5))
-        
-        e_date = DateEntry(f, width=30, background='darkblue', foreground='white', borderwidth=2, locale='zh_CN', date_pattern='yyyy-mm-dd')
-        if current_paid_until:
-            try:
-                e_date.set_date(datetime.date.fromisoformat(current_paid_until))
-            except:
-                e_date.set_date(datetime.date.today())
-        else:
-            e_date.set_date(datetime.date.today())
-        e_date.pack(fill='x')
-
-        def save_record():
-            new_date = e_date.get_date()
-            if not new_date:
-                messagebox.showerror("错误", "日期无效", parent=win)
-                return
-            
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("UPDATE contract SET paid_until_date=? WHERE contract_id=?", (new_date.isoformat(), cid))
-            conn.commit()
-            conn.close()
-            
-            messagebox.showinfo("成功", "租金记录已更新", parent=win)
-            win.destroy()
-            self.update_dashboard_callback() # 刷新Dashboard
-
-        WeChatButton(f, text="保存", command=save_record, width=15).pack(side='bottom', pady=20)
+        cid = self.tree.item(sel[0])["values"][0]
+        # 收租流水写入后发布变更事件，合同列表和仪表盘随之刷新
+        open_payment_dialog(self.content.master, cid)
 
     def add_contract(self):
         """添加合同"""
@@ -238,34 +135,18 @@ class ContractManager:
         f = tk.Frame(win, bg='white')
         f.pack(expand=True, fill='both', padx=40, pady=30)
 
-        # 获取可用的房间（排除履行中的合同关联的房间）
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("""
-            SELECT r.room_id, r.room_name 
-            FROM room r 
-            LEFT JOIN contract c ON r.room_id = c.room_id AND c.status='履行中'
-            WHERE r.user_id=? AND c.contract_id IS NULL
-        """, (self.user_id,))
-        rooms = c.fetchall()
-
-        c.execute("""
-            SELECT r.renter_id, r.renter_name 
-            FROM renter r 
-            LEFT JOIN contract c ON r.renter_id = c.renter_id AND c.status='履行中'
-            WHERE r.user_id=? AND c.contract_id IS NULL
-        """, (self.user_id,))
-        renters = c.fetchall()
-        conn.close()
+        # 获取可用的房间和租客（排除履行中的合同关联的房间和租客）
+        lk = lookups.get(self.user_id)
+        rooms, renters = lk.rooms, lk.renters
 
         tk.Label(f, text="房间", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=0,column=0,sticky='w',pady=10)
-        room_names = [r[1] for r in rooms]
+        room_names = rooms.names_where(lambda id_: id_ not in lk.busy_rooms)
         room_var = tk.StringVar()
         room_combo = ttk.Combobox(f, textvariable=room_var, values=room_names, state="readonly", width=27)
         room_combo.grid(row=0,column=1,pady=10)
 
         tk.Label(f, text="租客", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=1,column=0,sticky='w',pady=10)
-        renter_names = [r[1] for r in renters]
+        renter_names = renters.names_where(lambda id_: id_ not in lk.busy_renters)
         renter_var = tk.StringVar()
         renter_combo = ttk.Combobox(f, textvariable=renter_var, values=renter_names, state="readonly", width=27)
         renter_combo.grid(row=1,column=1,pady=10)
@@ -333,43 +214,34 @@ class ContractManager:
             else:
                 status = "履行中"
             
-            rid = next(r[0] for r in rooms if r[1] == rname) if rooms else None
-            rtid = next(r[0] for r in renters if r[1] == rtname) if renters else None
-            
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
+            rid = rooms.id_of(rname)
+            rtid = renters.id_of(rtname)
             
-            total_rent = 0.0
-            total_cash = total_rent + pledge
-            pay_method = pay_method_var.get()
+            with transaction() as c:
+                total_rent = 0.0
+                total_cash = total_rent + pledge
+                pay_method = pay_method_var.get()
             
-            # 初始化 last_payment_date (为了兼容旧逻辑)
-            months_to_add = 1
-            if '季付' in pay_method: months_to_add = 3
-            elif '半年' in pay_method: months_to_add = 6
-            elif '年付' in pay_method: months_to_add = 12
-            init_last_pay_date = self._add_months_local(start_date, -months_to_add)
+                # 初始化 last_payment_date (为了兼容旧逻辑)
+                months_to_add = 1
+                if '季付' in pay_method: months_to_add = 3
+                elif '半年' in pay_method: months_to_add = 6
+                elif '年付' in pay_method: months_to_add = 12
+                init_last_pay_date = self._add_months_local(start_date, -months_to_add)
             
-            # 【修改】初始化 paid_until_date
-            # 默认设置为 开始日期 - 1天，意味着第一期还没付，Dashboard会立即提醒
-            init_paid_until = start_date - datetime.timedelta(days=1)
+                # 【修改】初始化 paid_until_date
+                # 默认设置为 开始日期 - 1天，意味着第一期还没付，Dashboard会立即提醒
+                init_paid_until = start_date - datetime.timedelta(days=1)
             
-            c.execute("INSERT INTO contract (user_id, room_id, renter_id, start_date, end_date, rent, pledge, note, status, total_rent, total_cash, payment_method, last_payment_date, paid_until_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                      (self.user_id, rid, rtid, start, end, rent, pledge, note, status, total_rent, total_cash, pay_method, init_last_pay_date, init_paid_until.isoformat()))
-            cid = c.lastrowid
+                c.execute("INSERT INTO contract (user_id, room_id, renter_id, start_date, end_date, rent, pledge, note, status, total_rent, total_cash, payment_method, last_payment_date, paid_until_date) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          (self.user_id, rid, rtid, start, end, rent, pledge, note, status, total_rent, total_cash, pay_method, init_last_pay_date, init_paid_until.isoformat()))
+                cid = c.lastrowid
             
-            c.execute("UPDATE renter SET contract_id=? WHERE renter_id=?", (cid, rtid))
-            c.execute("SELECT renter_id FROM renter_link WHERE linked_renter_id=?", (rtid,))
-            linked_renters = c.fetchall()
-            for (lr_id,) in linked_renters:
-                c.execute("UPDATE renter SET contract_id=? WHERE renter_id=?", (cid, lr_id))
+                # 租客及其关联租客（同组）一次分配合同
+                assign_group_contract(c, rtid, cid)
             
-            conn.commit()
-            conn.close()
             win.destroy()
-            self.update_dashboard_callback()
-            self.load_contracts()
-            self.update_rooms_callback()
+            events.publish(events.CONTRACT, cid, events.INSERT)
 
         WeChatButton(f, text="确定添加", command=save, width=20).grid(row=8,column=0,columnspan=2,pady=25)
 
@@ -393,7 +265,7 @@ class ContractManager:
         f = tk.Frame(win, bg='white')
         f.pack(expand=True, fill='both', padx=40, pady=30)
 
-        conn = sqlite3.connect('landlord.db')
+        conn = get_conn()
         c = conn.cursor()
         c.execute("SELECT room_id, renter_id, note, payment_method FROM contract WHERE contract_id=?", (cid,))
         contract_info = c.fetchone()
@@ -402,34 +274,24 @@ class ContractManager:
         current_note = contract_info[2]
         current_pay_method = contract_info[3] if len(contract_info) > 3 else '月付'
         
-        c.execute("""
-            SELECT r.room_id, r.room_name 
-            FROM room r 
-            LEFT JOIN contract c ON r.room_id = c.room_id AND c.status='履行中'
-            WHERE r.user_id=? AND (c.contract_id IS NULL OR c.contract_id=?)
-        """, (self.user_id, cid))
-        rooms = c.fetchall()
-        
-        c.execute("""
-            SELECT r.renter_id, r.renter_name 
-            FROM renter r 
-            LEFT JOIN contract c ON r.renter_id = c.renter_id AND c.status='履行中'
-            WHERE r.user_id=? AND (c.contract_id IS NULL OR c.contract_id=?)
-        """, (self.user_id, cid))
-        
-        renters = c.fetchall()
-        conn.close()
+        # 可选房间和租客：空闲的，或者正是本合同的
+        lk = lookups.get(self.user_id)
+        rooms, renters = lk.rooms, lk.renters
 
         tk.Label(f, text="房间", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=0,column=0,sticky='w',pady=10)
-        room_names = [r[1] for r in rooms]
-        current_room_name = next((r[1] for r in rooms if r[0] == current_room_id), "")
+        room_names = rooms.names_where(lambda id_: lk.busy_rooms.get(id_, cid) == cid)
+        current_room_name = rooms.name_of(current_room_id)
+        if current_room_name not in room_names:
+            current_room_name = ""
         room_var = tk.StringVar(value=current_room_name)
         room_combo = ttk.Combobox(f, textvariable=room_var, values=room_names, state="readonly", width=27)
         room_combo.grid(row=0,column=1,pady=10)
 
         tk.Label(f, text="租客", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=1,column=0,sticky='w',pady=10)
-        renter_names = [r[1] for r in renters]
-        current_renter_name = next((r[1] for r in renters if r[0] == current_renter_id), "")
+        renter_names = renters.names_where(lambda id_: lk.busy_renters.get(id_, cid) == cid)
+        current_renter_name = renters.name_of(current_renter_id)
+        if current_renter_name not in renter_names:
+            current_renter_name = ""
         renter_var = tk.StringVar(value=current_renter_name)
         renter_combo = ttk.Combobox(f, textvariable=renter_var, values=renter_names, state="readonly", width=27)
         renter_combo.grid(row=1,column=1,pady=10)
@@ -450,7 +312,7 @@ class ContractManager:
 
         tk.Label(f, text="租金", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=4,column=0,sticky='w',pady=10)
         e_rent = tk.Entry(f, width=30)
-        e_rent.insert(0, str(values[10]) if len(values) > 10 else '')
+        e_rent.insert(0, str(values[5]))
         e_rent.grid(row=4,column=1,pady=10)
 
         tk.Label(f, text="支付方式", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=5,column=0,sticky='w',pady=10)
@@ -460,7 +322,7 @@ class ContractManager:
 
         tk.Label(f, text="押金", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=6,column=0,sticky='w',pady=10)
         e_pledge = tk.Entry(f, width=30)
-        e_pledge.insert(0, str(values[11]) if len(values) > 11 else '')
+        e_pledge.insert(0, str(values[6]))
         e_pledge.grid(row=6,column=1,pady=10)
 
         tk.Label(f, text="状态", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=7,column=0,sticky='w',pady=10)
@@ -468,9 +330,11 @@ class ContractManager:
         status_combo = ttk.Combobox(f, textvariable=status_var, values=["待开始", "履行中", "已结束", "已终止"], state="readonly", width=27)
         status_combo.grid(row=7,column=1,pady=10)
 
+        # 已交租金由收租流水累计，这里只显示；登记收租请用“租金记录”
         tk.Label(f, text="已交租金", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=8,column=0,sticky='w',pady=10)
         e_total_rent = tk.Entry(f, width=30)
-        e_total_rent.insert(0, str(values[12]) if len(values) > 12 else '')
+        e_total_rent.insert(0, str(values[8]))
+        e_total_rent.config(state='readonly')
         e_total_rent.grid(row=8,column=1,pady=10)
 
         tk.Label(f, text="备注", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=9,column=0,sticky='w',pady=10)
@@ -484,8 +348,8 @@ class ContractManager:
             if not selected_room_name or not selected_renter_name:
                 messagebox.showerror("错误", "请选择房间和租客", parent=win)
                 return
-            new_room_id = next((r[0] for r in rooms if r[1] == selected_room_name), None)
-            new_renter_id = next((r[0] for r in renters if r[1] == selected_renter_name), None)
+            new_room_id = rooms.id_of(selected_room_name)
+            new_renter_id = renters.id_of(selected_renter_name)
             
             start_date = e_start.get_date()
             end_date = e_end.get_date()
@@ -496,25 +360,18 @@ class ContractManager:
             if not valid_r: return
             valid_p, pledge = self.validate_money(e_pledge.get(), "押金")
             if not valid_p: return
-            valid_t, total_rent = self.validate_money(e_total_rent.get(), "已交租金")
-            if not valid_t: return
-            
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
             
-            c.execute("UPDATE contract SET room_id=?, renter_id=?, start_date=?, end_date=?, rent=?, pledge=?, status=?, total_rent=?, total_cash=?, note=?, payment_method=? WHERE contract_id=?", 
-                      (new_room_id, new_renter_id, start_date.isoformat(), end_date.isoformat(), rent, pledge, status, total_rent, total_rent+pledge, note, pay_method_var.get(), cid))
+            with transaction() as c:
+                c.execute("UPDATE contract SET room_id=?, renter_id=?, start_date=?, end_date=?, rent=?, pledge=?, status=?, total_cash=IFNULL(total_rent, 0)+?, note=?, payment_method=? WHERE contract_id=?", 
+                          (new_room_id, new_renter_id, start_date.isoformat(), end_date.isoformat(), rent, pledge, status, pledge, note, pay_method_var.get(), cid))
             
-            if status == '履行中':
-                c.execute("UPDATE renter SET contract_id=? WHERE renter_id=?", (cid, new_renter_id))
-            else:
+                # 先解除旧租客组的合同，更换租客后旧组不再挂着这份合同
                 c.execute("UPDATE renter SET contract_id=NULL WHERE contract_id=?", (cid,))
+                if status == '履行中':
+                    assign_group_contract(c, new_renter_id, cid)
             
-            conn.commit()
-            conn.close()
             win.destroy()
-            self.load_contracts()
-            self.update_rooms_callback()
+            events.publish(events.CONTRACT, cid, events.UPDATE)
 
         WeChatButton(f, text="保存修改", command=save, width=20).grid(row=10,column=0,columnspan=2,pady=25)
 
@@ -524,15 +381,13 @@ class ContractManager:
         if not sel: return
         if not messagebox.askyesno("确认", "确定删除？"): return
         cid = self.tree.item(sel[0])["values"][0]
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT room_id FROM contract WHERE contract_id=?", (cid,))
-        rid = c.fetchone()[0]
-        c.execute("DELETE FROM contract WHERE contract_id=?", (cid,))
-        c.execute("UPDATE renter SET contract_id=NULL WHERE contract_id=?", (cid,))
-        conn.commit()
-        conn.close()
-        self.load_contracts()
+        with transaction() as c:
+            c.execute("SELECT room_id FROM contract WHERE contract_id=?", (cid,))
+            rid = c.fetchone()[0]
+            c.execute("DELETE FROM payment WHERE contract_id=?", (cid,))
+            c.execute("DELETE FROM contract WHERE contract_id=?", (cid,))
+            c.execute("UPDATE renter SET contract_id=NULL WHERE contract_id=?", (cid,))
+        events.publish(events.CONTRACT, cid, events.DELETE)
 
     def validate_money(self, val, name):
         val = val.strip()
@@ -3,11 +3,16 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 import datetime
 import calendar
-from config import COLORS
-from widgets import WeChatButton
+from config import COLORS, RENT_REMINDER_DAYS
+from db import get_conn, write_serial
+import queries
+from widgets import WeChatButton, is_alive, TreeSync, progress_reporter
+from worker import run_async
+from payments import open_payment_dialog
+from projection import project
+import events
 
 try:
     from tkcalendar import DateEntry
@@ -21,6 +26,8 @@ except ImportError:
 class DashboardManager:
     """仪表盘管理器"""
     GLOBAL_APP_DATE = datetime.date.today()
+    # 汇总了所有数据
+    TOPICS = events.ENTITIES
 
     def __init__(self, content, user_id, to_room_page_callback=None):
         self.content = content
@@ -89,6 +96,7 @@ class DashboardManager:
         self.tree.column("end_date", width=150, anchor='center')
         self.tree.column("days_left", width=100, anchor='center')
         self.tree.pack(fill='both', expand=True)
+        self.tree_rows = TreeSync(self.tree)
 
         # 第四行：即将到期租金提醒
         row4 = tk.Frame(stats_frame, bg=COLORS['bg'])
@@ -96,7 +104,7 @@ class DashboardManager:
         
         header4 = tk.Frame(row4, bg=COLORS['bg'])
         header4.pack(fill='x', pady=(0, 5))
-        tk.Label(header4, text="租金催缴提醒 (逾期或10天内)", font=('Microsoft YaHei UI',14,'bold'),
+        tk.Label(header4, text=f"租金催缴提醒 (逾期或{RENT_REMINDER_DAYS}天内)", font=('Microsoft YaHei UI',14,'bold'),
                  bg=COLORS['bg'], fg='#FF5722', anchor='w').pack(side='left')
         
         # 【修改】移除了“√ 标记已付”，改为“编辑租金”按钮，初始禁用
@@ -104,6 +112,10 @@ class DashboardManager:
                                              bg_color='#FF5722', hover_color='#E64A19', width=10)
         self.btn_edit_payment.pack(side='right')
         self.btn_edit_payment.config(state=tk.DISABLED)  # 初始状态禁用
+        lbl_payment_progress = tk.Label(header4, text="", font=('Microsoft YaHei UI', 9),
+                                        bg=COLORS['bg'], fg=COLORS['text_light'])
+        lbl_payment_progress.pack(side='right', padx=10)
+        self.show_payment_progress = progress_reporter(lbl_payment_progress)
 
         pay_cols = ("room", "renter", "due_date", "days_left", "amount", "contract_id")
         self.payment_tree = ttk.Treeview(row4, columns=pay_cols, show="headings", height=6)
@@ -121,10 +133,26 @@ class DashboardManager:
         self.payment_tree.column("amount", width=100, anchor='center')
         self.payment_tree.column("contract_id", width=0, stretch=False)
         self.payment_tree.pack(fill='both', expand=True)
+        self.payment_rows = TreeSync(self.payment_tree)
         
         # 绑定选择事件
         self.payment_tree.bind('<<TreeviewSelect>>', self.on_payment_select)
 
+        # 第五行：未来12个月预计租金（柱状图）
+        row5 = tk.Frame(stats_frame, bg=COLORS['bg'])
+        row5.grid(row=4, column=0, columnspan=3, sticky="nsew", pady=(20, 10))
+        header5 = tk.Frame(row5, bg=COLORS['bg'])
+        header5.pack(fill='x', pady=(0, 5))
+        tk.Label(header5, text="未来12个月预计租金", font=('Microsoft YaHei UI',14,'bold'),
+                 bg=COLORS['bg'], fg=COLORS['text'], anchor='w').pack(side='left')
+        self.lbl_projection = tk.Label(header5, text="", font=('Microsoft YaHei UI', 10),
+                                       bg=COLORS['bg'], fg=COLORS['text_light'])
+        self.lbl_projection.pack(side='right')
+        self.projection_canvas = tk.Canvas(row5, height=180, bg='white', highlightthickness=0)
+        self.projection_canvas.pack(fill='x')
+        self.projection = None
+        self.projection_canvas.bind("<Configure>", lambda e: self._draw_projection())
+
         self.load_dashboard_data()
 
     def _create_stat_card(self, parent, title, value, color_name, bg_color, text_color, row, col):
@@ -171,6 +199,8 @@ class DashboardManager:
         def save_date():
             new_date = e_date.get_date()
             if new_date:
+                # 只改变仪表盘按哪一天统计，不改写数据库：合同状态只在启动时按真实日期推进（只进不退），
+                # 按模拟日期推进的话，日期改回来也无法撤销
                 DashboardManager.GLOBAL_APP_DATE = new_date
                 self.update_date_display()
                 self.load_dashboard_data()
@@ -190,182 +220,164 @@ class DashboardManager:
             self.btn_edit_payment.config(state=tk.DISABLED)
 
     def open_rental_record(self):
-        """打开租金记录编辑窗口"""
+        """打开租金记录窗口（登记收租、查看和删除收租流水）"""
         sel = self.payment_tree.selection()
         if not sel:
             return
-        
+
         vals = self.payment_tree.item(sel[0])["values"]
         contract_id = vals[5]
-        
-        from dialogs import center_window
-        win = tk.Toplevel(self.content.master)
-        win.title("编辑租金记录")
-        center_window(win, 350, 250, self.content.master)
-        win.configure(bg=COLORS['bg'])
-        win.transient(self.content.master)
-        win.grab_set()
-        win.attributes('-topmost', True)
+        open_payment_dialog(self.content.master, contract_id, today=self.GLOBAL_APP_DATE)
 
-        f = tk.Frame(win, bg='white')
-        f.pack(expand=True, fill='both', padx=40, pady=30)
+    def load_dashboard_data(self):
+        """加载仪表盘数据（命中缓存直接显示，否则后台查询，完成后刷新卡片和列表）"""
+        cache_key = (self.user_id, self.GLOBAL_APP_DATE, write_serial())
+        cached = _summary_cache.get(self.user_id)
+        if cached and cached[0] == cache_key:
+            self._show_dashboard_data(cached[1])
+            return
 
-        # 获取当前信息
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT room_id, renter_id, paid_until_date FROM contract WHERE contract_id=?", (contract_id,))
-        info = c.fetchone()
-        
-        c.execute("SELECT room_name FROM room WHERE room_id=?", (info[0],))
-        rname = c.fetchone()[0]
-        c.execute("SELECT renter_name FROM renter WHERE renter_id=?", (info[1],))
-        rtname = c.fetchone()[0] if info[1] else "未知"
-        
-        current_paid_until = info[2]
-        conn.close()
+        def done(data):
+            # 以提交查询时的写入序号为准：查询期间若有写入，下次加载会重新查询
+            _summary_cache[self.user_id] = (cache_key, data)
+            self._show_dashboard_data(data)
 
-        tk.Label(f, text=f"房间: {rname}", bg='white', font=('Microsoft YaHei UI', 10, 'bold'), anchor='w').pack(fill='x', pady=(10, 5))
-        tk.Label(f, text=f"租客: {rtname}", bg='white', font=('Microsoft YaHei UI', 10, 'bold'), anchor='w').pack(fill='x', pady=(0, 5))
-        
-        tk.Label(f, text="租金已付截止日期:", bg='white', font=('Microsoft YaHei UI', 10, 'bold'), anchor='w').pack(fill='x', pady=(10, 5))
-        
-        e_date = DateEntry(f, width=30, background='darkblue', foreground='white', borderwidth=2, locale='zh_CN', date_pattern='yyyy-mm-dd')
-        if current_paid_until:
-            try:
-                e_date.set_date(datetime.date.fromisoformat(current_paid_until))
-            except:
-                e_date.set_date(datetime.date.today())
-        else:
-            e_date.set_date(datetime.date.today())
-        e_date.pack(fill='x')
+        run_async(_query_dashboard, self.user_id, self.GLOBAL_APP_DATE,
+                  on_done=done, on_error=self._on_load_error, key=self)
 
-        def save_record():
-            new_date = e_date.get_date()
-            if not new_date:
-                messagebox.showerror("错误", "日期无效", parent=win)
-                return
-            
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("UPDATE contract SET paid_until_date=? WHERE contract_id=?", (new_date.isoformat(), contract_id))
-            conn.commit()
-            conn.close()
-            
-            messagebox.showinfo("成功", "租金记录已更新", parent=win)
-            win.destroy()
-            self.load_dashboard_data()
+    def _on_load_error(self, e):
+        messagebox.showerror("错误", f"数据加载失败: {str(e)}")
+        import traceback
+        traceback.print_exception(type(e), e, e.__traceback__)
 
-        WeChatButton(f, text="保存", command=save_record, width=15).pack(side='bottom', pady=20)
-
-    def load_dashboard_data(self):
-        """加载仪表盘数据"""
+    def _show_dashboard_data(self, data):
+        if not is_alive(self.payment_tree):
+            return
         try:
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            
-            # 1. 基础统计
-            c.execute("SELECT COUNT(*) FROM room WHERE user_id=?", (self.user_id,))
-            total_rooms = c.fetchone()[0]
-            
-            c.execute("SELECT COUNT(*) FROM contract WHERE user_id=? AND status='履行中'", (self.user_id,))
-            active_contracts = c.fetchone()[0]
-            
-            c.execute("SELECT SUM(room_cost) FROM room WHERE user_id=?", (self.user_id,))
-            total_cost = c.fetchone()[0] or 0.0
-            
-            c.execute("SELECT SUM(rent) FROM contract WHERE user_id=? AND status='履行中'", (self.user_id,))
-            monthly_income = c.fetchone()[0] or 0.0
-            
-            # 新增累计租金统计
-            c.execute("""
-                SELECT COALESCE(SUM(total_rent), 0) 
-                FROM contract 
-                WHERE user_id=? AND status IN ('履行中', '已结束')
-            """, (self.user_id,))
-            total_received = c.fetchone()[0] or 0.0
-            
+            total_rooms = data['total_rooms']
+            active_contracts = data['active_contracts']
+            current_date = data['current_date']
+
             # 更新所有统计卡片
             self.lbl_total_rooms.config(text=str(total_rooms))
             self.lbl_vacant_rooms.config(text=str(total_rooms - active_contracts))  # 空置房间数 = 总房间数 - 履行中合同数
-            self.lbl_total_cost.config(text=f"¥{total_cost:,.2f}")  # 恢复总成本显示
+            self.lbl_total_cost.config(text=f"¥{data['total_cost']:,.2f}")  # 恢复总成本显示
             self.lbl_active_contracts.config(text=str(active_contracts))
-            self.lbl_monthly_income.config(text=f"¥{monthly_income:,.2f}")
-            self.lbl_total_received.config(text=f"¥{total_received:,.2f}")  # 更新累计租金
+            self.lbl_monthly_income.config(text=f"¥{data['monthly_income']:,.2f}")
+            self.lbl_total_received.config(text=f"¥{data['total_received']:,.2f}")  # 更新累计租金
             
-            # 2. 即将到期合同列表
-            current_date = self.GLOBAL_APP_DATE
-            end_date_limit = current_date + datetime.timedelta(days=7)
-            
-            c.execute("""
-                SELECT rm.room_name, rt.renter_name, c.end_date, c.contract_id
-                FROM contract c
-                LEFT JOIN room rm ON c.room_id = rm.room_id
-                LEFT JOIN renter rt ON c.renter_id = rt.renter_id
-                WHERE c.user_id=? AND c.end_date <= ? AND c.status='履行中'
-                ORDER BY c.end_date
-            """, (self.user_id, end_date_limit.isoformat()))
-            
-            for i in self.tree.get_children(): self.tree.delete(i)
-            for row in c.fetchall():
-                r_name, rt_name, end_str, cid = row
-                end_date = datetime.date.fromisoformat(end_str) if end_str else None
-                days_left = (end_date - current_date).days if end_date else 0
-                self.tree.insert("", "end", values=(r_name, rt_name, end_str, f"{days_left}天"))
-            
-            # 3. 即将到期租金提醒
-            c.execute("""
-                SELECT c.contract_id, rm.room_name, rt.renter_name, c.rent, 
-                       c.start_date, c.payment_method, c.paid_until_date
-                FROM contract c
-                LEFT JOIN room rm ON c.room_id = rm.room_id
-                LEFT JOIN renter rt ON c.renter_id = rt.renter_id
-                WHERE c.user_id=? AND c.status='履行中'
-            """, (self.user_id,))
-            
-            for i in self.payment_tree.get_children(): self.payment_tree.delete(i)
-            
-            contracts = c.fetchall()
-            
-            for cid, room_name, renter_name, rent, start_str, pay_method, paid_until_str in contracts:
-                try:
-                    start_date = datetime.date.fromisoformat(start_str)
-                except:
-                    continue
-                
-                # 优先使用 paid_until_date
-                paid_until_date = datetime.date.fromisoformat(paid_until_str) if paid_until_str else start_date
-                
-                # 计算剩余天数
-                days_diff = (paid_until_date - current_date).days
-                
-                # 显示逻辑
-                if days_diff < 0:
-                    day_str = f"已逾期{abs(days_diff)}天"
-                elif 0 <= days_diff <= 10:
-                    day_str = f"剩余{days_diff}天"
-                else:
-                    continue  # 超过10天不显示
-                
-                self.payment_tree.insert("", "end", values=(
-                    room_name, 
-                    renter_name, 
-                    paid_until_date.isoformat(), 
-                    day_str,
-                    f"¥{rent:,.2f}",
-                    cid
-                ))
+            # 2. 即将到期合同列表、3. 即将到期租金提醒
+            # 逾期合同可能有成千上万条：分批插入，第一屏立即显示，其余在空闲时补上
+            self.tree_rows.sync_chunked(_expiring_items(data['expiring'], current_date),
+                                        total=len(data['expiring']))
+            self.payment_rows.sync_chunked(_payment_items(data['rent_due'], current_date),
+                                           on_progress=self.show_payment_progress, total=len(data['rent_due']))
+
+            # 4. 租金预测
+            self.projection = data['projection']
+            self._draw_projection()
             
             # 列表刷新后，如果没有选中项，确保按钮禁用
             if not self.payment_tree.selection():
                 self.btn_edit_payment.config(state=tk.DISABLED)
             
-            conn.close()
         except Exception as e:
-            messagebox.showerror("错误", f"数据加载失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            self._on_load_error(e)
+
+    def _draw_projection(self):
+        """画出各月预计租金柱状图"""
+        canvas = self.projection_canvas
+        if not self.projection or not is_alive(canvas):
+            return
+        months = self.projection['months']
+        total = sum(amount for _, amount, _ in months)
+        text = f"合计 ¥{total:,.0f}"
+        if self.projection['arrears_count']:
+            text += f"    逾期未交 {self.projection['arrears_count']} 笔 ¥{self.projection['arrears']:,.0f}"
+        self.lbl_projection.config(text=text)
+
+        canvas.delete('all')
+        width = max(canvas.winfo_width(), 300)
+        height = int(canvas['height'])
+        top, bottom = 20, height - 22
+        peak = max((amount for _, amount, _ in months), default=0) or 1
+        slot = width / len(months)
+        for i, (label, amount, count) in enumerate(months):
+            x0 = i * slot + slot * 0.2
+            x1 = (i + 1) * slot - slot * 0.2
+            y = bottom - (bottom - top) * amount / peak
+            canvas.create_rectangle(x0, y, x1, bottom, fill=COLORS['primary'], outline='')
+            if amount:
+                canvas.create_text((x0 + x1) / 2, y - 8, text=f"{amount / 10000:.1f}万" if amount >= 10000 else f"{amount:,.0f}",
+                                   font=('Microsoft YaHei UI', 8), fill=COLORS['text'])
+            canvas.create_text((x0 + x1) / 2, bottom + 11, text=label[2:], font=('Microsoft YaHei UI', 8),
+                               fill=COLORS['text_light'])
+
+
+# 仪表盘数据缓存：user_id -> ((user_id, 系统日期, 写入序号), 数据)
+# 切回仪表盘时若数据库没有写入、日期也没改，直接用上次的结果
+_summary_cache = {}
+
+
+def _query_dashboard(user_id, current_date):
+    """仪表盘查询（在后台线程执行，只读数据库，不触碰控件）"""
+    c = get_conn().cursor()
+
+    # 1. 基础统计（含累计租金），一条语句算出
+    c.execute(queries.DASHBOARD_SUMMARY, (user_id,))
+    total_rooms, total_cost, active_contracts, monthly_income, total_received = c.fetchone()
+
+    # 2. 即将到期合同（7天内）
+    end_date_limit = current_date + datetime.timedelta(days=7)
+    c.execute(queries.DASHBOARD_EXPIRING, (user_id, end_date_limit.isoformat()))
+    expiring = c.fetchall()
+
+    # 3. 租金催缴提醒（按 next_due_date 索引范围查询）
+    due_limit = current_date + datetime.timedelta(days=RENT_REMINDER_DAYS)
+    c.execute(queries.DASHBOARD_RENT_DUE, (user_id, due_limit.isoformat()))
+    rent_due = c.fetchall()
+
+    # 4. 未来12个月预计租金（未结束的合同一次查出后在内存中推算）
+    c.execute(queries.PROJECTION_CONTRACTS, (user_id,))
+    projection = project(c.fetchall(), current_date, 12)
+
+    return {
+        'current_date': current_date,
+        'total_rooms': total_rooms,
+        'active_contracts': active_contracts,
+        'total_cost': total_cost,
+        'monthly_income': monthly_income,
+        'total_received': total_received,
+        'expiring': expiring,
+        'rent_due': rent_due,
+        'projection': projection,
+    }
+
+def _expiring_items(rows, current_date):
+    """即将到期合同逐行转成列表显示的 (iid, values, tags)"""
+    for r_name, rt_name, end_str, cid in rows:
+        end_date = datetime.date.fromisoformat(end_str) if end_str else None
+        days_left = (end_date - current_date).days if end_date else 0
+        yield cid, (r_name, rt_name, end_str, f"{days_left}天"), ()
+
+
+def _payment_items(rows, current_date):
+    """租金催缴逐行转成列表显示的行（查询已按 next_due_date 过滤，这里只计算显示文字）"""
+    for cid, room_name, renter_name, rent, due_str in rows:
+        try:
+            due_date = datetime.date.fromisoformat(due_str)
+        except (TypeError, ValueError):
+            continue
+        # 计算剩余天数
+        days_diff = (due_date - current_date).days
+        if days_diff < 0:
+            day_str = f"已逾期{abs(days_diff)}天"
+        else:
+            day_str = f"剩余{days_diff}天"
+        yield cid, (room_name, renter_name, due_date.isoformat(), day_str, f"¥{rent or 0:,.2f}", cid), ()
 
 # 主程序入口适配
 def create_dashboard_page(content, user_id, to_room_page_callback=None):
     manager = DashboardManager(content, user_id, to_room_page_callback)
-    manager.create_page()
\ No newline at end of file
+    manager.create_page()
+    return manager
\ No newline at end of file
@@ -1,19 +1,50 @@
 # database.py
 """数据库模块 - 包含数据库初始化和数据操作"""
 
-import sqlite3
 import datetime
+import sqlite3
 import warnings
-import calendar
+from db import get_conn, transaction
+import events
 warnings.filterwarnings("ignore", category=UserWarning)
 
+# 迁移注册表：[(版本号, 说明, 迁移函数)]，按版本号升序执行
+# 当前版本记录在 PRAGMA user_version 中，新增迁移只需追加函数，不要修改已发布的迁移
+MIGRATIONS = []
+
+def migration(version, description):
+    """注册一个数据库迁移"""
+    def decorator(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return decorator
+
+def schema_version():
+    """当前数据库结构版本"""
+    return get_conn().execute("PRAGMA user_version").fetchone()[0]
+
 def init_db():
-    conn = sqlite3.connect('landlord.db')
-    # Register date adapter to avoid deprecation warning
-    sqlite3.register_adapter(datetime.date, lambda val: val.isoformat())
-    sqlite3.register_converter("DATE", lambda val: datetime.date.fromisoformat(val.decode()))
-    c = conn.cursor()
-    
+    """初始化数据库：结构已是最新时只读取一次 user_version"""
+    conn = get_conn()
+    current = schema_version()
+    if not MIGRATIONS or current >= MIGRATIONS[-1][0]:
+        return
+    for version, description, fn in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"升级数据库: v{version} {description}...")
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fn(conn.cursor())
+            conn.execute(f"PRAGMA user_version={int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+@migration(1, "基础表结构")
+def _migrate_base_schema(c):
     # 用户表
     c.execute('''CREATE TABLE IF NOT EXISTS user (
                  id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -109,7 +140,7 @@ def init_db():
                  FOREIGN KEY(linked_renter_id) REFERENCES renter(renter_id) ON DELETE CASCADE,
                  UNIQUE(renter_id, linked_renter_id))''')
     
-    # ========== 数据库升级部分 ==========
+    # ========== 旧版数据库升级部分（引入版本号之前创建的数据库） ==========
     
     # 升级合同表：添加 payment_method
     c.execute("PRAGMA table_info(contract)")
@@ -148,26 +179,95 @@ def init_db():
     c.execute("SELECT COUNT(*) FROM user")
     if c.fetchone()[0] == 0:
         c.execute("INSERT INTO user (user, password) VALUES (?,?)", ("admin", "admin123"))
-    
-    conn.commit()
-    conn.close()
 
-def update_all_costs(user_id):
-    """更新所有成本数据和房间数统计"""
-    import sqlite3
-    conn = sqlite3.connect('landlord.db')
-    c = conn.cursor()
-    uid = user_id
+@migration(2, "为常用查询条件和关联字段建立索引")
+def _migrate_indexes(c):
+    for sql in (
+        "CREATE INDEX IF NOT EXISTS idx_house_user ON house(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_room_user ON room(user_id, room_cost)",
+        "CREATE INDEX IF NOT EXISTS idx_room_house ON room(house_id)",
+        "CREATE INDEX IF NOT EXISTS idx_furniture_user_room ON furniture(user_id, room_id, furniture_id)",
+        "CREATE INDEX IF NOT EXISTS idx_furniture_room ON furniture(room_id)",
+        "CREATE INDEX IF NOT EXISTS idx_contract_user_status_end ON contract(user_id, status, end_date)",
+        "CREATE INDEX IF NOT EXISTS idx_contract_room_status ON contract(room_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_contract_renter_status ON contract(renter_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_renter_user ON renter(user_id)",
+        "CREATE INDEX IF NOT EXISTS idx_renter_contract ON renter(contract_id)",
+        "CREATE INDEX IF NOT EXISTS idx_renter_link_linked ON renter_link(linked_renter_id)",
+        "CREATE INDEX IF NOT EXISTS idx_blacklist_renter ON blacklist(renter_id)",
+    ):
+        c.execute(sql)
+
+# 家具增删改 -> 房间家具数/成本；房间增删改 -> 楼栋房间数/成本
+# 家具触发器更新 room_cost 时会连带触发房间触发器，因此一次家具保存只触及一行家具、一个房间和一栋楼
+COST_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS trg_furniture_cost_ai AFTER INSERT ON furniture
+       BEGIN
+           UPDATE room SET furniture_count = IFNULL(furniture_count, 0) + 1,
+                           room_cost = IFNULL(room_cost, 0) + IFNULL(NEW.total_cost, 0)
+           WHERE room_id = NEW.room_id AND user_id = NEW.user_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_furniture_cost_ad AFTER DELETE ON furniture
+       BEGIN
+           UPDATE room SET furniture_count = IFNULL(furniture_count, 0) - 1,
+                           room_cost = IFNULL(room_cost, 0) - IFNULL(OLD.total_cost, 0)
+           WHERE room_id = OLD.room_id AND user_id = OLD.user_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_furniture_cost_au AFTER UPDATE OF room_id, user_id, total_cost ON furniture
+       WHEN OLD.room_id IS NOT NEW.room_id OR OLD.user_id IS NOT NEW.user_id OR OLD.total_cost IS NOT NEW.total_cost
+       BEGIN
+           UPDATE room SET furniture_count = IFNULL(furniture_count, 0) - 1,
+                           room_cost = IFNULL(room_cost, 0) - IFNULL(OLD.total_cost, 0)
+           WHERE room_id = OLD.room_id AND user_id = OLD.user_id;
+           UPDATE room SET furniture_count = IFNULL(furniture_count, 0) + 1,
+                           room_cost = IFNULL(room_cost, 0) + IFNULL(NEW.total_cost, 0)
+           WHERE room_id = NEW.room_id AND user_id = NEW.user_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_room_cost_ai AFTER INSERT ON room
+       BEGIN
+           UPDATE house SET room_count = IFNULL(room_count, 0) + 1,
+                            house_cost = IFNULL(house_cost, 0) + IFNULL(NEW.room_cost, 0)
+           WHERE house_id = NEW.house_id AND user_id = NEW.user_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_room_cost_ad AFTER DELETE ON room
+       BEGIN
+           UPDATE house SET room_count = IFNULL(room_count, 0) - 1,
+                            house_cost = IFNULL(house_cost, 0) - IFNULL(OLD.room_cost, 0)
+           WHERE house_id = OLD.house_id AND user_id = OLD.user_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_room_cost_au AFTER UPDATE OF house_id, user_id, room_cost ON room
+       WHEN OLD.house_id IS NOT NEW.house_id OR OLD.user_id IS NOT NEW.user_id OR OLD.room_cost IS NOT NEW.room_cost
+       BEGIN
+           UPDATE house SET room_count = IFNULL(room_count, 0) - 1,
+                            house_cost = IFNULL(house_cost, 0) - IFNULL(OLD.room_cost, 0)
+           WHERE house_id = OLD.house_id AND user_id = OLD.user_id;
+           UPDATE house SET room_count = IFNULL(room_count, 0) + 1,
+                            house_cost = IFNULL(house_cost, 0) + IFNULL(NEW.room_cost, 0)
+           WHERE house_id = NEW.house_id AND user_id = NEW.user_id;
+       END""",
+)
+
+@migration(3, "用触发器增量维护家具/房间/楼栋的数量和成本")
+def _migrate_cost_triggers(c):
+    for sql in COST_TRIGGERS:
+        c.execute(sql)
+    # 建立触发器前的数据可能不一致，全量重算一次作为基线
+    c.execute("SELECT id FROM user")
+    for (uid,) in c.fetchall():
+        _rebuild_costs(c, uid)
+
+def _rebuild_costs(c, uid):
+    """全量重算指定用户的成本和数量统计"""
     # 1. 更新家具总成本
     c.execute("UPDATE furniture SET total_cost = count * furniture_cost WHERE user_id=?", (uid,))
-    
+
     # 2. 更新房间的家具数和成本
     # 注意：这里统计家具数和成本时不限制房间状态，只要房间存在就计算其所属家具
     c.execute("""UPDATE room SET
                  furniture_count = (SELECT COUNT(*) FROM furniture WHERE room_id = room.room_id AND room.user_id = furniture.user_id),
                  room_cost = (SELECT IFNULL(SUM(total_cost), 0) FROM furniture WHERE room_id = room.room_id AND room.user_id = furniture.user_id)
                  WHERE user_id=?""", (uid,))
-    
+
     # 3. 更新楼栋的房间数和成本
     # 【关键修改】更新 room_count 时，不再限制 room_status
     # 统计所有属于该楼栋的房间数，确保添加或删除任何房间后楼栋房间数都会变化
@@ -175,5 +275,225 @@ def update_all_costs(user_id):
                  room_count = (SELECT COUNT(*) FROM room WHERE room.house_id = house.house_id AND room.user_id = house.user_id),
                  house_cost = (SELECT IFNULL(SUM(room_cost), 0) FROM room WHERE room.house_id = house.house_id AND room.user_id = house.user_id)
                  WHERE user_id=?""", (uid,))
-    conn.commit()
-    conn.close()
+
+def update_all_costs(user_id):
+    """全量重算所有成本数据和房间数统计（日常由触发器增量维护，此函数用于修复数据）"""
+    with transaction() as c:
+        _rebuild_costs(c, user_id)
+
+# 合同下次应交租日期 = 已付截止日期，未交过租时为合同开始日期
+# 新增合同、修改开始日期或登记交租时由触发器同步，租金催缴提醒只需按该列做一次索引范围查询
+DUE_DATE_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS trg_contract_due_ai AFTER INSERT ON contract
+       BEGIN
+           UPDATE contract SET next_due_date = COALESCE(NEW.paid_until_date, NEW.start_date)
+           WHERE contract_id = NEW.contract_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_contract_due_au AFTER UPDATE OF paid_until_date, start_date ON contract
+       WHEN NEW.next_due_date IS NOT COALESCE(NEW.paid_until_date, NEW.start_date)
+       BEGIN
+           UPDATE contract SET next_due_date = COALESCE(NEW.paid_until_date, NEW.start_date)
+           WHERE contract_id = NEW.contract_id;
+       END""",
+)
+
+@migration(4, "合同增加下次交租日期字段，用于租金催缴提醒")
+def _migrate_next_due_date(c):
+    c.execute("PRAGMA table_info(contract)")
+    if 'next_due_date' not in [col[1] for col in c.fetchall()]:
+        c.execute("ALTER TABLE contract ADD COLUMN next_due_date DATE")
+    c.execute("UPDATE contract SET next_due_date = COALESCE(paid_until_date, start_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_contract_user_status_due ON contract(user_id, status, next_due_date)")
+    for sql in DUE_DATE_TRIGGERS:
+        c.execute(sql)
+
+@migration(5, "为合同状态自动流转建立索引")
+def _migrate_status_indexes(c):
+    c.execute("CREATE INDEX IF NOT EXISTS idx_contract_status_start ON contract(status, start_date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_contract_status_end ON contract(status, end_date)")
+
+def advance_contract_status(today=None):
+    """按日期批量推进合同状态（只向前推进）：到期的合同 -> 已终止，已到开始日期的待开始合同 -> 履行中
+
+    返回 (开始履行数, 到期终止数)。每种流转一条走索引的 UPDATE，不逐条判断。
+    """
+    today = (today or datetime.date.today()).isoformat()
+    with transaction() as c:
+        # end_date > '' 排除未填写结束日期的合同，同时让范围条件两端都能走索引
+        c.execute("""UPDATE contract SET status='已终止'
+                     WHERE status IN ('待开始', '履行中') AND end_date > '' AND end_date < ?""", (today,))
+        ended = c.rowcount
+        c.execute("""UPDATE contract SET status='履行中'
+                     WHERE status='待开始' AND start_date <= ?""", (today,))
+        started = c.rowcount
+    if started or ended:
+        events.publish(events.CONTRACT, None, events.UPDATE)
+    return started, ended
+
+# 全文搜索索引 search_index：rowid = 主键 * 8 + 类型编号，增删改时按 rowid 定位，不需要扫描索引表
+# (类型编号, 表, 主键, 标题表达式, 详情表达式, 触发更新的字段)
+SEARCH_SOURCES = (
+    (1, 'house', 'house_id', "{r}.house_name", "IFNULL({r}.house_add, '')",
+     ('user_id', 'house_name', 'house_add')),
+    (2, 'room', 'room_id', "{r}.room_name", "''",
+     ('user_id', 'room_name')),
+    (3, 'renter', 'renter_id', "{r}.renter_name",
+     "IFNULL({r}.renter_tel, '') || ' ' || IFNULL({r}.renter_wechat, '') || ' ' || IFNULL({r}.note, '')",
+     ('user_id', 'renter_name', 'renter_tel', 'renter_wechat', 'note')),
+    (4, 'contract', 'contract_id', "'合同 #' || {r}.contract_id", "IFNULL({r}.note, '')",
+     ('user_id', 'note')),
+    (5, 'furniture', 'furniture_id', "{r}.furniture", "IFNULL({r}.note, '')",
+     ('user_id', 'furniture', 'note')),
+)
+
+def _search_index_sql():
+    """生成全文搜索索引的触发器和初始数据语句"""
+    triggers, backfill = [], []
+    for kind, table, pk, title, detail, columns in SEARCH_SOURCES:
+        def insert(r):
+            return (f"INSERT INTO search_index (rowid, user_id, title, detail) "
+                    f"VALUES ({r}.{pk} * 8 + {kind}, {r}.user_id, {title.format(r=r)}, {detail.format(r=r)});")
+        delete = f"DELETE FROM search_index WHERE rowid = OLD.{pk} * 8 + {kind};"
+        triggers.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_search_ai AFTER INSERT ON {table}
+            BEGIN {insert('NEW')} END""")
+        triggers.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_search_ad AFTER DELETE ON {table}
+            BEGIN {delete} END""")
+        triggers.append(f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_search_au AFTER UPDATE OF {', '.join(columns)} ON {table}
+            BEGIN {delete} {insert('NEW')} END""")
+        backfill.append(f"""INSERT INTO search_index (rowid, user_id, title, detail)
+            SELECT t.{pk} * 8 + {kind}, t.user_id, {title.format(r='t')}, {detail.format(r='t')} FROM {table} t""")
+    return triggers, backfill
+
+@migration(6, "建立楼栋/房间/租客/合同/家具的全文搜索索引")
+def _migrate_search_index(c):
+    try:
+        # trigram 分词对中文和电话号码等任意子串都能命中
+        c.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS search_index
+                     USING fts5(user_id UNINDEXED, title, detail, tokenize='trigram')""")
+    except sqlite3.OperationalError:
+        # SQLite 未编译 FTS5 或版本低于 3.34：退化为普通表，搜索时逐行匹配
+        print("当前 SQLite 不支持 FTS5 trigram，搜索将使用逐行匹配")
+        c.execute("""CREATE TABLE IF NOT EXISTS search_index (
+                     id INTEGER PRIMARY KEY, user_id INTEGER, title TEXT, detail TEXT)""")
+    triggers, backfill = _search_index_sql()
+    c.execute("DELETE FROM search_index")
+    for sql in backfill + triggers:
+        c.execute(sql)
+
+# 租客分组：通过 renter_link 关联在一起的租客为一组，group_id 取组内主租客（自己没有再关联别人的租客）的 renter_id；
+# 合同分配按组一次更新，租客列表按组连接取关联信息
+RENTER_GROUP_TRIGGER = """CREATE TRIGGER IF NOT EXISTS trg_renter_group_ai AFTER INSERT ON renter
+    WHEN NEW.group_id IS NULL
+    BEGIN UPDATE renter SET group_id = NEW.renter_id WHERE renter_id = NEW.renter_id; END"""
+
+def regroup_renters(c, renter_ids=None):
+    """关联/解除关联后重新计算分组：renter_ids 所在的整组都重算（None 表示全部租客），返回分组有变化的租客数"""
+    if renter_ids is None:
+        scope, params = "", ()
+    else:
+        marks = ', '.join('?' * len(renter_ids))
+        scope = f"WHERE group_id IN (SELECT group_id FROM renter WHERE renter_id IN ({marks})) OR renter_id IN ({marks})"
+        params = tuple(renter_ids) * 2
+    # 沿 renter_link 向上找到主租客；关联成环时没有主租客，取环内最小的 id
+    c.execute(f"""
+        WITH RECURSIVE up(start, id) AS (
+            SELECT renter_id, renter_id FROM renter {scope}
+            UNION
+            SELECT up.start, rl.linked_renter_id FROM up JOIN renter_link rl ON rl.renter_id = up.id
+        )
+        SELECT COALESCE(MIN(CASE WHEN NOT EXISTS (SELECT 1 FROM renter_link l WHERE l.renter_id = up.id)
+                                 THEN up.id END), MIN(up.id)), start
+        FROM up GROUP BY start""", params)
+    changes = c.fetchall()
+    c.executemany("UPDATE renter SET group_id=? WHERE renter_id=? AND group_id IS NOT ?",
+                  [(group_id, renter_id, group_id) for group_id, renter_id in changes])
+    return c.rowcount
+
+def assign_group_contract(c, renter_id, contract_id):
+    """把合同分配给租客所在的整组（contract_id 为 None 时清空）"""
+    c.execute("""UPDATE renter SET contract_id=?
+                 WHERE group_id = (SELECT group_id FROM renter WHERE renter_id=?)""", (contract_id, renter_id))
+
+@migration(7, "租客增加分组字段，关联租客按组分配合同")
+def _migrate_renter_group(c):
+    c.execute("ALTER TABLE renter ADD COLUMN group_id INTEGER")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_renter_group ON renter(group_id)")
+    c.execute(RENTER_GROUP_TRIGGER)
+    # 删除租客后遗留的关联记录不再参与分组
+    c.execute("""DELETE FROM renter_link
+                 WHERE renter_id NOT IN (SELECT renter_id FROM renter)
+                    OR linked_renter_id NOT IN (SELECT renter_id FROM renter)""")
+    regroup_renters(c)
+
+# 收租流水：每次收租一行，合同的 paid_until_date（已付截止日期）和 total_rent/total_cash（累计租金/实收）由触发器从流水维护
+PAYMENT_TRIGGERS = (
+    """CREATE TRIGGER IF NOT EXISTS trg_payment_ai AFTER INSERT ON payment
+       BEGIN
+           UPDATE contract SET total_rent = IFNULL(total_rent, 0) + NEW.amount,
+                               total_cash = IFNULL(total_cash, 0) + NEW.amount,
+                               paid_until_date = CASE WHEN paid_until_date IS NULL OR NEW.period_end > paid_until_date
+                                                      THEN NEW.period_end ELSE paid_until_date END
+           WHERE contract_id = NEW.contract_id;
+       END""",
+    # 删除流水后已付截止日期退回到剩余流水的最晚日期，没有流水时回到开始日期前一天
+    """CREATE TRIGGER IF NOT EXISTS trg_payment_ad AFTER DELETE ON payment
+       BEGIN
+           UPDATE contract SET total_rent = IFNULL(total_rent, 0) - OLD.amount,
+                               total_cash = IFNULL(total_cash, 0) - OLD.amount,
+                               paid_until_date = COALESCE(
+                                   (SELECT MAX(period_end) FROM payment WHERE contract_id = OLD.contract_id),
+                                   date(start_date, '-1 day'))
+           WHERE contract_id = OLD.contract_id;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS trg_payment_au AFTER UPDATE OF contract_id, period_end, amount ON payment
+       BEGIN
+           UPDATE contract SET total_rent = IFNULL(total_rent, 0) - OLD.amount,
+                               total_cash = IFNULL(total_cash, 0) - OLD.amount,
+                               paid_until_date = COALESCE(
+                                   (SELECT MAX(period_end) FROM payment WHERE contract_id = OLD.contract_id),
+                                   date(start_date, '-1 day'))
+           WHERE contract_id = OLD.contract_id;
+           UPDATE contract SET total_rent = IFNULL(total_rent, 0) + NEW.amount,
+                               total_cash = IFNULL(total_cash, 0) + NEW.amount,
+                               paid_until_date = (SELECT MAX(period_end) FROM payment WHERE contract_id = NEW.contract_id)
+           WHERE contract_id = NEW.contract_id;
+       END""",
+)
+
+@migration(8, "增加收租流水表，已付截止日期和累计租金由流水维护")
+def _migrate_payment_ledger(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS payment (
+                 payment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                 user_id INTEGER NOT NULL,
+                 contract_id INTEGER NOT NULL,
+                 period_start DATE,
+                 period_end DATE NOT NULL,
+                 amount REAL NOT NULL DEFAULT 0,
+                 paid_date DATE NOT NULL,
+                 note TEXT,
+                 FOREIGN KEY(contract_id) REFERENCES contract(contract_id) ON DELETE CASCADE)''')
+    # 合同的收租历史；按月汇总收入走 (user_id, paid_date) 范围扫描，amount 在索引内不用回表
+    c.execute("CREATE INDEX IF NOT EXISTS idx_payment_contract ON payment(contract_id, period_end)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_payment_user_paid ON payment(user_id, paid_date, amount)")
+    # 已有合同：把已付截止日期和已交租金结转为一条期初流水（触发器建立之前写入，不会重复累加）
+    # 交租日期记为合同开始日期：last_payment_date 是新增合同时填的开始日期前一期，记在那天会把收入算到合同开始之前
+    c.execute("""INSERT INTO payment (user_id, contract_id, period_start, period_end, amount, paid_date, note)
+                 SELECT user_id, contract_id, start_date, COALESCE(paid_until_date, date(start_date, '-1 day')),
+                        IFNULL(total_rent, 0), COALESCE(start_date, paid_until_date), '期初结转'
+                 FROM contract
+                 WHERE COALESCE(paid_until_date, start_date) IS NOT NULL
+                   AND (paid_until_date >= start_date OR IFNULL(total_rent, 0) <> 0)""")
+    for sql in PAYMENT_TRIGGERS:
+        c.execute(sql)
+
+@migration(9, "为房间/合同列表的排序建立索引，分页不再整表排序")
+def _migrate_list_order_indexes(c):
+    # 房间列表按 (楼栋, 房间名, ID) 排序，合同列表按 ID 排序：索引顺序即列表顺序，LIMIT/OFFSET 分页直接按索引读取
+    c.execute("CREATE INDEX IF NOT EXISTS idx_room_user_house_name ON room(user_id, house_id, room_name)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_contract_user ON contract(user_id)")
+
+@migration(10, "期初结转流水的交租日期改为合同开始日期")
+def _migrate_opening_paid_date(c):
+    # 早先的第 8 步把期初流水记在 last_payment_date（开始日期前一期），按月汇总时收入落在合同开始之前的月份
+    c.execute("""UPDATE payment SET paid_date = COALESCE(period_start, period_end)
+                 WHERE note = '期初结转' AND paid_date IS NOT COALESCE(period_start, period_end)""")
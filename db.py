@@ -0,0 +1,112 @@
+# db.py
+"""数据库连接模块 - 统一管理 SQLite 连接和性能参数"""
+
+import os
+import sqlite3
+import datetime
+import threading
+from contextlib import contextmanager
+
+from config import DB_PATH, DB_PRAGMAS, DB_STATEMENT_CACHE, DB_BUSY_TIMEOUT
+import querylog
+
+# 日期适配器（原先在 init_db 中注册）
+sqlite3.register_adapter(datetime.date, lambda val: val.isoformat())
+sqlite3.register_converter("DATE", lambda val: datetime.date.fromisoformat(val.decode()))
+
+_local = threading.local()
+_lock = threading.Lock()
+_connections = []
+_generation = 0
+_write_serial = 0
+_background_commits = 0
+_db_path = os.environ.get('HOUSEHUNTER_DB', DB_PATH)
+
+
+def set_db_path(path):
+    """切换数据库文件（会关闭已打开的连接）"""
+    global _db_path
+    close_all()
+    _db_path = path
+    _bump_write_serial()
+
+
+def get_db_path():
+    """当前数据库文件路径"""
+    return _db_path
+
+
+def _open(path):
+    """打开连接并应用 PRAGMA"""
+    conn = sqlite3.connect(path, timeout=DB_BUSY_TIMEOUT / 1000,
+                           cached_statements=DB_STATEMENT_CACHE,
+                           check_same_thread=False,
+                           factory=querylog.connection_factory())
+    c = sqlite3.Cursor(conn)   # 连接参数用基类游标设置，不计入查询统计
+    c.execute(f"PRAGMA busy_timeout={int(DB_BUSY_TIMEOUT)}")
+    for name, value in DB_PRAGMAS:
+        c.execute(f"PRAGMA {name}={value}")
+    c.close()
+    return conn
+
+
+def get_conn():
+    """获取当前线程共享的连接（每个线程一个，首次使用时创建）"""
+    conn = getattr(_local, 'conn', None)
+    if conn is None or getattr(_local, 'generation', None) != _generation:
+        conn = _open(_db_path)
+        _local.conn = conn
+        _local.generation = _generation
+        with _lock:
+            _connections.append(conn)
+    return conn
+
+
+@contextmanager
+def transaction():
+    """事务上下文：正常结束提交，异常时回滚"""
+    conn = get_conn()
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    _bump_write_serial(background=threading.current_thread() is not threading.main_thread())
+
+
+def _bump_write_serial(background=False):
+    global _write_serial, _background_commits
+    with _lock:
+        _write_serial += 1
+        if background:
+            _background_commits += 1
+
+
+def write_serial():
+    """写入序号 - 每次通过 transaction() 提交后递增，可作为缓存失效的版本号"""
+    return _write_serial
+
+
+def background_commits():
+    """非主线程通过 transaction() 提交的次数（主线程连接的 data_version 会因这些提交而变化）"""
+    return _background_commits
+
+
+def note_external_change():
+    """其他进程修改了数据库：递增写入序号，使按写入序号缓存的数据失效"""
+    _bump_write_serial()
+
+
+def close_all():
+    """关闭所有线程打开的连接"""
+    global _generation
+    with _lock:
+        _generation += 1
+        conns = list(_connections)
+        _connections.clear()
+    for conn in conns:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
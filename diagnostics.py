@@ -0,0 +1,98 @@
+# diagnostics.py
+"""性能诊断窗口 - 按查询汇总耗时分位数、返回行数和调用位置，可开关查询计时、调整慢查询阈值"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+from config import COLORS, SLOW_QUERY_LOG
+from widgets import WeChatButton, is_alive
+from worker import run_async
+import querylog
+
+REFRESH_MS = 2000
+
+
+def open_diagnostics(master):
+    """打开诊断窗口（开启计时期间每 2 秒自动刷新）"""
+    from dialogs import center_window
+    win = tk.Toplevel(master)
+    win.title("性能诊断")
+    center_window(win, 1000, 520, master)
+    win.configure(bg=COLORS['bg'])
+    win.transient(master)
+
+    top = tk.Frame(win, bg=COLORS['bg'])
+    top.pack(fill='x', padx=15, pady=(15, 5))
+    status = tk.Label(top, bg=COLORS['bg'], fg=COLORS['text'], font=('Microsoft YaHei UI', 10, 'bold'))
+    status.pack(side='left')
+    tk.Label(top, text="慢查询阈值(ms)", bg=COLORS['bg'], font=('Microsoft YaHei UI', 9)).pack(side='left', padx=(20, 5))
+    e_slow = tk.Entry(top, width=8)
+    e_slow.insert(0, str(querylog.slow_threshold()))
+    e_slow.pack(side='left')
+
+    columns = [("sql", "查询", 380, 'w'), ("caller", "调用位置", 220, 'w'), ("count", "次数", 60, 'center'),
+               ("rows", "行数", 70, 'center'), ("p50", "p50(ms)", 70, 'center'), ("p95", "p95(ms)", 70, 'center'),
+               ("max", "最大(ms)", 70, 'center'), ("total", "总计(ms)", 80, 'center')]
+    tree = ttk.Treeview(win, columns=[c[0] for c in columns], show="headings")
+    for col, text, width, anchor in columns:
+        tree.heading(col, text=text)
+        tree.column(col, width=width, anchor=anchor)
+    tree.pack(fill='both', expand=True, padx=15, pady=5)
+    sqls = {}
+
+    def show_sql(event=None):
+        sel = tree.selection()
+        if sel:
+            messagebox.showinfo("查询", sqls.get(sel[0], ''), parent=win)
+
+    tree.bind("<Double-1>", show_sql)
+
+    def refresh():
+        on = querylog.enabled()
+        status.config(text="查询计时: 已开启" if on else "查询计时: 未开启（开启后新查询才会记录）")
+        toggle.config(text="关闭计时" if on else "开启计时")
+        tree.delete(*tree.get_children())
+        sqls.clear()
+        for i, item in enumerate(querylog.summary()):
+            iid = str(i)
+            sqls[iid] = item['sql']
+            tree.insert("", "end", iid=iid, values=(
+                item['sql'][:120], item['caller'], item['count'], item['rows'],
+                f"{item['p50_ms']:.1f}", f"{item['p95_ms']:.1f}", f"{item['max_ms']:.1f}", f"{item['total_ms']:.0f}"))
+
+    def auto_refresh():
+        if not is_alive(win):
+            return
+        if querylog.enabled():
+            refresh()
+        win.after(REFRESH_MS, auto_refresh)
+
+    def toggle_log():
+        # 切换会重建连接，放到数据库线程中执行，避免关闭正在查询的连接
+        run_async(querylog.set_enabled, not querylog.enabled(),
+                  on_done=lambda _: is_alive(win) and refresh())
+
+    def apply_threshold():
+        try:
+            querylog.set_slow_threshold(float(e_slow.get().strip()))
+        except ValueError:
+            messagebox.showerror("错误", "阈值应为数字", parent=win)
+            return
+        messagebox.showinfo("提示", f"超过 {querylog.slow_threshold():g} ms 的查询将写入 {SLOW_QUERY_LOG}", parent=win)
+
+    def clear():
+        querylog.reset()
+        refresh()
+
+    btns = tk.Frame(win, bg=COLORS['bg'])
+    btns.pack(fill='x', padx=15, pady=(5, 15))
+    toggle = WeChatButton(btns, text="开启计时", command=toggle_log, width=12)
+    toggle.pack(side='left', padx=5)
+    WeChatButton(btns, text="刷新", command=refresh, width=10).pack(side='left', padx=5)
+    WeChatButton(btns, text="清空统计", command=clear, width=10).pack(side='left', padx=5)
+    WeChatButton(btns, text="应用阈值", command=apply_threshold, width=10).pack(side='left', padx=5)
+    tk.Label(btns, text="双击查看完整 SQL", bg=COLORS['bg'], fg="#888",
+             font=('Microsoft YaHei UI', 9)).pack(side='right')
+
+    refresh()
+    win.after(REFRESH_MS, auto_refresh)
+    return win
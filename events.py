@@ -0,0 +1,106 @@
+# events.py
+"""数据变更事件 - 写入数据后发布 (实体, ID, 类型)，页面只订阅自己显示的实体
+
+同一轮 Tk 空闲周期内的多次变更合并后只通知一次，连续保存、批量删除只触发一次刷新。
+"""
+
+import threading
+from collections import namedtuple
+
+# 实体：与数据表对应；payment 为收租流水
+HOUSE, ROOM, FURNITURE, RENTER, CONTRACT, PAYMENT = 'house', 'room', 'furniture', 'renter', 'contract', 'payment'
+ENTITIES = (HOUSE, ROOM, FURNITURE, RENTER, CONTRACT, PAYMENT)
+# 变更类型
+INSERT, UPDATE, DELETE = 'insert', 'update', 'delete'
+
+# entity_id 为 None 表示批量变更（导入、按日期推进状态等）
+Change = namedtuple('Change', 'entity entity_id kind')
+
+
+class EventBus:
+    """发布/订阅总线
+
+    publish 可以在任意线程调用；回调总是在 Tk 主线程的空闲回调中执行，参数为本轮合并的变更列表。
+    未绑定 Tk 根窗口时（命令行工具）变更立即同步通知。
+    """
+
+    def __init__(self):
+        self.root = None
+        self._subscribers = {}
+        self._next_token = 0
+        self._pending = []
+        self._lock = threading.Lock()
+        self._scheduled = False
+
+    def bind(self, root):
+        """绑定 Tk 根窗口（之后的通知在主线程空闲时合并执行）"""
+        self.root = root
+
+    def unbind(self):
+        self.root = None
+        with self._lock:
+            self._pending.clear()
+        self._scheduled = False
+
+    def subscribe(self, entities, fn):
+        """订阅实体变更 fn(changes)，返回用于取消订阅的令牌"""
+        for entity in entities:
+            if entity not in ENTITIES:
+                raise ValueError(f"未知实体: {entity}")
+        self._next_token += 1
+        self._subscribers[self._next_token] = (frozenset(entities), fn)
+        return self._next_token
+
+    def unsubscribe(self, token):
+        self._subscribers.pop(token, None)
+
+    def publish(self, entity, entity_id=None, kind=UPDATE):
+        """发布一条变更"""
+        if entity not in ENTITIES:
+            raise ValueError(f"未知实体: {entity}")
+        with self._lock:
+            self._pending.append(Change(entity, entity_id, kind))
+        if threading.current_thread() is threading.main_thread():
+            self.schedule()
+
+    def schedule(self):
+        """在主线程中安排一次合并通知（后台线程发布的变更由数据库执行器回到主线程后调用）"""
+        if self.root is None:
+            self.flush()
+        elif not self._scheduled and self._pending:
+            self._scheduled = True
+            self.root.after_idle(self.flush)
+
+    def flush(self):
+        """把积压的变更按订阅的实体分发，每个订阅者最多调用一次"""
+        self._scheduled = False
+        with self._lock:
+            changes, self._pending = self._pending, []
+        if not changes:
+            return
+        touched = {change.entity for change in changes}
+        for entities, fn in list(self._subscribers.values()):
+            if entities & touched:
+                try:
+                    fn([change for change in changes if change.entity in entities])
+                except Exception:
+                    # 一个页面刷新出错不影响其他订阅者
+                    import logging   # 只在出错时需要，不拖慢启动
+                    logging.getLogger('househunter.events').exception("变更通知处理失败: %r", fn)
+
+
+bus = EventBus()
+
+
+def publish(entity, entity_id=None, kind=UPDATE):
+    """发布一条数据变更（见 EventBus.publish）"""
+    bus.publish(entity, entity_id, kind)
+
+
+def subscribe(entities, fn):
+    """订阅实体变更（见 EventBus.subscribe）"""
+    return bus.subscribe(entities, fn)
+
+
+def unsubscribe(token):
+    bus.unsubscribe(token)
@@ -0,0 +1,102 @@
+# exporter.py
+"""数据导出模块 - 把楼栋、房间、家具、租客、合同列表流式导出为 CSV/JSONL
+
+使用与各页面列表相同的查询，逐行遍历游标写入文件（不 fetchall），导出再大的数据内存占用也不变。
+"""
+
+import csv
+import json
+import datetime
+from config import RENT_REMINDER_DAYS
+from db import get_conn
+from importer import detect_format
+import queries
+
+
+def mask_idcard(idcard):
+    """身份证号脱敏：保留前6位和后4位"""
+    return idcard[:6] + '********' + idcard[-4:] if idcard else ''
+
+
+def _list_params(user_id, today):
+    return (user_id,)
+
+
+def _contract_params(user_id, today):
+    due_limit = today + datetime.timedelta(days=RENT_REMINDER_DAYS)
+    return (user_id, today.isoformat(), due_limit.isoformat())
+
+
+# 类型 -> (显示名称, 查询, 参数构造函数, 可用于日期筛选的列)
+EXPORTS = {
+    'house': ('楼栋', queries.HOUSE_LIST, _list_params, ()),
+    'room': ('房间', queries.ROOM_LIST, _list_params, ()),
+    'furniture': ('家具', queries.FURNITURE_LIST, _list_params, ()),
+    'renter': ('租客', queries.RENTER_LIST, _list_params, ()),
+    'contract': ('合同', queries.CONTRACT_EXPORT, _contract_params,
+                 ('start_date', 'end_date', 'paid_until_date', 'next_due_date')),
+}
+
+
+def export_file(path, entity, user_id, fmt=None, columns=None, date_column=None,
+                date_from=None, date_to=None, mask=True, today=None):
+    """导出一类数据到文件，返回导出行数
+
+    columns 为要导出的列名（默认全部，顺序按给定顺序）；date_from/date_to 按 date_column
+    筛选（含两端，默认取该类数据的第一个日期列）；mask 为真时身份证号脱敏，与租客列表一致。
+    """
+    if entity not in EXPORTS:
+        raise ValueError(f"不支持的导出类型: {entity}")
+    _, sql, make_params, date_columns = EXPORTS[entity]
+    today = today or datetime.date.today()
+    params = make_params(user_id, today)
+
+    conditions = []
+    if date_from or date_to:
+        if not date_columns:
+            raise ValueError(f"{EXPORTS[entity][0]}没有可筛选的日期列")
+        date_column = date_column or date_columns[0]
+        if date_column not in date_columns:
+            raise ValueError(f"日期列应为 {'/'.join(date_columns)}: {date_column}")
+        # 列名来自白名单，可以直接拼入 SQL
+        if date_from:
+            conditions.append(f"{date_column} >= ?")
+            params += (date_from.isoformat(),)
+        if date_to:
+            conditions.append(f"{date_column} <= ?")
+            params += (date_to.isoformat(),)
+    if conditions:
+        # 外层筛选沿用列表查询的连接和排序，SQLite 会把条件下推到子查询中
+        sql = f"SELECT * FROM ({sql}) WHERE {' AND '.join(conditions)}"
+
+    cursor = get_conn().cursor()
+    cursor.execute(sql, params)
+    names = [d[0] for d in cursor.description]
+    if columns:
+        unknown = [col for col in columns if col not in names]
+        if unknown:
+            raise ValueError(f"没有这些列: {', '.join(unknown)}（可用: {', '.join(names)}）")
+    else:
+        columns = names
+    picks = [names.index(col) for col in columns]
+    idcard = names.index('renter_idcard') if mask and 'renter_idcard' in names else None
+
+    fmt = fmt or detect_format(path)
+    count = 0
+    # utf-8-sig 让 Excel 直接打开 CSV 时能正确识别中文
+    with open(path, 'w', encoding='utf-8-sig' if fmt == 'csv' else 'utf-8', newline='') as f:
+        writer = csv.writer(f) if fmt == 'csv' else None
+        if writer:
+            writer.writerow(columns)
+        for row in cursor:
+            if idcard is not None:
+                row = list(row)
+                row[idcard] = mask_idcard(row[idcard])
+            values = [row[i] for i in picks]
+            if writer:
+                writer.writerow(values)
+            else:
+                f.write(json.dumps(dict(zip(columns, values)), ensure_ascii=False, default=str))
+                f.write('\n')
+            count += 1
+    return count
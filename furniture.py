@@ -3,9 +3,13 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from config import COLORS
-from widgets import WeChatButton
+from db import transaction
+import queries
+import lookups
+from widgets import WeChatButton, is_alive
+from virtual_tree import VirtualTree
+import events
 
 try:
     from tkcalendar import DateEntry
@@ -19,11 +23,14 @@ except ImportError:
 class FurnitureManager:
     """家具管理器"""
     
-    def __init__(self, content, user_id, update_costs_callback):
+    # 列表显示的数据来源（房间名称）
+    TOPICS = (events.ROOM, events.FURNITURE)
+
+    def __init__(self, content, user_id):
         self.content = content
         self.user_id = user_id
-        self.update_costs_callback = update_costs_callback
         self.tree = None
+        self.list = None
         
     def create_page(self, preselected_room_id=None):
         """创建家具管理页面"""
@@ -35,7 +42,10 @@ class FurnitureManager:
 
         # 定义所有列 (ID, 房间名称, 家具名称, 数量, 单价, 总价, 备注, 房间ID)
         # 注意：columns 这里必须保留 fid 和 room_id，否则 data 索引会错位
-        self.tree = ttk.Treeview(self.content, columns=("fid","room_name","furniture_name","count","cost","total_cost","note","room_id"), show="headings", height=18)
+        self.list = VirtualTree(self.content, ("fid","room_name","furniture_name","count","cost","total_cost","note","room_id"),
+                                queries.FURNITURE_COUNT, queries.FURNITURE_LIST, (self.user_id,),
+                                position_sql=queries.FURNITURE_POSITION)
+        self.tree = self.list.tree
         
         # 【修改】只配置可见列的标题和宽度
         visible_cols = [
@@ -54,7 +64,7 @@ class FurnitureManager:
         self.tree.column("fid", width=0, stretch=False)
         self.tree.column("room_id", width=0, stretch=False)
         
-        self.tree.pack(fill='both', expand=True, padx=30, pady=10)
+        self.list.pack(fill='both', expand=True, padx=30, pady=10)
 
         btns = tk.Frame(self.content, bg=COLORS['bg'])
         btns.pack(pady=10)
@@ -68,26 +78,14 @@ class FurnitureManager:
 
     def load_furnitures(self):
         """加载家具数据"""
-        try:
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            
-            # 【修改】排序逻辑：先按房间ID (RID) 分组，再按家具ID (fid) 从小到大排序
-            c.execute("""
-                SELECT f.furniture_id, r.room_name, f.furniture, f.count, f.furniture_cost, f.total_cost, f.note, f.room_id
-                FROM furniture f
-                LEFT JOIN room r ON f.room_id = r.room_id
-                WHERE f.user_id=?
-                ORDER BY f.room_id ASC, f.furniture_id ASC
-            """, (self.user_id,))
-            
-            for row in c.fetchall():
-                self.tree.insert("", "end", values=row)
-            conn.close()
-        except Exception as e:
-            print(f"加载家具数据出错: {e}")
+        # 【修改】排序逻辑：先按房间ID (RID) 分组，再按家具ID (fid) 从小到大排序
+        if is_alive(self.tree):
+            self.list.refresh()
+
+    def reveal(self, furniture_id):
+        """定位并选中指定家具（搜索结果跳转）"""
+        if is_alive(self.tree):
+            self.list.reveal(furniture_id)
 
     def add_furniture(self, preselected_room_id=None):
         """添加家具"""
@@ -108,19 +106,15 @@ class FurnitureManager:
         e_name.grid(row=0,column=1,pady=10)
 
         tk.Label(f, text="所属房间", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=1,column=0,sticky='w',pady=10)
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT room_id, room_name FROM room WHERE user_id=?", (self.user_id,))
-        rooms = c.fetchall()
-        conn.close()
-        room_names = [r[1] for r in rooms]
+        rooms = lookups.get(self.user_id).rooms
+        room_names = rooms.names
         room_var = tk.StringVar()
         combo = ttk.Combobox(f, textvariable=room_var, values=room_names, state="readonly", width=27)
         combo.grid(row=1,column=1,pady=10)
         if room_names:
             if preselected_room_id:
                 # 如果传入预选ID，尝试匹配
-                sel_room = next((r[1] for r in rooms if r[0] == preselected_room_id), None)
+                sel_room = rooms.name_of(preselected_room_id, None)
                 if sel_room: combo.set(sel_room)
             else:
                 combo.set(room_names[0])
@@ -147,7 +141,7 @@ class FurnitureManager:
                 messagebox.showerror("错误", "请填写完整",parent = win)
                 return
             
-            rid = next(h[0] for h in rooms if h[1] == rname)
+            rid = rooms.id_of(rname)
             try:
                 count = int(e_count.get())
                 cost = float(e_cost.get())
@@ -157,16 +151,13 @@ class FurnitureManager:
             
             total = count * cost
             
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO furniture (user_id, room_id, furniture, note, count, furniture_cost, total_cost) VALUES (?, ?, ?, ?, ?, ?, ?)",
-                      (self.user_id, rid, name, note, count, cost, total))
-            conn.commit()
-            conn.close()
+            with transaction() as c:
+                c.execute("INSERT INTO furniture (user_id, room_id, furniture, note, count, furniture_cost, total_cost) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          (self.user_id, rid, name, note, count, cost, total))
+                fid = c.lastrowid
             
-            self.update_costs_callback()
             win.destroy()
-            self.load_furnitures()
+            events.publish(events.FURNITURE, fid, events.INSERT)
 
         WeChatButton(f, text="确定添加", command=save, width=20).grid(row=5,column=0,columnspan=2,pady=25)
 
@@ -184,31 +175,27 @@ class FurnitureManager:
             return
 
         try:
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
+            with transaction() as c:
+                # 1. 读取原数据
+                c.execute("""
+                    SELECT user_id, room_id, furniture, note, count, furniture_cost, total_cost 
+                    FROM furniture 
+                    WHERE furniture_id=?
+                """, (fid,))
+                row = c.fetchone()
             
-            # 1. 读取原数据
-            c.execute("""
-                SELECT user_id, room_id, furniture, note, count, furniture_cost, total_cost 
-                FROM furniture 
-                WHERE furniture_id=?
-            """, (fid,))
-            row = c.fetchone()
+                if row:
+                    # 2. 插入新数据 (ID 自动生成，其他数据保持一致)
+                    c.execute("""
+                        INSERT INTO furniture (user_id, room_id, furniture, note, count, furniture_cost, total_cost)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """, row)
+                    new_id = c.lastrowid
             
             if row:
-                # 2. 插入新数据 (ID 自动生成，其他数据保持一致)
-                c.execute("""
-                    INSERT INTO furniture (user_id, room_id, furniture, note, count, furniture_cost, total_cost)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, row)
-                
-                conn.commit()
+                events.publish(events.FURNITURE, new_id, events.INSERT)
                 messagebox.showinfo("成功", "家具复制成功")
                 
-                self.update_costs_callback()
-                self.load_furnitures()
-                
-            conn.close()
         except Exception as e:
             messagebox.showerror("错误", f"复制失败: {e}")
 
@@ -238,13 +225,10 @@ class FurnitureManager:
         e_name.grid(row=0,column=1,pady=10)
 
         tk.Label(f, text="所属房间", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=1,column=0,sticky='w',pady=10)
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT room_id, room_name FROM room WHERE user_id=?", (self.user_id,))
-        rooms = c.fetchall()
-        conn.close()
-        room_names = [r[1] for r in rooms]
-        room_var = tk.StringVar(value=values[1])
+        rooms = lookups.get(self.user_id).rooms
+        room_names = rooms.names
+        # values[7] 为隐藏的房间ID
+        room_var = tk.StringVar(value=rooms.name_of(values[7], values[1]))
         combo = ttk.Combobox(f, textvariable=room_var, values=room_names, state="readonly", width=27)
         combo.grid(row=1,column=1,pady=10)
 
@@ -271,7 +255,7 @@ class FurnitureManager:
                 messagebox.showerror("错误", "请填写完整",parent = win)
                 return
             
-            rid = next(h[0] for h in rooms if h[1] == rname)
+            rid = rooms.id_of(rname)
             try:
                 count = int(e_count.get())
                 cost = float(e_cost.get())
@@ -281,16 +265,12 @@ class FurnitureManager:
             
             total = count * cost
             
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("UPDATE furniture SET user_id=?, room_id=?, furniture=?, note=?, count=?, furniture_cost=?, total_cost=? WHERE furniture_id=?", 
-                      (self.user_id, rid, name, note, count, cost, total, fid))
-            conn.commit()
-            conn.close()
+            with transaction() as c:
+                c.execute("UPDATE furniture SET user_id=?, room_id=?, furniture=?, note=?, count=?, furniture_cost=?, total_cost=? WHERE furniture_id=?", 
+                          (self.user_id, rid, name, note, count, cost, total, fid))
             
-            self.update_costs_callback()
             win.destroy()
-            self.load_furnitures()
+            events.publish(events.FURNITURE, fid, events.UPDATE)
 
         WeChatButton(f, text="保存修改", command=save, width=20).grid(row=5,column=0,columnspan=2,pady=25)
 
@@ -302,11 +282,6 @@ class FurnitureManager:
         if not messagebox.askyesno("确认", "删除家具会删除相关数据，确定吗？"):
             return
         fid = self.tree.item(sel[0])["values"][0]
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("DELETE FROM furniture WHERE furniture_id=?", (fid,))
-        conn.commit()
-        conn.close()
-        
-        self.update_costs_callback()
-        self.load_furnitures()
+        with transaction() as c:
+            c.execute("DELETE FROM furniture WHERE furniture_id=?", (fid,))
+        events.publish(events.FURNITURE, fid, events.DELETE)
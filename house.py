@@ -3,18 +3,42 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from config import COLORS
-from widgets import WeChatButton
+from db import transaction
+import queries
+from widgets import WeChatButton, is_alive, TreeSync, progress_reporter
+from worker import run_async, fetch_all
+import events
+
+
+def _house_items(rows):
+    """查询结果逐行转成列表显示的 (iid, values, tags)"""
+    for row in rows:
+        row = list(row)
+        row[5] = f"¥{row[5]:,.2f}"
+        # 根据状态加图标
+        status = row[6]
+        if status == '维修中':
+            row[6] = f"🔧 {status}"
+        elif status == '不可用':
+            row[6] = f"❌ {status}"
+        else:
+            row[6] = f"✅ {status}"
+        yield row[0], row, ()
+
 
 class HouseManager:
     """楼栋管理器"""
+    # 列表显示的数据来源（房间数、成本随房间和家具变化）
+    TOPICS = (events.HOUSE, events.ROOM, events.FURNITURE)
     
-    def __init__(self, content, user_id, on_update_callback):
+    def __init__(self, content, user_id):
         self.content = content
         self.user_id = user_id
-        self.on_update_callback = on_update_callback
         self.tree = None
+        self.rows = None
+        self.show_progress = None
+        self._reveal_id = None
         
     def create_page(self):
         """创建楼栋管理页面"""
@@ -27,35 +51,49 @@ class HouseManager:
             self.tree.heading(col, text=text)
             self.tree.column(col, width=w, anchor='center')
         self.tree.pack(fill='both', expand=True, padx=30, pady=10)
+        self.rows = TreeSync(self.tree)
 
         btns = tk.Frame(self.content, bg=COLORS['bg'])
         btns.pack(pady=10)
         WeChatButton(btns, text="添加楼栋", command=self.add_house).pack(side='left', padx=8)
         WeChatButton(btns, text="编辑楼栋", command=self.edit_house).pack(side='left', padx=8)
         WeChatButton(btns, text="删除楼栋", command=self.delete_house).pack(side='left', padx=8)
+        lbl_progress = tk.Label(btns, text="", bg=COLORS['bg'], fg=COLORS['text_light'],
+                                font=('Microsoft YaHei UI', 9))
+        lbl_progress.pack(side='left', padx=8)
+        self.show_progress = progress_reporter(lbl_progress)
 
         self.load_houses()
     
     def load_houses(self):
-        """加载楼栋数据"""
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT house_id, house_name, house_add, house_floor, room_count, house_cost, house_status FROM house WHERE user_id=?", (self.user_id,))
-        for row in c.fetchall():
-            row = list(row)
-            row[5] = f"¥{row[5]:,.2f}"
-            # 根据状态设置背景色
-            status = row[6]
-            if status == '维修中':
-                row[6] = f"🔧 {status}"
-            elif status == '不可用':
-                row[6] = f"❌ {status}"
-            else:
-                row[6] = f"✅ {status}"
-            self.tree.insert("", "end", values=row)
-        conn.close()
+        """加载楼栋数据（后台查询，完成后刷新列表）"""
+        run_async(fetch_all, queries.HOUSE_LIST, (self.user_id,),
+                  on_done=self._show_houses, key=self)
+
+    def _show_houses(self, rows):
+        if not is_alive(self.tree):
+            return
+        # 按主键只更新有变化的行，保留选中和滚动位置；楼栋很多时分批插入，第一屏立即显示
+        self.rows.sync_chunked(_house_items(rows), on_progress=self._on_progress, total=len(rows))
+        self._apply_reveal()
+
+    def _on_progress(self, done, total):
+        self.show_progress(done, total)
+        if done == total:
+            # 要定位的楼栋可能在后面的批次里
+            self._apply_reveal()
+
+    def reveal(self, house_id):
+        """定位并选中指定楼栋（搜索结果跳转；列表尚未加载完时，加载完成后再定位）"""
+        self._reveal_id = str(house_id)
+        self._apply_reveal()
+
+    def _apply_reveal(self):
+        if self._reveal_id and is_alive(self.tree) and self.tree.exists(self._reveal_id):
+            self.tree.selection_set(self._reveal_id)
+            self.tree.focus(self._reveal_id)
+            self.tree.see(self._reveal_id)
+            self._reveal_id = None
     
     def add_house(self):
         """添加楼栋"""
@@ -104,20 +142,19 @@ class HouseManager:
             except ValueError:
                 messagebox.showerror("错误", "层数和房间数必须是正整数",parent = win)
                 return
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO house (user_id, house_name, house_add, house_floor, room_count, house_status) VALUES (?, ?, ?, ?, ?, ?)",
-                      (self.user_id, name, add, floor, room_count, '可用'))
-            hid = c.lastrowid
-            for i in range(1, room_count + 1):
-                room_name = f"{name}-{i}"
-                c.execute("INSERT INTO room (user_id, house_id, room_name, room_status) VALUES (?, ?, ?, ?)",
-                          (self.user_id, hid, room_name, '空置'))
-            conn.commit()
-            conn.close()
+            with transaction() as c:
+                # room_count 由房间触发器随下面的插入逐个累加
+                c.execute("INSERT INTO house (user_id, house_name, house_add, house_floor, room_count, house_status) VALUES (?, ?, ?, ?, ?, ?)",
+                          (self.user_id, name, add, floor, 0, '可用'))
+                hid = c.lastrowid
+                for i in range(1, room_count + 1):
+                    room_name = f"{name}-{i}"
+                    c.execute("INSERT INTO room (user_id, house_id, room_name, room_status) VALUES (?, ?, ?, ?)",
+                              (self.user_id, hid, room_name, '空置'))
             win.destroy()
-            self.on_update_callback()
-            self.load_houses()
+            events.publish(events.HOUSE, hid, events.INSERT)
+            if room_count:
+                events.publish(events.ROOM, None, events.INSERT)
 
         WeChatButton(f, text="确定添加", command=save, width=20).grid(row=4,column=0,columnspan=2,pady=20)
 
@@ -178,13 +215,10 @@ class HouseManager:
             except ValueError:
                 messagebox.showerror("错误", "层数必须是整数",parent = win)
                 return
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("UPDATE house SET house_name=?, house_add=?, house_floor=?, house_status=? WHERE house_id=?", (name, add, floor, status, hid))
-            conn.commit()
-            conn.close()
+            with transaction() as c:
+                c.execute("UPDATE house SET house_name=?, house_add=?, house_floor=?, house_status=? WHERE house_id=?", (name, add, floor, status, hid))
             win.destroy()
-            self.load_houses()
+            events.publish(events.HOUSE, hid, events.UPDATE)
 
         WeChatButton(f, text="保存修改", command=save, width=20).grid(row=5,column=0,columnspan=2,pady=20)
 
@@ -196,10 +230,7 @@ class HouseManager:
         if not messagebox.askyesno("确认", "删除楼栋会删除下属所有数据，确定吗？"):
             return
         hid = self.tree.item(sel[0])["values"][0]
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("DELETE FROM house WHERE house_id=?", (hid,))
-        conn.commit()
-        conn.close()
-        self.on_update_callback()
-        self.load_houses()
+        with transaction() as c:
+            c.execute("DELETE FROM house WHERE house_id=?", (hid,))
+        events.publish(events.HOUSE, hid, events.DELETE)
+        events.publish(events.ROOM, None, events.DELETE)
@@ -0,0 +1,374 @@
+# importer.py
+"""批量导入模块 - 从 CSV/JSONL 文件流式导入楼栋、房间、家具、租客、合同
+
+文件逐行读取、按块插入：每 CHUNK_SIZE 行一个事务、一次 executemany，内存占用与文件大小无关。
+引用关系按名称解析（房间所属楼栋、家具所在房间、合同的房间和租客），出错的行记录行号和原因后跳过。
+表头可以用数据库列名，也可以用界面上的中文列名。
+"""
+
+import csv
+import json
+import datetime
+import os
+from db import get_conn, transaction
+from payments import PAY_MONTHS, add_months
+import events
+
+CHUNK_SIZE = 2000
+MAX_ERRORS = 1000   # 最多保留的错误明细条数（错误总数照常统计）
+
+HOUSE_STATUS = ("可用", "维修中", "不可用")
+ROOM_STATUS = ("空置", "出租中", "维修中", "不可用", "自住")
+CONTRACT_STATUS = ("待开始", "履行中", "已结束", "已终止")
+
+
+class RowError(ValueError):
+    """某一行数据不合法"""
+
+
+# ------------------- 字段转换 -------------------
+def _text(value):
+    return str(value).strip()
+
+
+def _int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        raise RowError(f"不是整数: {value}")
+
+
+def _float(value):
+    try:
+        return float(str(value).strip())
+    except ValueError:
+        raise RowError(f"不是数字: {value}")
+
+
+def _date(value):
+    text = str(value).strip().replace('/', '-')
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise RowError(f"日期格式应为 YYYY-MM-DD: {value}")
+
+
+def _bool(value):
+    text = str(value).strip().lower()
+    if text in ('1', 'true', 'yes', '是'):
+        return 1
+    if text in ('0', 'false', 'no', '否'):
+        return 0
+    raise RowError(f"应为 是/否: {value}")
+
+
+def _choice(options):
+    def convert(value):
+        text = str(value).strip()
+        if text not in options:
+            raise RowError(f"取值应为 {'/'.join(options)}: {value}")
+        return text
+    return convert
+
+
+# ------------------- 名称解析 -------------------
+class _Names:
+    """名称 -> id；重名的名称记为 None，解析时报歧义"""
+    def __init__(self, rows):
+        self.ids = {}
+        for key, id_ in rows:
+            self.ids[key] = None if key in self.ids else id_
+
+    def resolve(self, key, what):
+        if key not in self.ids:
+            raise RowError(f"找不到{what}: {' / '.join(k for k in _as_tuple(key) if k)}")
+        id_ = self.ids[key]
+        if id_ is None:
+            raise RowError(f"{what}重名，请补充区分信息: {' / '.join(k for k in _as_tuple(key) if k)}")
+        return id_
+
+
+def _as_tuple(key):
+    return key if isinstance(key, tuple) else (key,)
+
+
+class _Refs:
+    """导入时用到的引用表，按需加载（只与数据库中的记录数有关，与导入文件大小无关）"""
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self._cache = {}
+
+    def _load(self, name, sql):
+        """sql 返回 (名称..., id)，多个名称列组合成元组作为键"""
+        if name not in self._cache:
+            rows = get_conn().execute(sql, (self.user_id,))
+            self._cache[name] = _Names((row[0] if len(row) == 2 else row[:-1], row[-1]) for row in rows)
+        return self._cache[name]
+
+    def house(self, record):
+        name = record.get('house_name')
+        if not name:
+            raise RowError("缺少楼栋名称")
+        return self._load('house', "SELECT house_name, house_id FROM house WHERE user_id=?").resolve(name, "楼栋")
+
+    def room(self, record):
+        """按 楼栋名称+房间名称 定位房间；未填楼栋时要求房间名唯一"""
+        room_name = record.get('room_name')
+        if not room_name:
+            raise RowError("缺少房间名称")
+        house_name = record.get('house_name')
+        if house_name:
+            names = self._load('room_by_house', """SELECT h.house_name, r.room_name, r.room_id
+                FROM room r JOIN house h ON r.house_id = h.house_id WHERE r.user_id=?""")
+            return names.resolve((house_name, room_name), "房间")
+        return self._load('room', "SELECT room_name, room_id FROM room WHERE user_id=?").resolve(room_name, "房间")
+
+    def renter(self, record):
+        """按姓名定位租客；填写了身份证号时按 姓名+身份证号 定位"""
+        name = record.get('renter_name')
+        if not name:
+            raise RowError("缺少租客姓名")
+        idcard = record.get('renter_idcard')
+        if idcard:
+            names = self._load('renter_by_idcard', """SELECT renter_name, renter_idcard, renter_id
+                FROM renter WHERE user_id=?""")
+            return names.resolve((name, idcard), "租客")
+        return self._load('renter', "SELECT renter_name, renter_id FROM renter WHERE user_id=?").resolve(name, "租客")
+
+
+# ------------------- 各类数据 -------------------
+# 字段: (列名, 中文表头, 转换函数, 是否必填, 默认值)
+FIELDS = {
+    'house': (
+        ('house_name', '楼栋名称', _text, True, None),
+        ('house_add', '地址', _text, False, ''),
+        ('house_floor', '楼层', _int, False, 0),
+        ('house_status', '状态', _choice(HOUSE_STATUS), False, '可用'),
+    ),
+    'room': (
+        ('room_name', '房间名称', _text, True, None),
+        ('room_area', '面积', _float, False, 0.0),
+        ('room_rent', '租金', _float, False, 0.0),
+        ('room_status', '状态', _choice(ROOM_STATUS), False, '空置'),
+    ),
+    'furniture': (
+        ('furniture', '家具名称', _text, True, None),
+        ('note', '备注', _text, False, ''),
+        ('count', '数量', _int, False, 1),
+        ('furniture_cost', '单价', _float, False, 0.0),
+    ),
+    'renter': (
+        ('renter_name', '姓名', _text, True, None),
+        ('renter_idcard', '身份证', _text, False, ''),
+        ('renter_tel', '电话', _text, False, ''),
+        ('renter_wechat', '微信', _text, False, ''),
+        ('renter_lock_id', '密码锁ID', _text, False, ''),
+        ('renter_lock_pass', '密码锁密码', _text, False, ''),
+        ('renter_finger', '指纹ID', _text, False, ''),
+        ('note', '备注', _text, False, ''),
+        ('is_blacklisted', '黑名单', _bool, False, 0),
+    ),
+    'contract': (
+        ('start_date', '开始日期', _date, True, None),
+        ('end_date', '结束日期', _date, False, None),
+        ('rent', '租金', _float, False, 0.0),
+        ('pledge', '押金', _float, False, 0.0),
+        ('status', '状态', _choice(CONTRACT_STATUS), False, None),
+        ('payment_method', '付款方式', _choice(tuple(PAY_MONTHS)), False, '月付'),
+        ('total_rent', '已交租金', _float, False, 0.0),
+        ('paid_until_date', '已付截止日期', _date, False, None),
+        ('note', '备注', _text, False, ''),
+    ),
+}
+
+# 用于按名称引用的列（不写入本表）
+REF_COLUMNS = (
+    ('house_name', '楼栋'),
+    ('room_name', '房间'),
+    ('renter_name', '租客'),
+    ('renter_idcard', '身份证'),
+)
+
+ENTITY_NAMES = {'house': '楼栋', 'room': '房间', 'furniture': '家具', 'renter': '租客', 'contract': '合同'}
+
+
+def _house_row(values, record, refs, today):
+    return values
+
+
+def _room_row(values, record, refs, today):
+    return (refs.house(record),) + values
+
+
+def _furniture_row(values, record, refs, today):
+    room_id = refs.room(record) if record.get('room_name') else None
+    count, cost = values[2], values[3]
+    return (room_id,) + values + (count * cost,)
+
+
+def _renter_row(values, record, refs, today):
+    return values
+
+
+def _contract_row(values, record, refs, today):
+    start, end, rent, pledge, status, pay_method, total_rent, paid_until, note = values
+    if end and start > end:
+        raise RowError("开始日期不能晚于结束日期")
+    if status is None:
+        # 与界面新增合同相同：按今天判断初始状态
+        if start > today:
+            status = "待开始"
+        elif end and today > end:
+            status = "已终止"
+        else:
+            status = "履行中"
+    last_payment = add_months(start, -PAY_MONTHS[pay_method])
+    if paid_until is None:
+        paid_until = start - datetime.timedelta(days=1)
+    return (refs.room(record), refs.renter(record), start, end, rent, pledge, status, pay_method,
+            total_rent, total_rent + pledge, paid_until, note, last_payment)
+
+
+# 类型 -> (表, 插入列, 行构造函数)；插入列顺序与行构造函数返回值一致（user_id 除外）
+TABLES = {
+    'house': ('house', ('house_name', 'house_add', 'house_floor', 'house_status'), _house_row),
+    'room': ('room', ('house_id', 'room_name', 'room_area', 'room_rent', 'room_status'), _room_row),
+    'furniture': ('furniture', ('room_id', 'furniture', 'note', 'count', 'furniture_cost', 'total_cost'),
+                  _furniture_row),
+    'renter': ('renter', ('renter_name', 'renter_idcard', 'renter_tel', 'renter_wechat', 'renter_lock_id',
+                          'renter_lock_pass', 'renter_finger', 'note', 'is_blacklisted'), _renter_row),
+    'contract': ('contract', ('room_id', 'renter_id', 'start_date', 'end_date', 'rent', 'pledge', 'status',
+                              'payment_method', 'total_rent', 'total_cash', 'paid_until_date', 'note',
+                              'last_payment_date'), _contract_row),
+}
+
+
+def _after_contracts(c, first_id, batch):
+    """本块新导入的合同：已交租金和已付截止日期结转为期初收租流水，履行中的合同分配给租客所在的整组
+
+    期初流水的交租日期记为合同开始日期（last_payment_date 是开始日期前一期，记在那天会把收入算到合同开始之前的月份）。
+    """
+    col = {name: i + 1 for i, name in enumerate(TABLES['contract'][1])}   # +1: 行首是 user_id
+    c.execute("SELECT contract_id FROM contract WHERE contract_id > ? ORDER BY contract_id", (first_id,))
+    ids = [row[0] for row in c.fetchall()]
+    # 先清零，再由收租流水触发器累计回来，保持与流水一致
+    c.execute("""UPDATE contract SET total_rent = 0, total_cash = pledge, paid_until_date = date(start_date, '-1 day')
+                 WHERE contract_id > ?""", (first_id,))
+    opening = [(row[0], cid, row[col['start_date']], row[col['paid_until_date']], row[col['total_rent']],
+                row[col['start_date']])
+               for cid, row in zip(ids, batch)
+               if row[col['paid_until_date']] >= row[col['start_date']] or row[col['total_rent']]]
+    c.executemany("""INSERT INTO payment (user_id, contract_id, period_start, period_end, amount, paid_date, note)
+                     VALUES (?, ?, ?, ?, ?, ?, '期初结转')""", opening)
+    c.execute("""SELECT ct.contract_id, m.group_id FROM contract ct JOIN renter m ON m.renter_id = ct.renter_id
+                 WHERE ct.contract_id > ? AND ct.status = '履行中' ORDER BY ct.contract_id""", (first_id,))
+    c.executemany("UPDATE renter SET contract_id=? WHERE group_id=?", c.fetchall())
+
+
+# ------------------- 文件读取 -------------------
+def detect_format(path):
+    """按扩展名判断文件格式：.jsonl/.json/.ndjson 为 JSONL，其余按 CSV"""
+    ext = os.path.splitext(path)[1].lower()
+    return 'jsonl' if ext in ('.jsonl', '.json', '.ndjson') else 'csv'
+
+
+def read_records(path, fmt=None):
+    """逐行读取，产出 (行号, dict 或 RowError)"""
+    fmt = fmt or detect_format(path)
+    # utf-8-sig 兼容 Excel 另存的带 BOM 的 CSV
+    with open(path, encoding='utf-8-sig', newline='') as f:
+        if fmt == 'csv':
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+        else:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield line_no, RowError(f"JSON 格式错误: {e}")
+                    continue
+                if not isinstance(record, dict):
+                    yield line_no, RowError("每行应为一个 JSON 对象")
+                    continue
+                yield line_no, record
+
+
+class ImportResult:
+    """导入结果"""
+    def __init__(self, entity):
+        self.entity = entity
+        self.lines = 0
+        self.inserted = 0
+        self.error_count = 0
+        self.errors = []    # [(行号, 原因)]，最多 MAX_ERRORS 条
+
+    def add_error(self, line_no, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((line_no, message))
+
+    def summary(self):
+        return (f"{ENTITY_NAMES[self.entity]}: 读取 {self.lines} 行，导入 {self.inserted} 条，"
+                f"出错 {self.error_count} 行")
+
+
+def import_file(path, entity, user_id, fmt=None, chunk_size=CHUNK_SIZE, today=None):
+    """导入一个文件，返回 ImportResult；每块一个事务，出错的行跳过不影响其他行"""
+    if entity not in TABLES:
+        raise ValueError(f"不支持的导入类型: {entity}")
+    table, columns, build_row = TABLES[entity]
+    fields = FIELDS[entity]
+    # 表头别名：列名和中文表头都认
+    aliases = {}
+    for key, label in REF_COLUMNS:
+        aliases[key] = aliases[label] = key
+    for key, label, _, _, _ in fields:
+        aliases[key] = key
+        aliases.setdefault(label, key)
+    sql = (f"INSERT INTO {table} (user_id, {', '.join(columns)}) "
+           f"VALUES (?, {', '.join('?' * len(columns))})")
+    refs = _Refs(user_id)
+    today = today or datetime.date.today()
+    result = ImportResult(entity)
+
+    def flush(batch):
+        with transaction() as c:
+            first_id = c.execute(f"SELECT IFNULL(MAX(rowid), 0) FROM {table}").fetchone()[0]
+            c.executemany(sql, batch)
+            if entity == 'contract':
+                _after_contracts(c, first_id, batch)
+        result.inserted += len(batch)
+
+    batch = []
+    for line_no, record in read_records(path, fmt):
+        result.lines += 1
+        if isinstance(record, RowError):
+            result.add_error(line_no, str(record))
+            continue
+        record = {aliases.get(str(k).strip(), k): ('' if v is None else str(v).strip())
+                  for k, v in record.items() if k is not None}
+        try:
+            values = []
+            for key, label, convert, required, default in fields:
+                raw = record.get(key, '')
+                if raw == '':
+                    if required:
+                        raise RowError(f"缺少必填字段: {label}")
+                    values.append(default)
+                else:
+                    values.append(convert(raw))
+            batch.append((user_id,) + tuple(build_row(tuple(values), record, refs, today)))
+        except RowError as e:
+            result.add_error(line_no, str(e))
+            continue
+        if len(batch) >= chunk_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+    if result.inserted:
+        events.publish(entity, None, events.INSERT)
+    return result
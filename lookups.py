@@ -0,0 +1,73 @@
+# lookups.py
+"""下拉选项缓存 - 各对话框共用的楼栋/房间/租客名称列表，按用户缓存，数据库有写入后自动失效"""
+
+from db import get_conn, write_serial
+
+
+class Lookup:
+    """一类实体的选项：显示名 <-> id 双向字典
+
+    重名的记录在显示名后追加 (#id) 区分，保证显示名唯一，选择结果可以无歧义地换回 id。
+    """
+    def __init__(self, rows):
+        counts = {}
+        for _, name in rows:
+            counts[name] = counts.get(name, 0) + 1
+        self.ids = []
+        self.by_id = {}
+        self.by_name = {}
+        for id_, name in rows:
+            display = name if counts[name] == 1 else f"{name} (#{id_})"
+            self.ids.append(id_)
+            self.by_id[id_] = display
+            self.by_name[display] = id_
+
+    @property
+    def names(self):
+        """全部显示名（保持查询顺序）"""
+        return [self.by_id[id_] for id_ in self.ids]
+
+    def names_where(self, keep):
+        """满足 keep(id) 的显示名"""
+        return [self.by_id[id_] for id_ in self.ids if keep(id_)]
+
+    def id_of(self, name):
+        """显示名 -> id，找不到返回 None"""
+        return self.by_name.get(name)
+
+    def name_of(self, id_, default=""):
+        """id -> 显示名"""
+        return self.by_id.get(id_, default)
+
+
+class Lookups:
+    """某个用户的全部选项"""
+    def __init__(self, user_id):
+        c = get_conn().cursor()
+        c.execute("SELECT house_id, house_name FROM house WHERE user_id=?", (user_id,))
+        self.houses = Lookup(c.fetchall())
+        c.execute("SELECT room_id, room_name FROM room WHERE user_id=?", (user_id,))
+        self.rooms = Lookup(c.fetchall())
+        c.execute("SELECT renter_id, renter_name FROM renter WHERE user_id=?", (user_id,))
+        self.renters = Lookup(c.fetchall())
+        # 正在履行合同的房间/租客 -> 合同ID（添加/编辑合同时排除已出租的房间和已有合同的租客）
+        c.execute("SELECT room_id, renter_id, contract_id FROM contract WHERE user_id=? AND status='履行中'", (user_id,))
+        self.busy_rooms = {}
+        self.busy_renters = {}
+        for room_id, renter_id, contract_id in c.fetchall():
+            self.busy_rooms[room_id] = contract_id
+            self.busy_renters[renter_id] = contract_id
+
+
+# user_id -> (写入序号, Lookups)
+_cache = {}
+
+
+def get(user_id):
+    """取得用户的选项缓存；自上次构建后数据库有过写入则重新查询"""
+    serial = write_serial()
+    cached = _cache.get(user_id)
+    if cached is None or cached[0] != serial:
+        cached = (serial, Lookups(user_id))
+        _cache[user_id] = cached
+    return cached[1]
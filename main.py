@@ -1,22 +1,31 @@
 # main.py
-"""主程序入口 - 房东房屋管理软件"""
+"""主程序入口 - 房东房屋管理软件
 
+启动时只导入登录界面需要的模块，各页面模块在第一次进入该页面时才导入。
+"""
+
+import startup  # 最先导入：开启启动耗时统计时从这里开始计时
 import tkinter as tk
-from tkinter import messagebox
+from tkinter import ttk, messagebox
 from config import COLORS
-from widgets import SidebarButton
-from database import init_db, update_all_costs
+from widgets import SidebarButton, is_alive, cancel_chunked
+from worker import executor, run_async
+import events
 from auth import show_login_page
-from dashboard import create_dashboard_page
-from house import HouseManager
-from room import RoomManager
-from furniture import FurnitureManager
-from renter import RenterManager
-from contract import ContractManager
+from watcher import ChangeWatcher
+
+startup.mark('imports')
+
+
+def prepare_database():
+    """建表/升级数据库，并按今天的日期推进合同状态（待开始 -> 履行中 -> 已终止），在数据库线程中执行"""
+    from database import init_db, advance_contract_status
+    init_db()
+    return advance_contract_status()
+
 
 class App:
     def __init__(self):
-        init_db()
         self.root = tk.Tk()
         self.root.title("HOUSE HUNTER")
         self.root.geometry("1480x800")
@@ -25,19 +34,59 @@ class App:
         self.current_page = None
         
         # 管理器实例
+        self.dashboard_manager = None
         self.house_manager = None
         self.room_manager = None
         self.furniture_manager = None
         self.renter_manager = None
         self.contract_manager = None
-        
+        self.busy_label = None
+        self.content = None
+        # 页面只在第一次进入时创建，之后切换只隐藏/显示：页面索引 -> 页面框架；隐藏期间数据有变化的页面
+        self.page_frames = {}
+        self.dirty_pages = set()
+        self.page_tokens = []
+        startup.mark('tk_root')
+
+        # 数据变更事件在主线程空闲时合并通知
+        events.bus.bind(self.root)
+        # 数据库查询放到后台线程执行，界面不因查询卡顿
+        executor.start(self.root)
+        executor.add_busy_listener(self.on_db_busy)
+        # 数据库就绪后开始检测其他人对同一数据库文件的修改
+        self.watcher = ChangeWatcher(self.root)
+
+        # 数据库初始化与显示登录界面同时进行；登录查询在数据库线程中排在初始化之后
+        self._startup_stages = {'first_paint', 'db_ready'}
+        run_async(prepare_database, on_done=self.on_db_ready,
+                  on_error=lambda e: messagebox.showerror("错误", f"数据库初始化失败: {e}"))
         self.show_login()
+        startup.mark('login_form')
+        self.root.after_idle(lambda: self.startup_stage('first_paint'))
         self.root.mainloop()
+        self.watcher.stop()
+        executor.stop()
+        events.bus.unbind()
+
+    def on_db_ready(self, result):
+        started, ended = result
+        if started or ended:
+            print(f"合同状态更新: {started} 份开始履行, {ended} 份到期终止")
+        self.watcher.start()
+        self.startup_stage('db_ready')
+
+    def startup_stage(self, name):
+        """记录启动阶段，首次绘制和数据库就绪都完成后输出启动耗时报告"""
+        startup.mark(name)
+        self._startup_stages.discard(name)
+        if not self._startup_stages:
+            startup.finish()
 
     def show_login(self):
         """显示登录页面"""
         for w in self.root.winfo_children():
             w.destroy()
+        self.reset_pages()
         show_login_page(self.root, self.on_login_success)
 
     def on_login_success(self, user_id):
@@ -49,6 +98,7 @@ class App:
         """显示主界面"""
         for w in self.root.winfo_children():
             w.destroy()
+        self.reset_pages()
 
         # 左侧导航
         sidebar = tk.Frame(self.root, bg=COLORS['sidebar'], width=220)
@@ -56,7 +106,14 @@ class App:
         sidebar.pack_propagate(False)
 
         tk.Label(sidebar, text="功能菜单", bg=COLORS['sidebar'], fg=COLORS['text'],
-                 font=('Microsoft YaHei UI',12,'bold')).pack(pady=25)
+                 font=('Microsoft YaHei UI',12,'bold')).pack(pady=(25, 10))
+
+        # 全局搜索：回车后在楼栋/房间/租客/合同/家具中查找
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(sidebar, textvariable=self.search_var, font=('Microsoft YaHei UI', 10),
+                                relief='flat', highlightthickness=1, highlightcolor=COLORS['primary'])
+        search_entry.pack(fill='x', padx=14, pady=(0, 15), ipady=4)
+        search_entry.bind("<Return>", lambda e: self.run_search())
 
         self.nav_buttons = [
             SidebarButton(sidebar, text="📊 概览仪表盘", command=lambda: self.switch_page(0)),
@@ -75,10 +132,15 @@ class App:
         exit_btn.unbind("<Leave>")
         exit_btn.pack(fill='x', padx=10, pady=3, side='bottom')
 
-        # 右侧内容区
-        self.content = tk.Frame(self.root, bg=COLORS['bg'])
-        self.content.pack(side='right', fill='both', expand=True)
+        SidebarButton(sidebar, text="📤 导出数据", command=self.open_export).pack(fill='x', padx=10, pady=3, side='bottom')
+        SidebarButton(sidebar, text="📥 批量导入", command=self.open_import).pack(fill='x', padx=10, pady=3, side='bottom')
+        SidebarButton(sidebar, text="🩺 性能诊断", command=self.open_diagnostics).pack(fill='x', padx=10, pady=3, side='bottom')
+
+        self.busy_label = tk.Label(sidebar, text="", bg=COLORS['sidebar'], fg="#888",
+                                   font=('Microsoft YaHei UI', 9))
+        self.busy_label.pack(side='bottom', pady=5)
 
+        # 右侧内容区：每个页面一个框架，直接放在根窗口中（管理器用 content.master 作为对话框的父窗口）
         self.pages = [
             self.page_dashboard,
             self.page_house,
@@ -90,16 +152,69 @@ class App:
         self.switch_page(0)
 
     def switch_page(self, idx):
-        """切换页面"""
-        for w in self.content.winfo_children():
-            w.destroy()
+        """切换页面：第一次进入时创建页面，之后只隐藏/显示；离开后有过写入的页面再次进入时才重新加载数据"""
         for i, btn in enumerate(self.nav_buttons):
             if i == idx:
                 btn.select()
             else:
                 btn.deselect()
+        if idx == self.current_page:
+            # 再次点击当前页面按钮：手动刷新
+            self.refresh_page(idx)
+            return
+        if self.current_page is not None:
+            old = self.page_frames.get(self.current_page)
+            if is_alive(old):
+                old.pack_forget()
+                # 离开时还没插入完的长列表不再继续，回来时重新加载
+                if cancel_chunked(old):
+                    self.dirty_pages.add(self.current_page)
         self.current_page = idx
+        frame = self.page_frames.get(idx)
+        if is_alive(frame):
+            self.content = frame
+            frame.pack(side='right', fill='both', expand=True)
+            if idx in self.dirty_pages:
+                self.refresh_page(idx)
+            return
+        frame = self.page_frames[idx] = tk.Frame(self.root, bg=COLORS['bg'])
+        frame.pack(side='right', fill='both', expand=True)
+        self.content = frame
         self.pages[idx]()
+        manager = self.page_manager(idx)
+        if manager:
+            # 只订阅页面显示的实体：可见页面合并刷新一次，隐藏页面标记为待刷新
+            self.page_tokens.append(events.subscribe(manager.TOPICS, lambda changes, i=idx: self.on_data_changed(i)))
+
+    def page_manager(self, idx):
+        return [self.dashboard_manager, self.house_manager, self.room_manager,
+                self.furniture_manager, self.renter_manager, self.contract_manager][idx]
+
+    def on_data_changed(self, idx):
+        """页面关心的数据有变更"""
+        if idx == self.current_page:
+            self.refresh_page(idx)
+        else:
+            self.dirty_pages.add(idx)
+
+    def reset_pages(self):
+        """丢弃所有页面（登录/退出登录时）"""
+        for token in self.page_tokens:
+            events.unsubscribe(token)
+        self.page_tokens = []
+        self.page_frames = {}
+        self.dirty_pages = set()
+        self.current_page = None
+        self.content = None
+
+    def refresh_page(self, idx):
+        """重新加载页面数据（不重建控件）"""
+        self.dirty_pages.discard(idx)
+        load = ['load_dashboard_data', 'load_houses', 'load_rooms',
+                'load_furnitures', 'load_renters', 'load_contracts'][idx]
+        manager = self.page_manager(idx)
+        if manager and is_alive(self.page_frames.get(idx)):
+            getattr(manager, load)()
 
     def logout(self):
         """退出登录"""
@@ -107,48 +222,220 @@ class App:
             self.current_user_id = None
             self.show_login()
 
-    def update_all_costs(self):
-        """更新所有成本"""
-        update_all_costs(self.current_user_id)
+    def run_search(self):
+        """执行全局搜索（后台查询）"""
+        from search import search
+        text = self.search_var.get().strip()
+        if not text:
+            return
+        run_async(search, self.current_user_id, text,
+                  on_done=lambda results: self.show_search_results(text, results),
+                  on_error=lambda e: messagebox.showerror("错误", f"搜索失败: {e}"), key='search')
+
+    def show_search_results(self, text, results):
+        """显示搜索结果，双击或回车跳转到对应页面并选中该行"""
+        from dialogs import center_window
+        from search import KINDS
+        if not results:
+            messagebox.showinfo("搜索", f"没有找到与“{text}”相关的记录")
+            return
+        win = tk.Toplevel(self.root)
+        win.title(f"搜索: {text}")
+        center_window(win, 640, 400, self.root)
+        win.configure(bg=COLORS['bg'])
+        win.transient(self.root)
+
+        tree = ttk.Treeview(win, columns=("kind", "title", "detail"), show="headings")
+        for col, label, w in [("kind", "类型", 70), ("title", "名称", 180), ("detail", "详情", 360)]:
+            tree.heading(col, text=label)
+            tree.column(col, width=w, anchor='center' if col == "kind" else 'w')
+        for i, (kind, ref_id, title, detail) in enumerate(results):
+            tree.insert("", "end", iid=str(i), values=(KINDS[kind][0], title, detail))
+        tree.pack(fill='both', expand=True, padx=15, pady=15)
+
+        def jump(event=None):
+            sel = tree.selection()
+            if not sel:
+                return
+            kind, ref_id = results[int(sel[0])][:2]
+            win.destroy()
+            self.jump_to(kind, ref_id)
+
+        tree.bind("<Double-1>", jump)
+        tree.bind("<Return>", jump)
+        first = tree.get_children()[0]
+        tree.selection_set(first)
+        tree.focus(first)
+        tree.focus_set()
+
+    def jump_to(self, kind, ref_id):
+        """切换到记录所在页面并定位到该行"""
+        from search import KINDS
+        page = KINDS[kind][1]
+        self.switch_page(page)
+        manager = {
+            1: self.house_manager,
+            2: self.room_manager,
+            3: self.furniture_manager,
+            4: self.renter_manager,
+            5: self.contract_manager,
+        }[page]
+        if manager:
+            manager.reveal(ref_id)
+
+    def open_import(self):
+        """批量导入对话框：选择数据类型和 CSV/JSONL 文件，在后台导入"""
+        from tkinter import filedialog
+        from dialogs import center_window
+        from importer import import_file, ENTITY_NAMES
+        from widgets import WeChatButton
+        win = tk.Toplevel(self.root)
+        win.title("批量导入")
+        center_window(win, 460, 300, self.root)
+        win.configure(bg=COLORS['bg'])
+        win.transient(self.root)
+        win.grab_set()
+
+        f = tk.Frame(win, bg='white')
+        f.pack(expand=True, fill='both', padx=30, pady=25)
+        entities = {name: key for key, name in ENTITY_NAMES.items()}
+        tk.Label(f, text="数据类型", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=0,column=0,sticky='w',pady=10)
+        entity_var = tk.StringVar(value="楼栋")
+        ttk.Combobox(f, textvariable=entity_var, values=list(entities), state="readonly", width=25).grid(row=0,column=1,pady=10)
+        tk.Label(f, text="文件", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=1,column=0,sticky='w',pady=10)
+        path_var = tk.StringVar()
+        tk.Entry(f, textvariable=path_var, width=27).grid(row=1,column=1,pady=10)
+
+        def browse():
+            path = filedialog.askopenfilename(parent=win, filetypes=[("CSV / JSONL", "*.csv *.jsonl *.json"), ("所有文件", "*.*")])
+            if path:
+                path_var.set(path)
+
+        tk.Button(f, text="选择…", command=browse, relief='flat').grid(row=1,column=2,padx=5)
+        tk.Label(f, text="表头可用列名或界面上的中文列名，按名称关联楼栋/房间/租客", bg='white', fg="#888",
+                 font=('Microsoft YaHei UI', 9)).grid(row=2,column=0,columnspan=3,sticky='w')
+
+        def done(result):
+            lines = [result.summary()]
+            lines += [f"第 {line_no} 行: {message}" for line_no, message in result.errors[:15]]
+            if result.error_count > 15:
+                lines.append(f"…… 共 {result.error_count} 行出错")
+            (messagebox.showwarning if result.error_count else messagebox.showinfo)("导入完成", "\n".join(lines))
+
+        def start():
+            path = path_var.get().strip()
+            if not path:
+                messagebox.showerror("错误", "请选择要导入的文件", parent=win)
+                return
+            win.destroy()
+            run_async(import_file, path, entities[entity_var.get()], self.current_user_id,
+                      on_done=done, on_error=lambda e: messagebox.showerror("错误", f"导入失败: {e}"))
+
+        WeChatButton(f, text="开始导入", command=start, width=20).grid(row=3,column=0,columnspan=3,pady=20)
+
+    def open_export(self):
+        """导出对话框：选择数据类型、日期范围和保存位置，在后台导出"""
+        import datetime
+        from tkinter import filedialog
+        from dialogs import center_window
+        from exporter import export_file, EXPORTS
+        from widgets import WeChatButton
+        win = tk.Toplevel(self.root)
+        win.title("导出数据")
+        center_window(win, 460, 340, self.root)
+        win.configure(bg=COLORS['bg'])
+        win.transient(self.root)
+        win.grab_set()
+
+        f = tk.Frame(win, bg='white')
+        f.pack(expand=True, fill='both', padx=30, pady=25)
+        entities = {spec[0]: key for key, spec in EXPORTS.items()}
+        tk.Label(f, text="数据类型", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=0,column=0,sticky='w',pady=10)
+        entity_var = tk.StringVar(value="合同")
+        ttk.Combobox(f, textvariable=entity_var, values=list(entities), state="readonly", width=25).grid(row=0,column=1,pady=10)
+        tk.Label(f, text="开始日期从", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=1,column=0,sticky='w',pady=10)
+        e_from = tk.Entry(f, width=27)
+        e_from.grid(row=1,column=1,pady=10)
+        tk.Label(f, text="开始日期到", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=2,column=0,sticky='w',pady=10)
+        e_to = tk.Entry(f, width=27)
+        e_to.grid(row=2,column=1,pady=10)
+        tk.Label(f, text="日期格式 YYYY-MM-DD，留空不筛选（仅合同）", bg='white', fg="#888",
+                 font=('Microsoft YaHei UI', 9)).grid(row=3,column=0,columnspan=2,sticky='w')
+        mask_var = tk.IntVar(value=1)
+        tk.Checkbutton(f, text="身份证号脱敏", variable=mask_var, bg='white').grid(row=4,column=0,columnspan=2,sticky='w')
+
+        def start():
+            entity = entities[entity_var.get()]
+            try:
+                dates = [datetime.date.fromisoformat(e.get().strip()) if e.get().strip() else None
+                         for e in (e_from, e_to)]
+            except ValueError:
+                messagebox.showerror("错误", "日期格式应为 YYYY-MM-DD", parent=win)
+                return
+            if any(dates) and entity != 'contract':
+                messagebox.showerror("错误", "只有合同可以按日期筛选", parent=win)
+                return
+            path = filedialog.asksaveasfilename(parent=win, defaultextension=".csv",
+                                                initialfile=f"{entity_var.get()}.csv",
+                                                filetypes=[("CSV", "*.csv"), ("JSONL", "*.jsonl")])
+            if not path:
+                return
+            win.destroy()
+            run_async(export_file, path, entity, self.current_user_id,
+                      date_from=dates[0], date_to=dates[1], mask=bool(mask_var.get()),
+                      on_done=lambda count: messagebox.showinfo("导出完成", f"已导出 {count} 行到\n{path}"),
+                      on_error=lambda e: messagebox.showerror("错误", f"导出失败: {e}"))
+
+        WeChatButton(f, text="导出", command=start, width=20).grid(row=5,column=0,columnspan=2,pady=15)
+
+    def open_diagnostics(self):
+        """性能诊断窗口：各查询的耗时分位数和调用位置"""
+        from diagnostics import open_diagnostics
+        open_diagnostics(self.root)
+
+    def on_db_busy(self, busy):
+        """后台查询忙碌状态变化 - 在侧边栏显示加载提示"""
+        if is_alive(self.busy_label):
+            self.busy_label.config(text="⏳ 加载中…" if busy else "")
 
     # ------------------- 页面创建函数 -------------------
     def page_dashboard(self):
         """概览仪表盘页面"""
-        create_dashboard_page(self.content, self.current_user_id)
+        from dashboard import create_dashboard_page
+        self.dashboard_manager = create_dashboard_page(self.content, self.current_user_id)
 
     def page_house(self):
         """楼栋管理页面"""
-        self.house_manager = HouseManager(self.content, self.current_user_id, self.update_all_costs)
+        from house import HouseManager
+        self.house_manager = HouseManager(self.content, self.current_user_id)
         self.house_manager.create_page()
 
     def page_room(self):
         """房屋管理页面"""
+        from room import RoomManager
         self.room_manager = RoomManager(
             self.content, 
             self.current_user_id, 
-            self.update_all_costs,
             lambda preselected_room_id=None: self.switch_page(3) or (self.furniture_manager and self.furniture_manager.add_furniture(preselected_room_id))
         )
         self.room_manager.create_page()
 
     def page_furniture(self):
         """家具管理页面"""
-        self.furniture_manager = FurnitureManager(self.content, self.current_user_id, self.update_all_costs)
+        from furniture import FurnitureManager
+        self.furniture_manager = FurnitureManager(self.content, self.current_user_id)
         self.furniture_manager.create_page()
 
     def page_renter(self):
         """租客管理页面"""
+        from renter import RenterManager
         self.renter_manager = RenterManager(self.content, self.current_user_id)
         self.renter_manager.create_page()
 
     def page_contract(self):
         """合同管理页面"""
-        self.contract_manager = ContractManager(
-            self.content, 
-            self.current_user_id,
-            lambda: self.room_manager and self.room_manager.load_rooms(),
-            self.update_all_costs
-        )
+        from contract import ContractManager
+        self.contract_manager = ContractManager(self.content, self.current_user_id)
         self.contract_manager.create_page()
 
 if __name__ == "__main__":
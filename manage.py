@@ -0,0 +1,326 @@
+# manage.py
+"""维护命令行 - 数据库检查与维护工具（无需图形界面）
+
+用法:
+    python manage.py check-plans [--user 1]
+    python manage.py rebuild-costs [--user 1]
+    python manage.py advance-status [--date 2025-01-01]
+    python manage.py import {house,room,furniture,renter,contract} FILE [--user 1] [--format csv|jsonl]
+    python manage.py export {house,room,furniture,renter,contract} FILE [--columns a,b] [--from D] [--to D]
+    python manage.py income [--user 1] [--from 2020-01-01] [--to 2025-12-31]
+    python manage.py projection [--user 1] [--months 12] [--date 2025-01-01]
+    python manage.py occupancy --from 2024-01-01 --to 2024-12-31 [--user 1] [--house 3] [--top 10]
+    python manage.py --db bench.db gen [--rooms 10000] [--houses N] [--renters N] ... [--seed 1]
+    python manage.py --query-log income ...   # 任意命令加 --query-log：结束时打印各查询耗时统计
+    python manage.py startup [--repeat 5]      # 无界面测量启动导入耗时和数据库初始化耗时
+    python manage.py bench [--sizes 1000,10000,100000] [--repeat 5] [--output report.json] [--compare old.json]
+"""
+
+import sys
+import argparse
+
+import db
+from database import init_db
+
+
+def cmd_check_plans(args):
+    """检查列表查询的执行计划是否全部走索引"""
+    import queries
+    for name, sql, params in queries.plan_checks(args.user):
+        plan = queries.explain(sql, params)
+        scans = queries.full_scans(plan)
+        sorts = queries.temp_sorts(plan) if name in queries.LIST_QUERIES else []
+        status = '全表扫描' if scans else '临时排序' if sorts else 'OK'
+        print(f"[{status}] {name}")
+        if args.verbose or scans or sorts:
+            for line in plan:
+                print(f"    {line}")
+    return 1 if queries.check_query_plans(args.user) else 0
+
+
+def cmd_rebuild_costs(args):
+    """全量重算成本和数量统计（修复触发器之外写入造成的不一致）"""
+    from database import update_all_costs
+    conn = db.get_conn()
+    if args.user is not None:
+        users = [args.user]
+    else:
+        users = [row[0] for row in conn.execute("SELECT id FROM user")]
+    for uid in users:
+        update_all_costs(uid)
+        print(f"已重算用户 {uid} 的成本统计")
+    return 0
+
+
+def cmd_advance_status(args):
+    """按日期批量推进合同状态"""
+    import datetime
+    from database import advance_contract_status
+    today = datetime.date.fromisoformat(args.date) if args.date else None
+    started, ended = advance_contract_status(today)
+    print(f"合同状态更新: {started} 份开始履行, {ended} 份到期终止")
+    return 0
+
+
+def cmd_import(args):
+    """从 CSV/JSONL 文件批量导入数据"""
+    from importer import import_file
+    result = import_file(args.file, args.entity, args.user, fmt=args.format)
+    for line_no, message in result.errors:
+        print(f"  第 {line_no} 行: {message}")
+    if result.error_count > len(result.errors):
+        print(f"  …… 另有 {result.error_count - len(result.errors)} 行错误未列出")
+    print(result.summary())
+    return 1 if result.error_count else 0
+
+
+def cmd_export(args):
+    """把列表数据流式导出为 CSV/JSONL"""
+    import datetime
+    from exporter import export_file
+    columns = [col.strip() for col in args.columns.split(',')] if args.columns else None
+    date_from = datetime.date.fromisoformat(args.date_from) if args.date_from else None
+    date_to = datetime.date.fromisoformat(args.date_to) if args.date_to else None
+    try:
+        count = export_file(args.file, args.entity, args.user, fmt=args.format, columns=columns,
+                            date_column=args.date_column, date_from=date_from, date_to=date_to,
+                            mask=not args.no_mask)
+    except ValueError as e:
+        print(f"导出失败: {e}")
+        return 1
+    print(f"已导出 {count} 行到 {args.file}")
+    return 0
+
+
+def cmd_income(args):
+    """按月统计实收租金（来自收租流水）"""
+    import datetime
+    from payments import monthly_income
+    date_to = datetime.date.fromisoformat(args.date_to) if args.date_to else datetime.date.today()
+    date_from = datetime.date.fromisoformat(args.date_from) if args.date_from else date_to.replace(month=1, day=1)
+    total = 0
+    for month, amount, count in monthly_income(args.user, date_from, date_to):
+        print(f"{month}  {amount:>12.2f}  ({count} 笔)")
+        total += amount
+    print(f"合计 {total:.2f}")
+    return 0
+
+
+def cmd_projection(args):
+    """推算未来各月应收租金"""
+    import datetime
+    from projection import monthly_projection
+    today = datetime.date.fromisoformat(args.date) if args.date else None
+    result = monthly_projection(args.user, today, args.months)
+    if result['arrears_count']:
+        print(f"逾期未交  {result['arrears']:>12.2f}  ({result['arrears_count']} 笔)")
+    for month, amount, count in result['months']:
+        print(f"{month}  {amount:>12.2f}  ({count} 笔)")
+    print(f"合计 {sum(amount for _, amount, _ in result['months']):.2f}")
+    return 0
+
+
+def cmd_occupancy(args):
+    """统计日期范围内的出租率、空置天数和空置损失"""
+    import datetime
+    from occupancy import occupancy
+    result = occupancy(args.user, datetime.date.fromisoformat(args.date_from),
+                       datetime.date.fromisoformat(args.date_to), args.house)
+    for month, used, capacity, rate in result['months']:
+        print(f"{month}  出租率 {rate:6.1%}  ({used}/{capacity} 房间天)")
+    print(f"整体出租率 {result['rate']:.1%}，空置损失 {result['lost_rent']:.2f}")
+    worst = sorted(result['rooms'], key=lambda room: -room[4])[:args.top]
+    if worst:
+        print(f"空置损失最多的 {len(worst)} 个房间:")
+        for room_id, house_name, room_name, vacant, lost in worst:
+            print(f"  {house_name or ''} {room_name}  空置 {vacant} 天  损失 {lost:.2f}")
+    return 0
+
+
+def cmd_gen(args):
+    """在当前数据库中生成模拟数据（未指定的数量按房间数推算）"""
+    import time
+    from benchmark import generate, scaled_counts
+    counts = scaled_counts(args.rooms)
+    for name in counts:
+        if getattr(args, name) is not None:
+            counts[name] = getattr(args, name)
+    start = time.perf_counter()
+    totals = generate(seed=args.seed, **counts)
+    print(f"生成完成 {time.perf_counter() - start:.1f}s -> {db.get_db_path()}")
+    for name, count in totals.items():
+        print(f"  {name:<10} {count}")
+    return 0
+
+
+def cmd_bench(args):
+    """按多个数据规模对各页面查询计时，输出 JSON 报告"""
+    import json
+    from benchmark import run, write_report, compare
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    report = run(sizes, repeat=args.repeat, seed=args.seed, workdir=args.workdir, keep=args.keep,
+                 progress=lambda msg: print(msg, file=sys.stderr))
+    write_report(report, args.output)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            old = json.load(f)
+        for size, name, before, after, ratio in compare(old, report):
+            print(f"{size:>8} {name:<28} {before:>10.2f} -> {after:>10.2f} ms  x{ratio:.2f}", file=sys.stderr)
+    return 0
+
+
+def cmd_startup(args):
+    """无界面测量冷启动：登录界面所需模块的导入耗时（对比一次性导入全部页面）和数据库初始化耗时"""
+    import os
+    import time
+    import tempfile
+    import subprocess
+    import statistics
+    from startup import parse_importtime
+    here = os.path.dirname(os.path.abspath(__file__))
+
+    def import_cost(code):
+        """在新进程中执行 code，返回 (中位数总耗时ms, 最后一次的 importtime 明细)"""
+        totals, rows = [], []
+        for _ in range(args.repeat):
+            out = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=here,
+                                 capture_output=True, text=True)
+            if out.returncode:
+                raise SystemExit(out.stderr)
+            rows = parse_importtime(out.stderr)
+            totals.append(sum(total for _, _, total, level in rows if level == 0))
+        return statistics.median(totals), rows
+
+    login_ms, rows = import_cost("import main")
+    pages_ms, _ = import_cost("import main, dashboard, house, room, furniture, renter, contract")
+    print(f"登录界面导入  {login_ms:8.1f} ms")
+    print(f"全部页面导入  {pages_ms:8.1f} ms（页面模块延迟导入节省 {pages_ms - login_ms:.1f} ms）")
+    print(f"导入耗时最多的 {args.top} 个模块（累计）:")
+    for name, self_ms, total_ms, level in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"  {name:<32} 自身 {self_ms:8.1f} ms  累计 {total_ms:8.1f} ms")
+
+    # 数据库初始化：新建空库（全部升级）和已是最新版本的当前库
+    old_path = db.get_db_path()
+    with tempfile.TemporaryDirectory() as tmp:
+        db.set_db_path(os.path.join(tmp, 'fresh.db'))
+        start = time.perf_counter()
+        init_db()
+        fresh_ms = (time.perf_counter() - start) * 1000
+        db.close_all()
+    db.set_db_path(old_path)
+    start = time.perf_counter()
+    init_db()
+    current_ms = (time.perf_counter() - start) * 1000
+    print(f"数据库初始化  新建 {fresh_ms:.1f} ms，已有数据库 {current_ms:.1f} ms")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="HOUSE HUNTER 维护工具")
+    parser.add_argument('--db', help="数据库文件路径（默认使用配置中的路径）")
+    parser.add_argument('--query-log', action='store_true', help="记录查询耗时，结束时打印统计（慢查询写入日志）")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('check-plans', help="用 EXPLAIN QUERY PLAN 检查列表查询")
+    p.add_argument('--user', type=int, default=1, help="用于检查的用户ID")
+    p.add_argument('-v', '--verbose', action='store_true', help="输出完整执行计划")
+    p.set_defaults(func=cmd_check_plans)
+
+    p = sub.add_parser('rebuild-costs', help="全量重算家具/房间/楼栋成本统计")
+    p.add_argument('--user', type=int, help="只重算指定用户（默认全部）")
+    p.set_defaults(func=cmd_rebuild_costs)
+
+    p = sub.add_parser('advance-status', help="按日期推进合同状态（待开始/履行中/已终止）")
+    p.add_argument('--date', help="基准日期 YYYY-MM-DD（默认今天）")
+    p.set_defaults(func=cmd_advance_status)
+
+    p = sub.add_parser('import', help="从 CSV/JSONL 文件批量导入楼栋/房间/家具/租客/合同")
+    p.add_argument('entity', choices=['house', 'room', 'furniture', 'renter', 'contract'], help="导入的数据类型")
+    p.add_argument('file', help="CSV 或 JSONL 文件（表头可用列名或界面中文列名）")
+    p.add_argument('--user', type=int, default=1, help="导入到的用户ID")
+    p.add_argument('--format', choices=['csv', 'jsonl'], help="文件格式（默认按扩展名判断）")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser('export', help="把楼栋/房间/家具/租客/合同列表导出为 CSV/JSONL")
+    p.add_argument('entity', choices=['house', 'room', 'furniture', 'renter', 'contract'], help="导出的数据类型")
+    p.add_argument('file', help="输出文件（.csv 或 .jsonl）")
+    p.add_argument('--user', type=int, default=1, help="导出的用户ID")
+    p.add_argument('--format', choices=['csv', 'jsonl'], help="文件格式（默认按扩展名判断）")
+    p.add_argument('--columns', help="只导出这些列，逗号分隔")
+    p.add_argument('--date-column', help="日期筛选使用的列（合同默认 start_date）")
+    p.add_argument('--from', dest='date_from', help="起始日期 YYYY-MM-DD（含）")
+    p.add_argument('--to', dest='date_to', help="截止日期 YYYY-MM-DD（含）")
+    p.add_argument('--no-mask', action='store_true', help="身份证号不脱敏")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser('income', help="按月统计实收租金")
+    p.add_argument('--user', type=int, default=1, help="统计的用户ID")
+    p.add_argument('--from', dest='date_from', help="起始收款日期 YYYY-MM-DD（默认当年1月1日）")
+    p.add_argument('--to', dest='date_to', help="截止收款日期 YYYY-MM-DD（默认今天）")
+    p.set_defaults(func=cmd_income)
+
+    p = sub.add_parser('projection', help="推算未来各月应收租金")
+    p.add_argument('--user', type=int, default=1, help="用户ID")
+    p.add_argument('--months', type=int, default=12, help="推算月数（默认12）")
+    p.add_argument('--date', help="基准日期 YYYY-MM-DD（默认今天）")
+    p.set_defaults(func=cmd_projection)
+
+    p = sub.add_parser('occupancy', help="统计出租率、空置天数和空置损失")
+    p.add_argument('--from', dest='date_from', required=True, help="起始日期 YYYY-MM-DD")
+    p.add_argument('--to', dest='date_to', required=True, help="截止日期 YYYY-MM-DD")
+    p.add_argument('--user', type=int, default=1, help="用户ID")
+    p.add_argument('--house', type=int, help="只统计指定楼栋ID（默认全部）")
+    p.add_argument('--top', type=int, default=10, help="列出空置损失最多的房间数")
+    p.set_defaults(func=cmd_occupancy)
+
+    p = sub.add_parser('gen', help="生成指定规模的模拟数据（性能测试用）")
+    p.add_argument('--rooms', type=int, default=1000, help="房间数（其余数量默认按比例推算）")
+    for name, text in (('users', "用户数"), ('houses', "楼栋数"), ('furniture', "家具数"), ('renters', "租客数"),
+                       ('links', "租客关联数"), ('contracts', "合同数")):
+        p.add_argument(f'--{name}', type=int, help=text)
+    p.add_argument('--seed', type=int, default=1, help="随机种子（相同种子生成相同数据）")
+    p.set_defaults(func=cmd_gen)
+
+    p = sub.add_parser('startup', help="无界面测量启动导入耗时和数据库初始化耗时")
+    p.add_argument('--repeat', type=int, default=5, help="每项测量次数（取中位数）")
+    p.add_argument('--top', type=int, default=15, help="列出导入耗时最多的模块数")
+    p.set_defaults(func=cmd_startup)
+
+    p = sub.add_parser('bench', help="按多个数据规模对列表/仪表盘/成本重算计时，输出 JSON 报告")
+    p.add_argument('--sizes', default="1000,10000,100000", help="房间数规模，逗号分隔")
+    p.add_argument('--repeat', type=int, default=5, help="每项计时次数（取中位数）")
+    p.add_argument('--seed', type=int, default=1, help="随机种子")
+    p.add_argument('--output', help="报告输出文件（默认打印到标准输出）")
+    p.add_argument('--compare', help="与之前的报告对比中位数耗时")
+    p.add_argument('--workdir', help="生成数据库的目录（默认临时目录）")
+    p.add_argument('--keep', action='store_true', help="保留生成的数据库文件")
+    p.set_defaults(func=cmd_bench)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.query_log:
+        import querylog
+        querylog.set_enabled(True)
+    if args.db:
+        db.set_db_path(args.db)
+    init_db()
+    code = args.func(args)
+    if args.query_log:
+        print_query_log()
+    return code
+
+
+def print_query_log():
+    """打印各查询的耗时统计（按总耗时降序）"""
+    import querylog
+    print(f"{'次数':>6} {'行数':>8} {'p50ms':>8} {'p95ms':>8} {'总计ms':>9}  调用位置 / 查询", file=sys.stderr)
+    for item in querylog.summary()[:30]:
+        print(f"{item['count']:>6} {item['rows']:>8} {item['p50_ms']:>8.2f} {item['p95_ms']:>8.2f} "
+              f"{item['total_ms']:>9.1f}  {item['caller']}\n{'':>44}{item['sql'][:100]}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+# occupancy.py
+"""出租率分析模块 - 把合同看作房间的 [开始日期, 结束日期] 区间，对排序后的端点做一次扫描，
+统计任意日期范围内每天/每月的出租率、每个房间的空置天数和按房间租金折算的空置损失"""
+
+import datetime
+from db import get_conn
+import queries
+
+
+def _ordinal(text):
+    try:
+        return datetime.date.fromisoformat(text).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def analyze(rooms, contracts, date_from, date_to):
+    """rooms: [(房间ID, 楼栋名, 房间名, 房间租金)]；contracts: [(房间ID, 开始日期, 结束日期)]
+
+    结束日期为空的合同视为持续到范围末尾；同一房间合同重叠（续租交接）只算一次占用。
+    返回 {'days': [(日期, 已出租房间数)], 'months': [(YYYY-MM, 出租房间天数, 可出租房间天数, 出租率)],
+          'rooms': [(房间ID, 楼栋名, 房间名, 空置天数, 空置损失)], 'rate': 整体出租率, 'lost_rent': 空置损失合计}
+    """
+    first, last = date_from.toordinal(), date_to.toordinal()
+    span = last - first + 1
+    known = {room[0] for room in rooms}
+
+    # 端点事件：开始日 +1，结束日次日 -1（都裁剪到范围内）
+    events = []
+    for room_id, start, end in contracts:
+        if room_id not in known:
+            continue
+        s = _ordinal(start)
+        if s is None:
+            continue
+        e = _ordinal(end) if end else None
+        s = max(s, first)
+        e = last if e is None else min(e, last)
+        if s > e:
+            continue
+        events.append((s, 1, room_id))
+        events.append((e + 1, -1, room_id))
+    events.sort()
+
+    active = {}          # 房间ID -> 覆盖该房间的合同数
+    since = {}           # 房间ID -> 本次连续出租的开始日
+    occupied_days = {}   # 房间ID -> 出租天数
+    deltas = [0] * (span + 1)   # 每天已出租房间数的差分
+    for day, delta, room_id in events:
+        count = active.get(room_id, 0) + delta
+        active[room_id] = count
+        if delta > 0 and count == 1:
+            since[room_id] = day
+            deltas[day - first] += 1
+        elif delta < 0 and count == 0:
+            occupied_days[room_id] = occupied_days.get(room_id, 0) + day - since.pop(room_id)
+            deltas[day - first] -= 1
+
+    days = []
+    occupied = 0
+    for i in range(span):
+        occupied += deltas[i]
+        days.append((datetime.date.fromordinal(first + i), occupied))
+
+    total_rooms = len(rooms)
+    months = []
+    for day, count in days:
+        label = f"{day.year}-{day.month:02d}"
+        if not months or months[-1][0] != label:
+            months.append([label, 0, 0])
+        months[-1][1] += count
+        months[-1][2] += total_rooms
+    months = [(label, used, capacity, used / capacity if capacity else 0.0)
+              for label, used, capacity in months]
+
+    room_stats = []
+    lost_total = 0.0
+    for room_id, house_name, room_name, room_rent in rooms:
+        vacant = span - occupied_days.get(room_id, 0)
+        # 按月租金折算日租金：月租 * 12 / 365
+        lost = vacant * (room_rent or 0) * 12 / 365
+        lost_total += lost
+        room_stats.append((room_id, house_name, room_name, vacant, lost))
+
+    used = sum(count for _, count in days)
+    capacity = total_rooms * span
+    return {
+        'days': days,
+        'months': months,
+        'rooms': room_stats,
+        'rate': used / capacity if capacity else 0.0,
+        'lost_rent': lost_total,
+    }
+
+
+def occupancy(user_id, date_from, date_to, house_id=None):
+    """查询并分析 [date_from, date_to] 的出租情况；house_id 为空时统计全部楼栋"""
+    conn = get_conn()
+    rooms = conn.execute(queries.OCCUPANCY_ROOMS, (user_id, house_id)).fetchall()
+    contracts = conn.execute(queries.OCCUPANCY_CONTRACTS,
+                             (user_id, house_id, date_from.isoformat(), date_to.isoformat())).fetchall()
+    return analyze(rooms, contracts, date_from, date_to)
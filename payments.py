@@ -0,0 +1,163 @@
+# payments.py
+"""收租流水模块 - 记录每次收租（覆盖期间、金额、收款日期），合同的已付截止日期和累计租金由流水维护"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox
+import datetime
+import calendar
+from config import COLORS
+from db import get_conn, transaction
+from queries import PAYMENT_MONTHLY, PAYMENT_HISTORY
+from widgets import WeChatButton
+import events
+
+try:
+    from tkcalendar import DateEntry
+except ImportError:
+    class DateEntry(tk.Entry):
+        def __init__(self, master, **kwargs):
+            super().__init__(master, **kwargs)
+        def get_date(self):
+            return datetime.date.today()
+
+# 付款方式 -> 每期月数
+PAY_MONTHS = {'月付': 1, '季付': 3, '半年付': 6, '年付': 12}
+
+def add_months(date, months):
+    """日期加减月数，月末日期按目标月天数截断"""
+    month = date.month - 1 + months
+    year = date.year + month // 12
+    month = month % 12 + 1
+    return datetime.date(year, month, min(date.day, calendar.monthrange(year, month)[1]))
+
+
+def record_payment(contract_id, period_end, amount, paid_date, note=''):
+    """记一笔收租：覆盖期间从当前已付截止日期的次日到 period_end，返回流水ID"""
+    with transaction() as c:
+        c.execute("""INSERT INTO payment (user_id, contract_id, period_start, period_end, amount, paid_date, note)
+                     SELECT user_id, contract_id, date(COALESCE(paid_until_date, date(start_date, '-1 day')), '+1 day'),
+                            ?, ?, ?, ?
+                     FROM contract WHERE contract_id = ?""",
+                  (period_end.isoformat(), amount, paid_date.isoformat(), note, contract_id))
+        payment_id = c.lastrowid
+    events.publish(events.PAYMENT, payment_id, events.INSERT)
+    return payment_id
+
+
+def delete_payment(payment_id):
+    """删除一笔收租流水（已付截止日期和累计租金由触发器回退）"""
+    with transaction() as c:
+        c.execute("DELETE FROM payment WHERE payment_id=?", (payment_id,))
+    events.publish(events.PAYMENT, payment_id, events.DELETE)
+
+
+def payment_history(contract_id):
+    """合同的收租记录，最近的在前：[(流水ID, 收款日期, 期间开始, 期间结束, 金额, 备注)]"""
+    return get_conn().execute(PAYMENT_HISTORY, (contract_id,)).fetchall()
+
+
+def monthly_income(user_id, date_from, date_to):
+    """按收款月份汇总实收租金：[(YYYY-MM, 金额, 笔数)]"""
+    return get_conn().execute(PAYMENT_MONTHLY, (user_id, date_from.isoformat(), date_to.isoformat())).fetchall()
+
+
+def open_payment_dialog(master, contract_id, on_saved=None, today=None):
+    """收租记录窗口：查看历史、登记一笔收租或删除错误记录（合同页和仪表盘共用）"""
+    from dialogs import center_window
+    today = today or datetime.date.today()
+    c = get_conn().cursor()
+    c.execute("""SELECT rm.room_name, rt.renter_name, ct.payment_method, ct.rent, ct.start_date
+                 FROM contract ct
+                 LEFT JOIN room rm ON ct.room_id = rm.room_id
+                 LEFT JOIN renter rt ON ct.renter_id = rt.renter_id
+                 WHERE ct.contract_id=?""", (contract_id,))
+    info = c.fetchone()
+    if not info:
+        return
+    rname, rtname, pay_method, rent, start_date = info
+
+    win = tk.Toplevel(master)
+    win.title("租金记录")
+    center_window(win, 520, 560, master)
+    win.configure(bg=COLORS['bg'])
+    win.transient(master)
+    win.grab_set()
+    win.attributes('-topmost', True)
+
+    f = tk.Frame(win, bg='white')
+    f.pack(expand=True, fill='both', padx=30, pady=20)
+
+    tk.Label(f, text=f"房间: {rname or '未知'}    租客: {rtname or '未知'}    {pay_method or '月付'} {rent or 0}元",
+             bg='white', font=('Microsoft YaHei UI', 10, 'bold'), anchor='w').pack(fill='x', pady=(5, 5))
+    paid_label = tk.Label(f, bg='white', font=('Microsoft YaHei UI', 10), anchor='w')
+    paid_label.pack(fill='x', pady=(0, 8))
+
+    tree = ttk.Treeview(f, columns=("paid_date", "period", "amount", "note"), show="headings", height=7)
+    for col, text, w in [("paid_date", "收款日期", 100), ("period", "覆盖期间", 190), ("amount", "金额", 80), ("note", "备注", 90)]:
+        tree.heading(col, text=text)
+        tree.column(col, width=w, anchor='center')
+    tree.pack(fill='x')
+
+    form = tk.Frame(f, bg='white')
+    form.pack(fill='x', pady=10)
+    tk.Label(form, text="本次交至", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=0,column=0,sticky='w',pady=6)
+    e_until = DateEntry(form, width=25, background='darkblue', foreground='white', borderwidth=2, locale='zh_CN', date_pattern='yyyy-mm-dd')
+    e_until.grid(row=0,column=1,pady=6)
+    tk.Label(form, text="金额", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=1,column=0,sticky='w',pady=6)
+    e_amount = tk.Entry(form, width=28)
+    e_amount.grid(row=1,column=1,pady=6)
+    tk.Label(form, text="收款日期", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=2,column=0,sticky='w',pady=6)
+    e_paid = DateEntry(form, width=25, background='darkblue', foreground='white', borderwidth=2, locale='zh_CN', date_pattern='yyyy-mm-dd')
+    e_paid.set_date(today)
+    e_paid.grid(row=2,column=1,pady=6)
+    tk.Label(form, text="备注", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=3,column=0,sticky='w',pady=6)
+    e_note = tk.Entry(form, width=28)
+    e_note.grid(row=3,column=1,pady=6)
+
+    months = PAY_MONTHS.get(pay_method, 1)
+
+    def refresh():
+        """重新读取已付截止日期和历史，按一期的月数预填下一笔"""
+        row = get_conn().execute("SELECT paid_until_date FROM contract WHERE contract_id=?", (contract_id,)).fetchone()
+        until = datetime.date.fromisoformat(row[0]) if row and row[0] else None
+        paid_label.config(text=f"租金已付截止日期: {until or '未交'}")
+        tree.delete(*tree.get_children())
+        for pid, paid_date, p_start, p_end, amount, note in payment_history(contract_id):
+            tree.insert("", "end", iid=str(pid), values=(paid_date, f"{p_start or ''} ~ {p_end}", amount, note or ''))
+        if until:
+            base = until + datetime.timedelta(days=1)
+        else:
+            base = datetime.date.fromisoformat(start_date) if start_date else today
+        e_until.set_date(add_months(base, months) - datetime.timedelta(days=1))
+        e_amount.delete(0, 'end')
+        e_amount.insert(0, str((rent or 0) * months))
+
+    def save():
+        try:
+            amount = float(e_amount.get().strip() or 0)
+        except ValueError:
+            messagebox.showerror("错误", "金额格式不正确", parent=win)
+            return
+        period_end = e_until.get_date()
+        record_payment(contract_id, period_end, amount, e_paid.get_date(), e_note.get().strip())
+        e_note.delete(0, 'end')
+        refresh()
+        if on_saved:
+            on_saved()
+
+    def delete():
+        sel = tree.selection()
+        if not sel:
+            return messagebox.showwarning("提示", "请先选择一条收租记录", parent=win)
+        if not messagebox.askyesno("确认", "确定删除这条收租记录？", parent=win):
+            return
+        delete_payment(int(sel[0]))
+        refresh()
+        if on_saved:
+            on_saved()
+
+    btns = tk.Frame(f, bg='white')
+    btns.pack(fill='x', pady=5)
+    WeChatButton(btns, text="登记收租", command=save, width=12).pack(side='left', padx=5)
+    WeChatButton(btns, text="删除记录", command=delete, width=12).pack(side='left', padx=5)
+    refresh()
@@ -0,0 +1,88 @@
+# projection.py
+"""租金预测模块 - 按付款方式、合同起止日期和已付截止日期推算未来各月应收租金
+
+合同一次查出，日期换算成“月序号”（年*12+月）整数后按期数步进，不逐个合同做日期对象的加月运算。
+"""
+
+import datetime
+import calendar
+from db import get_conn
+from payments import PAY_MONTHS
+import queries
+
+
+def _parse(text):
+    """'YYYY-MM-DD' -> (月序号, 日)；格式不对返回 None"""
+    try:
+        return int(text[:4]) * 12 + int(text[5:7]) - 1, int(text[8:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def _month_days(month):
+    return calendar.monthrange(month // 12, month % 12 + 1)[1]
+
+
+def _next_day(month, day):
+    """(月序号, 日) 的次日"""
+    if day >= _month_days(month):
+        return month + 1, 1
+    return month, day + 1
+
+
+def project(contracts, today, months=12):
+    """按合同推算应收租金
+
+    contracts: [(合同ID, 月租金, 付款方式, 开始日期, 结束日期, 已付截止日期)]，日期为 'YYYY-MM-DD' 字符串。
+    每个合同从已付截止日期的次日（未付过则从开始日期）起，每期交 付款方式对应月数 的租金，
+    交租日不晚于结束日期；最后一期不足整期的按剩余月数计。
+    返回 {'months': [(YYYY-MM, 金额, 笔数)], 'arrears': 今天之前应交未交的金额, 'arrears_count': 笔数}
+    """
+    first = today.year * 12 + today.month - 1
+    now = (first, today.day)
+    horizon = first + months
+    amounts = [0.0] * months
+    counts = [0] * months
+    arrears = 0.0
+    arrears_count = 0
+    for _, rent, method, start, end, paid_until in contracts:
+        if not rent or rent <= 0:
+            continue
+        step = PAY_MONTHS.get(method, 1)
+        paid = _parse(paid_until)
+        due = _next_day(*paid) if paid else _parse(start)
+        if due is None:
+            continue
+        month, day = due
+        end = _parse(end)
+        last = min(end[0] + 1, horizon) if end else horizon
+        while month < last:
+            # 只有落在结束月或本月时才需要按当月天数截断交租日（如31号交租在小月为30号）
+            due_day = min(day, _month_days(month)) if month == first or (end and month == end[0]) else day
+            if end and (month, due_day) > end:
+                break
+            periods = step
+            if end:
+                # 结束日期所在期：剩余月数 = 到结束月的月数，结束日不早于交租日再算一个月
+                periods = min(step, max(1, end[0] - month + (1 if end[1] >= day else 0)))
+            amount = rent * periods
+            if (month, due_day) < now:
+                arrears += amount
+                arrears_count += 1
+            else:
+                amounts[month - first] += amount
+                counts[month - first] += 1
+            month += step
+    labels = [f"{m // 12}-{m % 12 + 1:02d}" for m in range(first, horizon)]
+    return {
+        'months': list(zip(labels, amounts, counts)),
+        'arrears': arrears,
+        'arrears_count': arrears_count,
+    }
+
+
+def monthly_projection(user_id, today=None, months=12):
+    """查询用户的未结束合同并推算未来 months 个月的应收租金（结构见 project）"""
+    today = today or datetime.date.today()
+    contracts = get_conn().execute(queries.PROJECTION_CONTRACTS, (user_id,)).fetchall()
+    return project(contracts, today, months)
@@ -0,0 +1,264 @@
+# queries.py
+"""查询模块 - 各页面列表及仪表盘使用的 SQL，集中管理便于检查执行计划"""
+
+import datetime
+from config import RENT_REMINDER_DAYS
+from db import get_conn
+
+# 楼栋列表
+HOUSE_LIST = """
+    SELECT house_id, house_name, house_add, house_floor, room_count, house_cost, house_status
+    FROM house WHERE user_id=?
+"""
+
+# 房间列表 - 租金优先显示有效合同的金额；按楼栋、房间名排序
+ROOM_LIST = """
+    SELECT
+        r.room_id,
+        h.house_name,
+        r.room_name,
+        r.room_area,
+        r.furniture_count,
+        r.room_cost,
+        COALESCE(c.rent, r.room_rent) AS display_rent,   -- 优先使用合同租金
+        CASE
+            WHEN c.status = '履行中' THEN '🔑 出租中'
+            WHEN r.room_status = '空置' THEN '✅ 空置'
+            WHEN r.room_status = '维修中' THEN '🔧 维修中'
+            WHEN r.room_status = '不可用' THEN '❌ 不可用'
+            WHEN r.room_status = '自住' THEN '🏠 自住'
+            ELSE r.room_status
+        END AS display_status,
+        r.house_id,
+        c.status AS contract_status
+    FROM room r
+    LEFT JOIN house h ON r.house_id = h.house_id
+    LEFT JOIN contract c ON r.room_id = c.room_id AND c.status = '履行中'
+    WHERE r.user_id = ?
+    ORDER BY r.house_id, r.room_name, r.room_id   -- 与 idx_room_user_house_name 顺序一致，分页不用排序
+"""
+ROOM_COUNT = "SELECT COUNT(*) FROM room WHERE user_id=?"
+# 某行在列表中的位置（从0开始，排序与列表一致；参数：user_id, 主键），用于搜索结果定位
+ROOM_POSITION = """
+    SELECT pos FROM (
+        SELECT room_id, ROW_NUMBER() OVER (ORDER BY house_id, room_name, room_id) - 1 AS pos
+        FROM room WHERE user_id = ?
+    ) WHERE room_id = ?
+"""
+
+# 家具列表 - 先按房间ID分组，再按家具ID从小到大排序
+FURNITURE_LIST = """
+    SELECT f.furniture_id, r.room_name, f.furniture, f.count, f.furniture_cost, f.total_cost, f.note, f.room_id
+    FROM furniture f
+    LEFT JOIN room r ON f.room_id = r.room_id
+    WHERE f.user_id=?
+    ORDER BY f.room_id ASC, f.furniture_id ASC
+"""
+FURNITURE_COUNT = "SELECT COUNT(*) FROM furniture WHERE user_id=?"
+FURNITURE_POSITION = """
+    SELECT pos FROM (
+        SELECT furniture_id, ROW_NUMBER() OVER (ORDER BY room_id, furniture_id) - 1 AS pos
+        FROM furniture WHERE user_id = ?
+    ) WHERE furniture_id = ?
+"""
+
+# 租客列表（含关联租客信息）
+RENTER_LIST = """
+    SELECT r.renter_id, r.renter_name, rm.room_name, r.renter_idcard, r.renter_tel, r.renter_wechat,
+           r.renter_lock_id, r.renter_lock_pass, r.renter_finger, r.note,
+           c.status as contract_status, r.is_blacklisted,
+           GROUP_CONCAT(member.renter_name, ', ') as sub_renters,
+           main_r.renter_name as main_renter
+    FROM renter r
+    LEFT JOIN contract c ON r.contract_id = c.contract_id
+    LEFT JOIN room rm ON c.room_id = rm.room_id
+    -- 关联信息按分组连接：主租客列出同组其他租客，其余租客显示本组主租客
+    LEFT JOIN renter main_r ON main_r.renter_id = r.group_id AND r.group_id <> r.renter_id
+    LEFT JOIN renter member ON r.group_id = r.renter_id AND member.group_id = r.renter_id
+                           AND member.renter_id <> r.renter_id
+    WHERE r.user_id=?
+    GROUP BY r.renter_id
+    ORDER BY r.renter_id
+"""
+RENTER_COUNT = "SELECT COUNT(*) FROM renter WHERE user_id=?"
+RENTER_POSITION = "SELECT COUNT(*) FROM renter WHERE user_id=? AND renter_id < ?"
+
+# 合同列表
+CONTRACT_LIST = """
+    SELECT c.contract_id, rm.room_name, rt.renter_name AS renter_names,
+           c.start_date, c.end_date, c.rent, c.pledge, c.status, c.total_rent, c.total_cash
+    FROM contract c
+    LEFT JOIN room rm ON c.room_id = rm.room_id
+    LEFT JOIN renter rt ON c.renter_id = rt.renter_id   -- 按主键连接，每个合同最多一行，无需分组
+    WHERE c.user_id=?
+    ORDER BY c.contract_id
+"""
+CONTRACT_COUNT = "SELECT COUNT(*) FROM contract WHERE user_id=?"
+# 合同导出 - 与合同列表相同的连接，附带付款方式和交租状态（参数：user_id, 今天, 提醒截止日期）
+CONTRACT_EXPORT = """
+    SELECT c.contract_id, rm.room_name, rt.renter_name AS renter_names,
+           c.start_date, c.end_date, c.rent, c.pledge, c.status, c.total_rent, c.total_cash,
+           c.payment_method, c.paid_until_date, c.next_due_date,
+           CASE
+               WHEN c.status <> '履行中' THEN ''
+               WHEN c.next_due_date < ?2 THEN '已逾期'
+               WHEN c.next_due_date <= ?3 THEN '待交租'
+               ELSE '正常'
+           END AS payment_status
+    FROM contract c
+    LEFT JOIN room rm ON c.room_id = rm.room_id
+    LEFT JOIN renter rt ON c.renter_id = rt.renter_id
+    WHERE c.user_id=?1
+    ORDER BY c.contract_id
+"""
+CONTRACT_POSITION = "SELECT COUNT(*) FROM contract WHERE user_id=? AND contract_id < ?"
+
+# 仪表盘 - 基础统计（一条语句：房间表、合同表各扫描一遍该用户的行，收租流水走覆盖索引）
+# 结果：房间总数, 总成本, 履行中合同数, 月租金收入, 累计已收租金（全部流水之和，与合同后来的状态无关）
+DASHBOARD_SUMMARY = """
+    WITH r AS (
+        SELECT COUNT(*) AS total_rooms, COALESCE(SUM(room_cost), 0) AS total_cost
+        FROM room WHERE user_id=?1
+    ), c AS (
+        SELECT COALESCE(SUM(status = '履行中'), 0) AS active_contracts,
+               COALESCE(SUM(CASE WHEN status = '履行中' THEN rent END), 0) AS monthly_income
+        FROM contract WHERE user_id=?1
+    ), p AS (
+        SELECT COALESCE(SUM(amount), 0) AS total_received
+        FROM payment WHERE user_id=?1
+    )
+    SELECT r.total_rooms, r.total_cost, c.active_contracts, c.monthly_income, p.total_received
+    FROM r, c, p
+"""
+
+# 仪表盘 - 即将到期合同（参数：user_id, 截止日期）
+DASHBOARD_EXPIRING = """
+    SELECT rm.room_name, rt.renter_name, c.end_date, c.contract_id
+    FROM contract c
+    LEFT JOIN room rm ON c.room_id = rm.room_id
+    LEFT JOIN renter rt ON c.renter_id = rt.renter_id
+    WHERE c.user_id=? AND c.end_date <= ? AND c.status='履行中'
+    ORDER BY c.end_date
+"""
+
+# 仪表盘 - 租金催缴提醒：已逾期或即将到交租日的合同（参数：user_id, 截止日期）
+DASHBOARD_RENT_DUE = """
+    SELECT c.contract_id, rm.room_name, rt.renter_name, c.rent, c.next_due_date
+    FROM contract c
+    LEFT JOIN room rm ON c.room_id = rm.room_id
+    LEFT JOIN renter rt ON c.renter_id = rt.renter_id
+    WHERE c.user_id=? AND c.status='履行中' AND c.next_due_date <= ?
+    ORDER BY c.next_due_date
+"""
+
+# 租金预测 - 未结束的合同（参数：user_id），走 idx_contract_user_status_due
+PROJECTION_CONTRACTS = """
+    SELECT contract_id, rent, payment_method, start_date, end_date, paid_until_date
+    FROM contract
+    WHERE user_id = ? AND status IN ('履行中', '待开始')
+"""
+
+# 出租率分析 - 房间（参数：user_id, house_id 或 NULL 表示全部楼栋）
+OCCUPANCY_ROOMS = """
+    SELECT r.room_id, h.house_name, r.room_name, r.room_rent
+    FROM room r
+    LEFT JOIN house h ON r.house_id = h.house_id
+    WHERE r.user_id = ?1 AND (?2 IS NULL OR r.house_id = ?2)
+"""
+# 出租率分析 - 与区间 [起始, 截止] 有交集的合同（参数：user_id, house_id 或 NULL, 起始日期, 截止日期）
+OCCUPANCY_CONTRACTS = """
+    SELECT c.room_id, c.start_date, c.end_date
+    FROM contract c
+    JOIN room r ON c.room_id = r.room_id
+    WHERE c.user_id = ?1 AND (?2 IS NULL OR r.house_id = ?2)
+      AND c.start_date <= ?4
+      AND (c.end_date IS NULL OR c.end_date = '' OR c.end_date >= ?3)
+"""
+
+# 按月汇总实收租金（参数：user_id, 起始日期, 截止日期），走 idx_payment_user_paid 覆盖索引
+PAYMENT_MONTHLY = """
+    SELECT substr(paid_date, 1, 7) AS month, SUM(amount), COUNT(*)
+    FROM payment
+    WHERE user_id = ? AND paid_date BETWEEN ? AND ?
+    GROUP BY month
+    ORDER BY month
+"""
+
+# 合同的收租流水（参数：contract_id）
+PAYMENT_HISTORY = """
+    SELECT payment_id, paid_date, period_start, period_end, amount, note
+    FROM payment WHERE contract_id = ?
+    ORDER BY period_end DESC, payment_id DESC
+"""
+
+
+def plan_checks(user_id=1, today=None):
+    """需要检查执行计划的查询：[(名称, SQL, 参数)]"""
+    today = today or datetime.date.today()
+    limit = (today + datetime.timedelta(days=7)).isoformat()
+    due_limit = (today + datetime.timedelta(days=RENT_REMINDER_DAYS)).isoformat()
+    return [
+        ('load_houses', HOUSE_LIST, (user_id,)),
+        ('load_rooms', ROOM_LIST, (user_id,)),
+        ('load_furnitures', FURNITURE_LIST, (user_id,)),
+        ('load_renters', RENTER_LIST, (user_id,)),
+        ('load_contracts', CONTRACT_LIST, (user_id,)),
+        ('load_rooms/count', ROOM_COUNT, (user_id,)),
+        ('load_furnitures/count', FURNITURE_COUNT, (user_id,)),
+        ('load_renters/count', RENTER_COUNT, (user_id,)),
+        ('load_contracts/count', CONTRACT_COUNT, (user_id,)),
+        ('load_dashboard_data/summary', DASHBOARD_SUMMARY, (user_id,)),
+        ('load_dashboard_data/expiring', DASHBOARD_EXPIRING, (user_id, limit)),
+        ('load_dashboard_data/rent_due', DASHBOARD_RENT_DUE, (user_id, due_limit)),
+        ('projection/contracts', PROJECTION_CONTRACTS, (user_id,)),
+        ('occupancy/rooms', OCCUPANCY_ROOMS, (user_id, None)),
+        ('occupancy/contracts', OCCUPANCY_CONTRACTS, (user_id, None, '2000-01-01', today.isoformat())),
+        ('payments/monthly', PAYMENT_MONTHLY, (user_id, '2000-01-01', today.isoformat())),
+        ('payments/history', PAYMENT_HISTORY, (1,)),
+    ]
+
+
+# 列表/分页查询：除了不能全表扫描，排序也必须由索引顺序提供（分页时每页都整表排序代价与总行数成正比）
+# 按月汇总等聚合查询的 GROUP BY 临时表是结果本身需要的，不在此列
+LIST_QUERIES = {
+    'load_houses', 'load_rooms', 'load_furnitures', 'load_renters', 'load_contracts',
+    'load_dashboard_data/expiring', 'load_dashboard_data/rent_due', 'payments/history',
+}
+
+
+def explain(sql, params=()):
+    """返回 EXPLAIN QUERY PLAN 的明细行"""
+    rows = get_conn().execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    return [row[3] for row in rows]
+
+
+def full_scans(plan):
+    """从执行计划中挑出全表扫描（SCAN 且未使用索引；扫描已物化的 CTE/子查询结果不算）"""
+    materialized = {line.split()[1] for line in plan if line.startswith('MATERIALIZE ')}
+    return [line for line in plan
+            if line.startswith('SCAN ') and ' USING ' not in line
+            and line != 'SCAN CONSTANT ROW'
+            and line.split()[1] not in materialized]
+
+
+def temp_sorts(plan):
+    """从执行计划中挑出临时 B 树排序/分组（USE TEMP B-TREE FOR ORDER BY / GROUP BY / DISTINCT）"""
+    return [line for line in plan if line.startswith('USE TEMP B-TREE FOR ')]
+
+
+def plan_problems(name, plan):
+    """一条查询计划中的问题：全表扫描；列表/分页查询另外检查临时排序"""
+    problems = full_scans(plan)
+    if name in LIST_QUERIES:
+        problems += temp_sorts(plan)
+    return problems
+
+
+def check_query_plans(user_id=1):
+    """检查所有列表查询，返回 {名称: 问题明细}，为空表示全部走索引"""
+    problems = {}
+    for name, sql, params in plan_checks(user_id):
+        found = plan_problems(name, explain(sql, params))
+        if found:
+            problems[name] = found
+    return problems
@@ -0,0 +1,266 @@
+# querylog.py
+"""查询计时模块 - 记录每条 SQL 的耗时、返回行数和调用位置，慢查询连同执行计划写入日志
+
+开启后 db 新建的连接使用带计时的连接/游标类；关闭时连接就是普通的 sqlite3.Connection，没有任何额外开销。
+"""
+
+import os
+import re
+import sys
+import time
+import datetime
+import threading
+import sqlite3
+from collections import deque, Counter
+
+from config import QUERY_LOG, SLOW_QUERY_MS, SLOW_QUERY_LOG
+
+SAMPLES = 1000                  # 每条查询保留最近多少次耗时用于计算分位数
+# 这些模块只是转发查询，调用位置取它们之外最近的一层
+_PLUMBING = {'db.py', 'querylog.py', 'worker.py', 'virtual_tree.py', 'widgets.py', '__init__.py', 'threading.py'}
+
+_enabled = QUERY_LOG or os.environ.get('HOUSEHUNTER_QUERY_LOG', '') not in ('', '0')
+_slow_ms = SLOW_QUERY_MS
+_lock = threading.Lock()
+_stats = {}
+_local = threading.local()
+_logger = None
+
+
+def enabled():
+    return _enabled
+
+
+def set_enabled(on):
+    """开启/关闭计时，已打开的连接重新建立后生效（请在数据库线程中调用，避免关闭正在使用的连接）"""
+    global _enabled
+    import db
+    if bool(on) != _enabled:
+        _enabled = bool(on)
+        db.close_all()
+
+
+def slow_threshold():
+    return _slow_ms
+
+
+def set_slow_threshold(ms):
+    global _slow_ms
+    _slow_ms = ms
+
+
+def _normalize(sql):
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def caller():
+    """调用位置：模块.类.方法（跳过数据库/线程转发层）"""
+    frame = sys._getframe(1)
+    fallback = None
+    while frame is not None:
+        code = frame.f_code
+        name = os.path.basename(code.co_filename)
+        if name not in _PLUMBING and 'tkinter' not in code.co_filename:
+            return f"{name[:-3]}.{getattr(code, 'co_qualname', code.co_name)}"
+        if fallback is None and name not in ('db.py', 'querylog.py'):
+            fallback = f"{name[:-3]}.{getattr(code, 'co_qualname', code.co_name)}"
+        frame = frame.f_back
+    return fallback or '?'
+
+
+class origin:
+    """在后台线程执行提交的函数时，把提交时记录的调用位置作为查询的调用位置"""
+
+    def __init__(self, label):
+        self.label = label
+
+    def __enter__(self):
+        self.saved = getattr(_local, 'origin', None)
+        _local.origin = self.label
+
+    def __exit__(self, *exc):
+        _local.origin = self.saved
+
+
+class _QueryStats:
+    __slots__ = ('sql', 'count', 'rows', 'total_ms', 'max_ms', 'samples', 'callers')
+
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.rows = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.samples = deque(maxlen=SAMPLES)
+        self.callers = Counter()
+
+
+def _record(cursor, sql, params, elapsed_ms, rows, where):
+    key = _normalize(sql)
+    with _lock:
+        stats = _stats.get(key)
+        if stats is None:
+            stats = _stats[key] = _QueryStats(key)
+        stats.count += 1
+        stats.rows += rows
+        stats.total_ms += elapsed_ms
+        stats.max_ms = max(stats.max_ms, elapsed_ms)
+        stats.samples.append(elapsed_ms)
+        stats.callers[where] += 1
+    if elapsed_ms >= _slow_ms:
+        _log_slow(cursor.connection, key, params, elapsed_ms, rows, where)
+
+
+def _log_slow(conn, sql, params, elapsed_ms, rows, where):
+    """慢查询写入日志：SQL、参数和 EXPLAIN QUERY PLAN"""
+    global _logger
+    if _logger is None:
+        import logging   # 只在出现慢查询时才需要，不拖慢启动
+        _logger = logging.getLogger('househunter.slow_query')
+        if not _logger.handlers:
+            handler = logging.FileHandler(SLOW_QUERY_LOG, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            _logger.addHandler(handler)
+            _logger.setLevel(logging.INFO)
+            _logger.propagate = False
+    lines = [f"[{datetime.datetime.now().isoformat(timespec='seconds')}] {elapsed_ms:.1f} ms, {rows} 行, {where}",
+             f"    {sql}", f"    参数: {params!r:.300}"]
+    if sql.upper().startswith(('SELECT', 'WITH')):
+        try:
+            # 用基类游标执行，计划查询本身不再计时
+            plan = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+            lines += [f"    计划: {row[-1]}" for row in plan]
+        except sqlite3.Error as e:
+            lines.append(f"    计划获取失败: {e}")
+    _logger.info("\n".join(lines))
+
+
+class ProfiledCursor(sqlite3.Cursor):
+    """计时游标：execute 到结果取完（或游标被丢弃/再次执行）为一次查询"""
+
+    _pending = None
+
+    def execute(self, sql, params=()):
+        self._finish()
+        where = getattr(_local, 'origin', None) or caller()
+        start = time.perf_counter()
+        super().execute(sql, params)
+        elapsed = time.perf_counter() - start
+        if self.description is None:
+            # 非查询语句执行完即结束，行数记受影响行数
+            _record(self, sql, params, elapsed * 1000, max(self.rowcount, 0), where)
+        else:
+            self._pending = [sql, params, elapsed, 0, where]
+        return self
+
+    def executemany(self, sql, seq):
+        self._finish()
+        where = getattr(_local, 'origin', None) or caller()
+        start = time.perf_counter()
+        super().executemany(sql, seq)
+        _record(self, sql, (), (time.perf_counter() - start) * 1000, max(self.rowcount, 0), where)
+        return self
+
+    def _fetched(self, start, rows, done):
+        pending = self._pending
+        if pending is not None:
+            pending[2] += time.perf_counter() - start
+            pending[3] += rows
+            if done:
+                self._finish()
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            sql, params, elapsed, rows, where = pending
+            _record(self, sql, params, elapsed * 1000, rows, where)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(start, len(rows), not rows)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows), True)
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0, True)
+            raise
+        self._fetched(start, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class ProfiledConnection(sqlite3.Connection):
+    """所有游标（包括 conn.execute 的临时游标）都用计时游标"""
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+
+def connection_factory():
+    """db 打开连接时使用的连接类"""
+    return ProfiledConnection if _enabled else sqlite3.Connection
+
+
+def _percentile(ordered, p):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(p * (len(ordered) - 1))))]
+
+
+def summary():
+    """各查询的统计，按总耗时降序：[dict(sql, caller, count, rows, p50_ms, p95_ms, max_ms, total_ms)]"""
+    with _lock:
+        snapshot = [(s.sql, s.count, s.rows, s.total_ms, s.max_ms, sorted(s.samples), s.callers.most_common(1))
+                    for s in _stats.values()]
+    result = []
+    for sql, count, rows, total_ms, max_ms, ordered, top in snapshot:
+        result.append({
+            'sql': sql,
+            'caller': top[0][0] if top else '',
+            'count': count,
+            'rows': rows,
+            'p50_ms': _percentile(ordered, 0.5),
+            'p95_ms': _percentile(ordered, 0.95),
+            'max_ms': max_ms,
+            'total_ms': total_ms,
+        })
+    result.sort(key=lambda item: -item['total_ms'])
+    return result
+
+
+def reset():
+    """清空统计"""
+    with _lock:
+        _stats.clear()
@@ -3,25 +3,37 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from config import COLORS
-from widgets import WeChatButton
+from db import get_conn, transaction
+from database import regroup_renters, assign_group_contract
+import queries
+import lookups
+from widgets import WeChatButton, is_alive
+from virtual_tree import VirtualTree
+from exporter import mask_idcard
+import events
 
 
 class RenterManager:
     """租客管理器"""
+    # 列表显示的数据来源（所住房间、合同状态）
+    TOPICS = (events.RENTER, events.CONTRACT, events.ROOM)
     
     def __init__(self, content, user_id):
         self.content = content
         self.user_id = user_id
         self.tree = None
+        self.list = None
         
     def create_page(self):
         """创建租客管理页面"""
         tk.Label(self.content, text="租客管理", font=('Microsoft YaHei UI',18,'bold'),
                  bg=COLORS['bg'], fg=COLORS['text']).pack(pady=25)
 
-        self.tree = ttk.Treeview(self.content, columns=("renter_id","renter_name","room_name","renter_idcard","renter_tel","renter_wechat","renter_lock_id","renter_lock_pass","renter_finger","note","contract_status","is_blacklisted","linked_info"), show="headings", height=18)
+        self.list = VirtualTree(self.content, ("renter_id","renter_name","room_name","renter_idcard","renter_tel","renter_wechat","renter_lock_id","renter_lock_pass","renter_finger","note","contract_status","is_blacklisted","linked_info"),
+                                queries.RENTER_COUNT, queries.RENTER_LIST, (self.user_id,), self._format_renter,
+                                position_sql=queries.RENTER_POSITION)
+        self.tree = self.list.tree
         cols = [
             ("renter_id","ID",60),
             ("renter_name","姓名",140),
@@ -40,7 +52,9 @@ class RenterManager:
         for col, text, w in cols:
             self.tree.heading(col, text=text)
             self.tree.column(col, width=w, anchor='center')
-        self.tree.pack(fill='both', expand=True, padx=30, pady=10)
+        for bg_color in ('#FF0000', '#FFA500', 'white'):
+            self.tree.tag_configure(bg_color, background=bg_color)
+        self.list.pack(fill='both', expand=True, padx=30, pady=10)
 
         btns = tk.Frame(self.content, bg=COLORS['bg'])
         btns.pack(pady=10)
@@ -53,72 +67,45 @@ class RenterManager:
     
     def load_renters(self):
         """加载租客数据"""
-        try:
-            for i in self.tree.get_children():
-                self.tree.delete(i)
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            
-            c.execute("""
-                SELECT r.renter_id, r.renter_name, rm.room_name, r.renter_idcard, r.renter_tel, r.renter_wechat, 
-                       r.renter_lock_id, r.renter_lock_pass, r.renter_finger, r.note, 
-                       c.status as contract_status, r.is_blacklisted,
-                       (
-                           SELECT GROUP_CONCAT(sub_r.renter_name, ', ')
-                           FROM renter_link rl
-                           JOIN renter sub_r ON rl.renter_id = sub_r.renter_id
-                           WHERE rl.linked_renter_id = r.renter_id
-                       ) as sub_renters,
-                       (
-                           SELECT main_r.renter_name
-                           FROM renter_link rl
-                           JOIN renter main_r ON rl.linked_renter_id = main_r.renter_id
-                           WHERE rl.renter_id = r.renter_id
-                       ) as main_renter
-                FROM renter r 
-                LEFT JOIN contract c ON r.contract_id = c.contract_id 
-                LEFT JOIN room rm ON c.room_id = rm.room_id 
-                WHERE r.user_id=?
-            """, (self.user_id,))
-            
-            rows = c.fetchall()
-            for row in rows:
-                row = list(row)
-                
-                if row[13]: 
-                    link_info = f"主租客: {row[13]}"
-                elif row[12]:
-                    link_info = row[12]
-                else:
-                    link_info = ""
-                
-                final_row = row[:12]
-                final_row[3] = final_row[3][:6] + '********' + final_row[3][-4:] if final_row[3] else ''
-                final_row.append(link_info)
-                
-                contract_status = final_row[10] 
-                is_blacklisted = final_row[11]
-                room_name = final_row[2]
-                
-                # 只有"履行中"才显示房间，否则视为无房
-                if contract_status != '履行中':
-                    room_name = ''
-                
-                if is_blacklisted:
-                    bg_color = '#FF0000'
-                elif contract_status == '履行中':
-                    bg_color = '#FFA500'
-                else:
-                    bg_color = 'white'
-                
-                final_row[2] = room_name
-                
-                self.tree.insert("", "end", values=final_row, tags=(bg_color,))
-                self.tree.tag_configure(bg_color, background=bg_color)
-            
-            conn.close()
-        except Exception as e:
-            print(f"加载租客列表出错: {e}")
+        if is_alive(self.tree):
+            self.list.refresh()
+
+    def reveal(self, renter_id):
+        """定位并选中指定租客（搜索结果跳转）"""
+        if is_alive(self.tree):
+            self.list.reveal(renter_id)
+
+    def _format_renter(self, row):
+        row = list(row)
+        
+        if row[13]: 
+            link_info = f"主租客: {row[13]}"
+        elif row[12]:
+            link_info = row[12]
+        else:
+            link_info = ""
+        
+        final_row = row[:12]
+        final_row[3] = mask_idcard(final_row[3])
+        final_row.append(link_info)
+        
+        contract_status = final_row[10] 
+        is_blacklisted = final_row[11]
+        room_name = final_row[2]
+        
+        # 只有"履行中"才显示房间，否则视为无房
+        if contract_status != '履行中':
+            room_name = ''
+        
+        if is_blacklisted:
+            bg_color = '#FF0000'
+        elif contract_status == '履行中':
+            bg_color = '#FFA500'
+        else:
+            bg_color = 'white'
+        
+        final_row[2] = room_name
+        return final_row, (bg_color,)
 
     def add_renter(self):
         """添加租客"""
@@ -172,12 +159,8 @@ class RenterManager:
         blacklisted_check.grid(row=8,column=1,sticky='w',pady=10)
 
         tk.Label(f, text="关联租客", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=9,column=0,sticky='w',pady=10)
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT renter_id, renter_name FROM renter WHERE user_id=?", (self.user_id,))
-        renters = c.fetchall()
-        conn.close()
-        renter_names = [r[1] for r in renters]
+        renters = lookups.get(self.user_id).renters
+        renter_names = renters.names
         renter_var = tk.StringVar()
         combo = ttk.Combobox(f, textvariable=renter_var, values=renter_names, state="readonly", width=27)
         combo.grid(row=9,column=1,pady=10)
@@ -197,25 +180,19 @@ class RenterManager:
             is_blacklisted = is_blacklisted_var.get()
             linked_renter_name = renter_var.get()
             
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO renter (user_id, renter_name, renter_idcard, renter_tel, renter_wechat, renter_lock_id, renter_lock_pass, renter_finger, note, is_blacklisted) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                      (self.user_id, name, idcard, tel, wechat, lock_id, lock_pass, finger, note, is_blacklisted))
+            with transaction() as c:
+                c.execute("INSERT INTO renter (user_id, renter_name, renter_idcard, renter_tel, renter_wechat, renter_lock_id, renter_lock_pass, renter_finger, note, is_blacklisted) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          (self.user_id, name, idcard, tel, wechat, lock_id, lock_pass, finger, note, is_blacklisted))
             
-            new_renter_id = c.lastrowid
+                new_renter_id = c.lastrowid
             
-            if linked_renter_name:
-                linked_renter_id = next(r[0] for r in renters if r[1] == linked_renter_name)
-                c.execute("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", (new_renter_id, linked_renter_id))
-                c.execute("SELECT contract_id FROM renter WHERE renter_id=?", (linked_renter_id,))
-                contract_row = c.fetchone()
-                if contract_row and contract_row[0]:
-                    c.execute("UPDATE renter SET contract_id=? WHERE renter_id=?", (contract_row[0], new_renter_id))
+                if linked_renter_name:
+                    linked_renter_id = renters.id_of(linked_renter_name)
+                    c.execute("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", (new_renter_id, linked_renter_id))
+                    self._join_group(c, new_renter_id, linked_renter_id)
             
-            conn.commit()
-            conn.close()
             win.destroy()
-            self.load_renters()
+            events.publish(events.RENTER, new_renter_id, events.INSERT)
 
         WeChatButton(f, text="确定添加", command=save, width=20).grid(row=10,column=0,columnspan=2,pady=25)
 
@@ -286,13 +263,12 @@ class RenterManager:
 
         tk.Label(f, text="关联租客", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=9,column=0,sticky='w',pady=10)
         
-        conn = sqlite3.connect('landlord.db')
+        conn = get_conn()
         c = conn.cursor()
         c.execute("SELECT COUNT(*) FROM renter_link WHERE linked_renter_id=?", (rid,))
         has_subs = c.fetchone()[0] > 0
         c.execute("SELECT r.renter_name FROM renter_link rl JOIN renter r ON rl.linked_renter_id = r.renter_id WHERE rl.renter_id=?", (rid,))
         main_renter_row = c.fetchone()
-        conn.close()
 
         if has_subs:
             renter_var = tk.StringVar(value="主租客")
@@ -306,12 +282,8 @@ class RenterManager:
             combo = ttk.Combobox(f, textvariable=renter_var, values=[display_text, "无"], state="readonly", width=27)
             combo.grid(row=9,column=1,pady=10)
         else:
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("SELECT renter_id, renter_name FROM renter WHERE user_id=? AND renter_id!=?", (self.user_id, rid))
-            renters = c.fetchall()
-            conn.close()
-            renter_names = [r[1] for r in renters]
+            renters = lookups.get(self.user_id).renters
+            renter_names = renters.names_where(lambda id_: id_ != rid)
             renter_var = tk.StringVar(value="")
             combo = ttk.Combobox(f, textvariable=renter_var, values=renter_names, state="readonly", width=27)
             combo.grid(row=9,column=1,pady=10)
@@ -331,39 +303,28 @@ class RenterManager:
             note = e_note.get().strip()
             is_blacklisted = is_blacklisted_var.get()
             
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            
-            c.execute("UPDATE renter SET renter_name=?, renter_idcard=?, renter_tel=?, renter_wechat=?, renter_lock_id=?, renter_lock_pass=?, renter_finger=?, note=?, is_blacklisted=? WHERE renter_id=?",
-                      (name, idcard, tel, wechat, lock_id, lock_pass, finger, note, is_blacklisted, rid))
+            with transaction() as c:
+                c.execute("UPDATE renter SET renter_name=?, renter_idcard=?, renter_tel=?, renter_wechat=?, renter_lock_id=?, renter_lock_pass=?, renter_finger=?, note=?, is_blacklisted=? WHERE renter_id=?",
+                          (name, idcard, tel, wechat, lock_id, lock_pass, finger, note, is_blacklisted, rid))
             
-            selected_value = renter_var.get()
+                selected_value = renter_var.get()
             
-            if has_subs:
-                pass
-            elif main_renter_row:
-                if selected_value == "无" or not selected_value:
-                    c.execute("DELETE FROM renter_link WHERE renter_id=?", (rid,))
-                    c.execute("UPDATE renter SET contract_id=NULL WHERE renter_id=?", (rid,))
-            else:
-                if selected_value:
-                    conn2 = sqlite3.connect('landlord.db')
-                    c2 = conn2.cursor()
-                    c2.execute("SELECT renter_id FROM renter WHERE user_id=? AND renter_name=?", (self.user_id, selected_value))
-                    target_row = c2.fetchone()
-                    conn2.close()
-                    if target_row:
-                        target_id = target_row[0]
-                        c.execute("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", (rid, target_id))
-                        c.execute("SELECT contract_id FROM renter WHERE renter_id=?", (target_id,))
-                        contract_row = c.fetchone()
-                        if contract_row and contract_row[0]:
-                            c.execute("UPDATE renter SET contract_id=? WHERE renter_id=?", (contract_row[0], rid))
+                if has_subs:
+                    pass
+                elif main_renter_row:
+                    if selected_value == "无" or not selected_value:
+                        c.execute("DELETE FROM renter_link WHERE renter_id=?", (rid,))
+                        regroup_renters(c, [rid])
+                        assign_group_contract(c, rid, None)
+                else:
+                    if selected_value:
+                        target_id = renters.id_of(selected_value)
+                        if target_id:
+                            c.execute("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", (rid, target_id))
+                            self._join_group(c, rid, target_id)
             
-            conn.commit()
-            conn.close()
             win.destroy()
-            self.load_renters()
+            events.publish(events.RENTER, rid, events.UPDATE)
 
         WeChatButton(f, text="保存修改", command=save, width=20).grid(row=10,column=0,columnspan=2,pady=25)
 
@@ -375,12 +336,21 @@ class RenterManager:
         if not messagebox.askyesno("确认", "确定删除？"):
             return
         rid = self.tree.item(sel[0])["values"][0]
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("DELETE FROM renter WHERE renter_id=?", (rid,))
-        conn.commit()
-        conn.close()
-        self.load_renters()
+        with transaction() as c:
+            # 先解除关联并重算分组，被删除的主租客名下的租客各自成组
+            c.execute("DELETE FROM renter_link WHERE renter_id=? OR linked_renter_id=?", (rid, rid))
+            regroup_renters(c, [rid])
+            c.execute("DELETE FROM renter WHERE renter_id=?", (rid,))
+        events.publish(events.RENTER, rid, events.DELETE)
+
+    @staticmethod
+    def _join_group(c, renter_id, main_renter_id):
+        """新增关联后合并分组；主租客已有合同时整组一起使用该合同"""
+        regroup_renters(c, [renter_id, main_renter_id])
+        c.execute("SELECT contract_id FROM renter WHERE renter_id=?", (main_renter_id,))
+        contract_row = c.fetchone()
+        if contract_row and contract_row[0]:
+            assign_group_contract(c, main_renter_id, contract_row[0])
 
     def link_renters(self):
         """关联租客"""
@@ -403,13 +373,8 @@ class RenterManager:
 
         tk.Label(f, text="选择主租客", bg='white', font=('Microsoft YaHei UI',10,'bold')).grid(row=0,column=0,sticky='w',pady=10)
         
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT renter_id, renter_name FROM renter WHERE user_id=? AND renter_id!=?", (self.user_id, sub_renter_id))
-        renters = c.fetchall()
-        conn.close()
-        
-        renter_names = [r[1] for r in renters]
+        renters = lookups.get(self.user_id).renters
+        renter_names = renters.names_where(lambda id_: id_ != sub_renter_id)
         renter_var = tk.StringVar()
         combo = ttk.Combobox(f, textvariable=renter_var, values=renter_names, state="readonly", width=27)
         combo.grid(row=0,column=1,pady=10)
@@ -420,27 +385,19 @@ class RenterManager:
                 messagebox.showerror("错误", "请选择主租客", parent=win)
                 return
             
-            main_renter_id = next(r[0] for r in renters if r[1] == selected_name)
-            
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
+            main_renter_id = renters.id_of(selected_name)
             
+            c = get_conn().cursor()
             c.execute("SELECT 1 FROM renter_link WHERE renter_id=? AND linked_renter_id=?", (sub_renter_id, main_renter_id))
             if c.fetchone():
                 messagebox.showwarning("提示", "这两个租客已经关联过了", parent=win)
-                conn.close()
                 return
             
-            c.execute("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", (sub_renter_id, main_renter_id))
-            
-            c.execute("SELECT contract_id FROM renter WHERE renter_id=?", (main_renter_id,))
-            contract_row = c.fetchone()
-            if contract_row and contract_row[0]:
-                c.execute("UPDATE renter SET contract_id=? WHERE renter_id=?", (contract_row[0], sub_renter_id))
+            with transaction() as c:
+                c.execute("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", (sub_renter_id, main_renter_id))
+                self._join_group(c, sub_renter_id, main_renter_id)
             
-            conn.commit()
-            conn.close()
             win.destroy()
-            self.load_renters()
+            events.publish(events.RENTER, sub_renter_id, events.UPDATE)
 
         WeChatButton(f, text="确认关联", command=save_link, width=20).grid(row=1,column=0,columnspan=2,pady=25)
@@ -3,20 +3,26 @@
 
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from config import COLORS
-from widgets import WeChatButton
+from db import transaction
+import queries
+import lookups
+from widgets import WeChatButton, is_alive
+from virtual_tree import VirtualTree
 from dialogs import center_window
+import events
 
 class RoomManager:
     """房间管理器"""
+    # 列表显示的数据来源（楼栋名称、家具数/成本、合同状态）
+    TOPICS = (events.HOUSE, events.ROOM, events.FURNITURE, events.CONTRACT)
     
-    def __init__(self, content, user_id, on_update_callback, to_furniture_callback=None):
+    def __init__(self, content, user_id, to_furniture_callback=None):
         self.content = content
         self.user_id = user_id
-        self.on_update_callback = on_update_callback       # 用于更新楼栋/家具数据的回调
         self.to_furniture_callback = to_furniture_callback # 用于跳转家具页面的回调
         self.tree = None
+        self.list = None
         
     def create_page(self):
         """创建房间管理页面"""
@@ -24,7 +30,10 @@ class RoomManager:
                  bg=COLORS['bg'], fg=COLORS['text']).pack(pady=25)
 
         # 定义列：ID, 楼栋名称, 房间名称, 面积, 家具数, 成本, 租金, 状态, 楼栋ID(隐藏), 合同状态(隐藏)
-        self.tree = ttk.Treeview(self.content, columns=("room_id","house_name","room_name","room_area","furniture_count","room_cost","room_rent","room_status","house_id","contract_status"), show="headings", height=18)
+        self.list = VirtualTree(self.content, ("room_id","house_name","room_name","room_area","furniture_count","room_cost","room_rent","room_status","house_id","contract_status"),
+                                queries.ROOM_COUNT, queries.ROOM_LIST, (self.user_id,), self._format_room,
+                                position_sql=queries.ROOM_POSITION)
+        self.tree = self.list.tree
         
         # 可见列配置
         visible_cols = [
@@ -52,7 +61,7 @@ class RoomManager:
         self.tree.tag_configure('unavailable', background='#FFCDD2')
         self.tree.tag_configure('self_occupied', background='#FFCDD2')
 
-        self.tree.pack(fill='both', expand=True, padx=30, pady=10)
+        self.list.pack(fill='both', expand=True, padx=30, pady=10)
 
         btns = tk.Frame(self.content, bg=COLORS['bg'])
         btns.pack(pady=10)
@@ -79,61 +88,30 @@ class RoomManager:
     
     def load_rooms(self):
         """加载房间数据 - 租金优先显示有效合同的金额"""
-        try:
-            if not (self.tree and str(self.tree.winfo_exists()) == "1"):
-                return
-        except tk.TclError:
+        if not is_alive(self.tree):
             return
+        self.list.refresh()
 
-        for i in self.tree.get_children():
-            self.tree.delete(i)
-            
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        
-        c.execute("""
-            SELECT 
-                r.room_id,
-                h.house_name,
-                r.room_name,
-                r.room_area,
-                r.furniture_count,
-                r.room_cost,
-                COALESCE(c.rent, r.room_rent) AS display_rent,   -- 优先使用合同租金
-                CASE 
-                    WHEN c.status = '履行中' THEN '🔑 出租中'
-                    WHEN r.room_status = '空置' THEN '✅ 空置'
-                    WHEN r.room_status = '维修中' THEN '🔧 维修中'
-                    WHEN r.room_status = '不可用' THEN '❌ 不可用'
-                    WHEN r.room_status = '自住' THEN '🏠 自住'
-                    ELSE r.room_status
-                END AS display_status,
-                r.house_id,
-                c.status AS contract_status
-            FROM room r
-            LEFT JOIN house h ON r.house_id = h.house_id
-            LEFT JOIN contract c ON r.room_id = c.room_id AND c.status = '履行中'
-            WHERE r.user_id = ?
-            ORDER BY h.house_name, r.room_name
-        """, (self.user_id,))
-        
-        for row in c.fetchall():
-            values = list(row)
-            # 格式化租金
-            rent_value = values[6] if values[6] is not None else 0.0
-            values[6] = f"¥{float(rent_value):,.2f}"
-            
-            # 确定颜色标签
-            tag = 'vacant'
-            status_text = str(values[7])
-            if '履行中' in status_text or '出租中' in status_text:
-                tag = 'rented'
-            elif '维修中' in status_text or '不可用' in status_text or '自住' in status_text:
-                tag = 'repair'
-                
-            self.tree.insert("", "end", values=values, tags=(tag,))
+    def reveal(self, room_id):
+        """定位并选中指定房间（搜索结果跳转）"""
+        if is_alive(self.tree):
+            self.list.reveal(room_id)
+
+    def _format_room(self, row):
+        values = list(row)
+        # 格式化租金
+        rent_value = values[6] if values[6] is not None else 0.0
+        values[6] = f"¥{float(rent_value):,.2f}"
         
-        conn.close()
+        # 确定颜色标签
+        tag = 'vacant'
+        status_text = str(values[7])
+        if '履行中' in status_text or '出租中' in status_text:
+            tag = 'rented'
+        elif '维修中' in status_text or '不可用' in status_text or '自住' in status_text:
+            tag = 'repair'
+        return values, (tag,)
+
 
     def add_room(self):
         """添加房间（保持原有逻辑）"""
@@ -154,13 +132,8 @@ class RoomManager:
         house_combo = ttk.Combobox(f, textvariable=house_var, state="readonly", width=27)
         house_combo.grid(row=0,column=1,pady=12)
         
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT house_id, house_name FROM house WHERE user_id=?", (self.user_id,))
-        houses = c.fetchall()
-        house_names = [h[1] for h in houses]
-        house_combo['values'] = house_names
-        conn.close()
+        houses = lookups.get(self.user_id).houses
+        house_combo['values'] = houses.names
 
         tk.Label(f, text="房间名称", bg='white', font=('Microsoft YaHei UI',10, 'bold')).grid(row=1,column=0,sticky='w',pady=12)
         e_name = tk.Entry(f, width=30)
@@ -192,7 +165,7 @@ class RoomManager:
                 messagebox.showerror("错误", "请填写完整", parent=win)
                 return
                 
-            hid = next((h[0] for h in houses if h[1] == hname), None)
+            hid = houses.id_of(hname)
             if not hid:
                 messagebox.showerror("错误", "无效的楼栋", parent=win)
                 return
@@ -204,18 +177,13 @@ class RoomManager:
                 messagebox.showerror("错误", "面积和租金必须是数字", parent=win)
                 return
 
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            c.execute("INSERT INTO room (user_id, house_id, room_name, room_area, room_rent, room_status) VALUES (?,?,?,?,?,?)",
-                      (self.user_id, hid, name, area, rent, status))
-            conn.commit()
-            conn.close()
-            
-            if self.on_update_callback:
-                self.on_update_callback()
+            with transaction() as c:
+                c.execute("INSERT INTO room (user_id, house_id, room_name, room_area, room_rent, room_status) VALUES (?,?,?,?,?,?)",
+                          (self.user_id, hid, name, area, rent, status))
+                rid = c.lastrowid
                 
             win.destroy()
-            self.load_rooms()
+            events.publish(events.ROOM, rid, events.INSERT)
 
         WeChatButton(f, text="确定添加", command=save, width=20).grid(row=5,column=0,columnspan=2,pady=20)
 
@@ -245,15 +213,12 @@ class RoomManager:
         house_combo = ttk.Combobox(f, textvariable=house_var, state="readonly", width=27)
         house_combo.grid(row=0,column=1,pady=12)
         
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("SELECT house_id, house_name FROM house WHERE user_id=?", (self.user_id,))
-        houses = c.fetchall()
-        house_names = [h[1] for h in houses]
-        house_combo['values'] = house_names
+        houses = lookups.get(self.user_id).houses
+        house_combo['values'] = houses.names
         
-        current_house_name = values[1]
-        if current_house_name in house_names:
+        # values[8] 为隐藏的楼栋ID
+        current_house_name = houses.name_of(values[8])
+        if current_house_name:
             house_var.set(current_house_name)
 
         # 房间名称
@@ -297,7 +262,7 @@ class RoomManager:
                 messagebox.showerror("错误", "请填写完整", parent=win)
                 return
                 
-            hid = next((h[0] for h in houses if h[1] == hname), None)
+            hid = houses.id_of(hname)
             if not hid:
                 messagebox.showerror("错误", "无效的楼栋", parent=win)
                 return
@@ -308,19 +273,13 @@ class RoomManager:
                 messagebox.showerror("错误", "面积必须是数字", parent=win)
                 return
 
-            conn = sqlite3.connect('landlord.db')
-            c = conn.cursor()
-            # 不再更新 room_rent
-            c.execute("UPDATE room SET house_id=?, room_name=?, room_area=?, room_status=? WHERE room_id=?", 
-                      (hid, name, area, status, rid))
-            conn.commit()
-            conn.close()
-            
-            if self.on_update_callback:
-                self.on_update_callback()
+            with transaction() as c:
+                # 不再更新 room_rent
+                c.execute("UPDATE room SET house_id=?, room_name=?, room_area=?, room_status=? WHERE room_id=?", 
+                          (hid, name, area, status, rid))
                 
             win.destroy()
-            self.load_rooms()
+            events.publish(events.ROOM, rid, events.UPDATE)
 
         WeChatButton(f, text="保存修改", command=save, width=20).grid(row=6,column=0,columnspan=2,pady=25)
 
@@ -332,13 +291,6 @@ class RoomManager:
         if not messagebox.askyesno("确认", "删除房间会删除相关家具数据，确定吗？"):
             return
         rid = self.tree.item(sel[0])["values"][0]
-        conn = sqlite3.connect('landlord.db')
-        c = conn.cursor()
-        c.execute("DELETE FROM room WHERE room_id=?", (rid,))
-        conn.commit()
-        conn.close()
-        
-        if self.on_update_callback:
-            self.on_update_callback()
-        
-        self.load_rooms()
\ No newline at end of file
+        with transaction() as c:
+            c.execute("DELETE FROM room WHERE room_id=?", (rid,))
+        events.publish(events.ROOM, rid, events.DELETE)
\ No newline at end of file
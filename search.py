@@ -0,0 +1,57 @@
+# search.py
+"""全文搜索模块 - 在楼栋、房间、租客、合同、家具中按关键字查找"""
+
+from db import get_conn
+
+# 类型编号 -> (显示名称, 主界面页码)，编号与 database.SEARCH_SOURCES 一致
+KINDS = {
+    1: ('楼栋', 1),
+    2: ('房间', 2),
+    3: ('租客', 4),
+    4: ('合同', 5),
+    5: ('家具', 3),
+}
+
+# FTS5 全文匹配（trigram 分词，关键字至少3个字符）
+SEARCH_MATCH = """
+    SELECT rowid % 8, rowid / 8, title, detail
+    FROM search_index
+    WHERE search_index MATCH ? AND user_id = ?
+    ORDER BY rank
+    LIMIT ?
+"""
+
+# 逐行匹配：关键字不足3个字符，或当前 SQLite 不支持 FTS5 时使用
+SEARCH_SCAN = """
+    SELECT rowid % 8, rowid / 8, title, detail
+    FROM search_index
+    WHERE user_id = ?1 AND (instr(lower(title), lower(?2)) > 0 OR instr(lower(detail), lower(?2)) > 0)
+    LIMIT ?3
+"""
+
+_fts_enabled = None
+
+
+def fts_enabled():
+    """search_index 是否为 FTS5 虚拟表"""
+    global _fts_enabled
+    if _fts_enabled is None:
+        row = get_conn().execute(
+            "SELECT sql FROM sqlite_master WHERE name='search_index'").fetchone()
+        _fts_enabled = bool(row and 'fts5' in row[0].lower())
+    return _fts_enabled
+
+
+def search(user_id, text, limit=50):
+    """搜索关键字，返回 [(类型编号, 主键, 标题, 详情)]"""
+    text = text.strip()
+    if not text:
+        return []
+    conn = get_conn()
+    if fts_enabled() and len(text) >= 3:
+        # 整个关键字作为一个短语匹配，避免用户输入被当作 FTS 查询语法
+        phrase = '"' + text.replace('"', '""') + '"'
+        rows = conn.execute(SEARCH_MATCH, (phrase, user_id, limit)).fetchall()
+    else:
+        rows = conn.execute(SEARCH_SCAN, (user_id, text, limit)).fetchall()
+    return [(kind, ref_id, title, detail.strip()) for kind, ref_id, title, detail in rows]
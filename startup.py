@@ -0,0 +1,122 @@
+# startup.py
+"""启动耗时统计 - 记录启动各阶段（导入、建窗口、首次绘制、数据库就绪）的耗时和模块导入耗时明细
+
+开启方式：config.STARTUP_REPORT = True、环境变量 HOUSEHUNTER_STARTUP_REPORT=1 或 python main.py --startup-report。
+报告打印到标准错误，并追加一行 JSON 到 STARTUP_LOG，便于对比不同版本。
+无界面环境可用 python manage.py startup 测量导入和数据库初始化耗时。
+"""
+
+import os
+import sys
+import time
+
+from config import STARTUP_REPORT, STARTUP_LOG
+
+T0 = time.perf_counter()
+_enabled = (STARTUP_REPORT or '--startup-report' in sys.argv
+            or os.environ.get('HOUSEHUNTER_STARTUP_REPORT', '') not in ('', '0'))
+_marks = []
+_imports = {}
+_reported = False
+
+
+def enabled():
+    return _enabled
+
+
+def mark(name):
+    """记录一个启动阶段（距进程导入本模块的毫秒数）"""
+    if _enabled:
+        _marks.append((name, (time.perf_counter() - T0) * 1000))
+
+
+# 只用到查找器/加载器协议的方法，不继承 importlib.abc，关闭统计时不多导入任何模块
+class _ImportTimer:
+    """像 -X importtime 一样统计每个模块的自身耗时和累计耗时（只统计安装之后首次导入的模块）"""
+
+    def __init__(self):
+        self._stack = []
+
+    def find_spec(self, name, path, target=None):
+        # 交给其余查找器找到模块，再包装加载器的 exec_module
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(name, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = _TimedLoader(spec.loader, name, self._stack)
+                return spec
+        return None
+
+
+class _TimedLoader:
+    def __init__(self, loader, name, stack):
+        self._loader = loader
+        self._name = name
+        self._stack = stack
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            self._loader.exec_module(module)
+        finally:
+            total = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += total
+            _imports[self._name] = ((total - children) * 1000, total * 1000)
+
+    def __getattr__(self, name):
+        # get_resource_reader / is_package 等转交原加载器
+        return getattr(self._loader, name)
+
+
+if _enabled:
+    sys.meta_path.insert(0, _ImportTimer())
+
+
+def report(top=15):
+    """当前统计：{'marks': [(阶段, ms)], 'imports': [(模块, 自身ms, 累计ms)]}（导入按累计耗时降序）"""
+    imports = sorted(((name, self_ms, total_ms) for name, (self_ms, total_ms) in _imports.items()),
+                     key=lambda item: -item[2])
+    return {'marks': list(_marks), 'imports': imports[:top]}
+
+
+def finish():
+    """输出报告（只输出一次）"""
+    global _reported
+    if not _enabled or _reported:
+        return
+    _reported = True
+    import json
+    import datetime
+    data = report()
+    print("启动耗时:", file=sys.stderr)
+    for stage, ms in data['marks']:
+        print(f"  {stage:<16} {ms:>9.1f} ms", file=sys.stderr)
+    print("导入耗时（累计前 15）:", file=sys.stderr)
+    for module, self_ms, total_ms in data['imports']:
+        print(f"  {module:<32} 自身 {self_ms:>8.1f} ms  累计 {total_ms:>8.1f} ms", file=sys.stderr)
+    try:
+        with open(STARTUP_LOG, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'time': datetime.datetime.now().isoformat(timespec='seconds'), **data},
+                               ensure_ascii=False) + "\n")
+    except OSError:
+        pass
+
+
+def parse_importtime(text):
+    """解析 python -X importtime 的输出：[(模块, 自身ms, 累计ms, 层级)]，按输出顺序"""
+    import re
+    pattern = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+    rows = []
+    for line in text.splitlines():
+        m = pattern.match(line)
+        if m:
+            rows.append((m.group(4), int(m.group(1)) / 1000, int(m.group(2)) / 1000, (len(m.group(3)) - 1) // 2))
+    return rows
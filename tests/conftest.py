@@ -0,0 +1,28 @@
+# conftest.py
+"""测试公共夹具：每个测试使用临时目录中的新数据库"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db
+import database
+
+
+@pytest.fixture
+def conn(tmp_path):
+    """已建好表结构的临时数据库，返回主线程连接"""
+    db.set_db_path(str(tmp_path / "test.db"))
+    database.init_db()
+    yield db.get_conn()
+    db.close_all()
+
+
+@pytest.fixture
+def user_id(conn):
+    with db.transaction() as c:
+        c.execute("INSERT INTO user (user, password) VALUES ('tester', 'x')")
+        return c.lastrowid
@@ -0,0 +1,51 @@
+# test_events.py
+"""变更事件总线：按实体分发、合并通知、订阅者出错隔离"""
+
+import events
+from events import EventBus
+
+
+class FakeRoot:
+    def __init__(self):
+        self.idle = []
+
+    def after_idle(self, fn):
+        self.idle.append(fn)
+
+
+def test_dispatch_by_entity():
+    bus = EventBus()
+    rooms, renters = [], []
+    bus.subscribe((events.ROOM,), rooms.append)
+    bus.subscribe((events.RENTER,), renters.append)
+    bus.publish(events.ROOM, 1, events.INSERT)
+    assert rooms == [[events.Change(events.ROOM, 1, events.INSERT)]]
+    assert renters == []
+
+
+def test_changes_coalesced_until_idle():
+    bus = EventBus()
+    root = FakeRoot()
+    bus.bind(root)
+    calls = []
+    bus.subscribe((events.ROOM, events.HOUSE), calls.append)
+    bus.publish(events.ROOM, 1)
+    bus.publish(events.HOUSE, 2)
+    assert calls == [] and len(root.idle) == 1
+    root.idle.pop()()
+    assert calls == [[events.Change(events.ROOM, 1, events.UPDATE), events.Change(events.HOUSE, 2, events.UPDATE)]]
+
+
+def test_failing_subscriber_does_not_block_others(caplog):
+    bus = EventBus()
+    seen = []
+
+    def broken(changes):
+        raise RuntimeError("刷新失败")
+
+    bus.subscribe((events.CONTRACT,), seen.append)
+    bus.subscribe((events.CONTRACT,), broken)
+    bus.subscribe((events.CONTRACT,), seen.append)
+    bus.publish(events.CONTRACT, 7)
+    assert len(seen) == 2
+    assert "刷新失败" in caplog.text
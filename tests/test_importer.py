@@ -0,0 +1,105 @@
+# test_importer.py
+"""批量导入：逐行校验、按块提交、期初收租流水"""
+
+import datetime
+import json
+
+import db
+import importer
+
+TODAY = datetime.date(2025, 3, 1)
+
+
+def _write(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    return str(path)
+
+
+def _import(tmp_path, entity, lines, user_id, **kw):
+    return importer.import_file(_write(tmp_path / f"{entity}.csv", lines), entity, user_id, today=TODAY, **kw)
+
+
+def _setup_rooms(tmp_path, user_id, rooms=3):
+    _import(tmp_path, 'house', ["楼栋名称", "一号楼", "二号楼"], user_id)
+    _import(tmp_path, 'room', ["楼栋,房间名称,租金"] + [f"一号楼,{100 + i},1000" for i in range(rooms)]
+            + ["二号楼,101,900"], user_id)
+    _import(tmp_path, 'renter', ["姓名,身份证"] + [f"租客{i},ID{i}" for i in range(rooms)]
+            + ["重名,A", "重名,B"], user_id)
+
+
+def test_validation_errors(tmp_path, conn, user_id):
+    _setup_rooms(tmp_path, user_id)
+    result = _import(tmp_path, 'contract', [
+        "楼栋,房间,租客,开始日期,结束日期,租金,付款方式,状态",
+        "一号楼,100,租客0,2025-01-01,2025-12-31,1000,月付,",     # 正确
+        "一号楼,100,租客0,,2025-12-31,1000,月付,",               # 缺少开始日期
+        "一号楼,100,租客0,2025-13-01,2025-12-31,1000,月付,",     # 日期不合法
+        "一号楼,100,租客0,2025-01-01,2025-12-31,一千,月付,",      # 金额不是数字
+        "一号楼,100,租客0,2025-01-01,2025-12-31,1000,周付,",      # 付款方式不在可选值中
+        "一号楼,100,租客0,2025-06-01,2025-01-01,1000,月付,",     # 开始晚于结束
+        "一号楼,999,租客0,2025-01-01,2025-12-31,1000,月付,",     # 找不到房间
+        ",101,租客0,2025-01-01,2025-12-31,1000,月付,",           # 未填楼栋且房间名重名
+        "一号楼,100,重名,2025-01-01,2025-12-31,1000,月付,",       # 租客重名
+        "一号楼,100,租客0,2025-01-01,2025-12-31,1000,月付,作废",   # 状态不在可选值中
+    ], user_id)
+    assert (result.lines, result.inserted, result.error_count) == (10, 1, 9)
+    # 行号按文件行计，表头为第 1 行
+    messages = dict(result.errors)
+    assert sorted(messages) == list(range(3, 12))
+    assert "缺少必填字段: 开始日期" in messages[3]
+    assert "YYYY-MM-DD" in messages[4]
+    assert "不是数字" in messages[5]
+    assert "取值应为" in messages[6]
+    assert "开始日期不能晚于结束日期" in messages[7]
+    assert "找不到房间" in messages[8]
+    assert "房间重名" in messages[9]
+    assert "租客重名" in messages[10]
+    assert "取值应为" in messages[11]
+    assert conn.execute("SELECT COUNT(*) FROM contract").fetchone()[0] == 1
+
+
+def test_jsonl_errors(tmp_path, conn, user_id):
+    path = _write(tmp_path / "house.jsonl", [
+        json.dumps({"house_name": "三号楼", "house_floor": 6}),
+        "{bad json",
+        json.dumps(["不是对象"]),
+        json.dumps({"house_name": "四号楼", "house_floor": "六"}),
+    ])
+    result = importer.import_file(path, 'house', user_id)
+    assert result.inserted == 1
+    assert [line for line, _ in result.errors] == [2, 3, 4]
+
+
+def test_chunk_boundary(tmp_path, conn, user_id):
+    # 5 行按每块 2 行提交：3 个事务，跨块的合同和期初流水一一对应
+    _setup_rooms(tmp_path, user_id, rooms=5)
+    serial = db.write_serial()
+    result = _import(tmp_path, 'contract', ["楼栋,房间,租客,开始日期,结束日期,租金,已交租金,已付截止日期"] + [
+        f"一号楼,{100 + i},租客{i},2025-01-01,2025-12-31,{1000 + i},{(i + 1) * 100},2025-0{i + 1}-28"
+        for i in range(5)], user_id, chunk_size=2)
+    assert (result.inserted, result.error_count) == (5, 0)
+    assert db.write_serial() - serial == 3
+    rows = conn.execute("""SELECT c.rent, c.total_rent, c.paid_until_date, p.amount, p.period_end
+                           FROM contract c JOIN payment p ON p.contract_id = c.contract_id
+                           ORDER BY c.contract_id""").fetchall()
+    assert rows == [(1000.0 + i, (i + 1) * 100.0, f"2025-0{i + 1}-28", (i + 1) * 100.0, f"2025-0{i + 1}-28")
+                    for i in range(5)]
+
+
+def test_opening_ledger(tmp_path, conn, user_id):
+    _setup_rooms(tmp_path, user_id)
+    _import(tmp_path, 'contract', [
+        "楼栋,房间,租客,开始日期,结束日期,租金,押金,付款方式,已交租金,已付截止日期",
+        "一号楼,100,租客0,2025-01-15,2026-01-14,1000,2000,季付,3000,2025-04-14",
+        "一号楼,101,租客1,2025-02-01,2026-01-31,800,0,月付,,",    # 未交租：不建期初流水
+    ], user_id)
+    payments = conn.execute("""SELECT period_start, period_end, amount, paid_date, note
+                               FROM payment ORDER BY payment_id""").fetchall()
+    # 交租日期记为合同开始日期，收入不会算到合同开始之前的月份
+    assert payments == [('2025-01-15', '2025-04-14', 3000.0, '2025-01-15', '期初结转')]
+    contracts = conn.execute("""SELECT total_rent, total_cash, paid_until_date, status
+                                FROM contract ORDER BY contract_id""").fetchall()
+    assert contracts == [(3000.0, 5000.0, '2025-04-14', '履行中'),
+                         (0.0, 0.0, '2025-01-31', '履行中')]
+    # 履行中合同分配给租客
+    assert conn.execute("SELECT COUNT(*) FROM renter WHERE contract_id IS NOT NULL").fetchone()[0] == 2
@@ -0,0 +1,69 @@
+# test_migrations.py
+"""数据库升级：从旧版本升级到最新结构"""
+
+import datetime
+
+import db
+import database
+from payments import add_months, monthly_income
+
+
+def _init_until(version, monkeypatch):
+    """只执行到第 version 步，模拟旧版本的数据库"""
+    with monkeypatch.context() as m:
+        m.setattr(database, 'MIGRATIONS', [mig for mig in database.MIGRATIONS if mig[0] <= version])
+        database.init_db()
+    assert database.schema_version() == version
+
+
+def _old_contract(c, user_id, start, total_rent, paid_until):
+    """按旧版 add_contract 的写法新增合同：last_payment_date 为开始日期前一期"""
+    c.execute("INSERT INTO contract (user_id, start_date, end_date, rent, pledge, status, total_rent, total_cash, "
+              "payment_method, last_payment_date, paid_until_date) "
+              "VALUES (?, ?, '2026-03-09', 1000, 2000, '履行中', ?, ?, '季付', ?, ?)",
+              (user_id, start.isoformat(), total_rent, total_rent + 2000,
+               add_months(start, -3).isoformat(), paid_until))
+    return c.lastrowid
+
+
+def test_opening_payment_dated_at_contract_start(tmp_path, monkeypatch):
+    db.set_db_path(str(tmp_path / "old.db"))
+    try:
+        _init_until(7, monkeypatch)
+        with db.transaction() as c:
+            c.execute("INSERT INTO user (user, password) VALUES ('old', 'x')")
+            user_id = c.lastrowid
+            # 旧版已交一季租金：已付截止日期和已交租金直接写在合同上
+            paid = _old_contract(c, user_id, datetime.date(2025, 3, 10), 3000.0, '2025-06-09')
+            # 新建后未交租：不结转期初流水
+            _old_contract(c, user_id, datetime.date(2025, 4, 1), 0.0, '2025-03-31')
+        database.init_db()
+        conn = db.get_conn()
+        rows = conn.execute("SELECT contract_id, period_start, period_end, amount, paid_date FROM payment").fetchall()
+        assert rows == [(paid, '2025-03-10', '2025-06-09', 3000.0, '2025-03-10')]
+        # 按收款月份汇总时落在合同开始的月份
+        assert monthly_income(user_id, datetime.date(2024, 1, 1), datetime.date(2025, 12, 31)) == [('2025-03', 3000.0, 1)]
+        assert conn.execute("SELECT total_rent, paid_until_date FROM contract WHERE contract_id=?",
+                            (paid,)).fetchone() == (3000.0, '2025-06-09')
+    finally:
+        db.close_all()
+
+
+def test_repair_opening_paid_date(tmp_path, monkeypatch):
+    # 已按旧的第 8 步升级过的数据库：第 10 步把期初流水的交租日期改回合同开始日期
+    db.set_db_path(str(tmp_path / "v9.db"))
+    try:
+        _init_until(9, monkeypatch)
+        with db.transaction() as c:
+            c.execute("INSERT INTO user (user, password) VALUES ('old', 'x')")
+            user_id = c.lastrowid
+            cid = _old_contract(c, user_id, datetime.date(2025, 3, 10), 0.0, '2025-03-09')
+            c.executemany("INSERT INTO payment (user_id, contract_id, period_start, period_end, amount, paid_date, note) "
+                          "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                          [(user_id, cid, '2025-03-10', '2025-06-09', 3000.0, '2024-12-10', '期初结转'),
+                           (user_id, cid, '2025-06-10', '2025-09-09', 3000.0, '2025-06-05', '')])
+        database.init_db()
+        rows = db.get_conn().execute("SELECT paid_date FROM payment ORDER BY payment_id").fetchall()
+        assert rows == [('2025-03-10',), ('2025-06-05',)]
+    finally:
+        db.close_all()
@@ -0,0 +1,73 @@
+# test_occupancy.py
+"""出租率分析：重叠续租、无结束日期、范围裁剪、无法解析的日期、按月汇总"""
+
+import datetime
+
+import pytest
+
+from occupancy import analyze
+
+D = datetime.date
+ROOMS = [(1, '一号楼', '101', 3650.0), (2, '一号楼', '102', 0)]
+
+
+def _room(result, room_id):
+    return next(stats for stats in result['rooms'] if stats[0] == room_id)
+
+
+def test_overlapping_renewals_count_once():
+    # 续租交接期两份合同重叠：占用天数只算一次
+    contracts = [(1, '2025-01-01', '2025-01-20'), (1, '2025-01-15', '2025-01-31')]
+    result = analyze(ROOMS[:1], contracts, D(2025, 1, 1), D(2025, 1, 31))
+    assert _room(result, 1)[3] == 0
+    assert all(count == 1 for _, count in result['days'])
+    assert result['rate'] == 1.0
+
+
+def test_open_ended_contract_runs_to_range_end():
+    for end in (None, ''):
+        result = analyze(ROOMS[:1], [(1, '2025-01-11', end)], D(2025, 1, 1), D(2025, 1, 31))
+        assert _room(result, 1)[3] == 10
+        assert result['days'][-1] == (D(2025, 1, 31), 1)
+
+
+def test_contracts_clipped_to_range():
+    contracts = [(1, '2024-12-01', '2025-01-05'), (2, '2025-01-28', '2025-03-01')]
+    result = analyze(ROOMS, contracts, D(2025, 1, 1), D(2025, 1, 31))
+    assert _room(result, 1)[3] == 31 - 5
+    assert _room(result, 2)[3] == 31 - 4
+    assert result['days'][0] == (D(2025, 1, 1), 1)
+    assert result['days'][4] == (D(2025, 1, 5), 1)
+    assert result['days'][5] == (D(2025, 1, 6), 0)
+    # 完全在范围外的合同不计
+    result = analyze(ROOMS, [(1, '2024-01-01', '2024-12-31')], D(2025, 1, 1), D(2025, 1, 31))
+    assert _room(result, 1)[3] == 31
+
+
+def test_unparseable_dates():
+    # 开始日期无法解析的合同跳过；结束日期无法解析按无结束日期处理
+    contracts = [(1, 'not-a-date', '2025-01-31'), (2, '2025-01-22', '2025/02/01')]
+    result = analyze(ROOMS, contracts, D(2025, 1, 1), D(2025, 1, 31))
+    assert _room(result, 1)[3] == 31
+    assert _room(result, 2)[3] == 21
+
+
+def test_unknown_rooms_ignored():
+    result = analyze(ROOMS[:1], [(99, '2025-01-01', '2025-01-31')], D(2025, 1, 1), D(2025, 1, 31))
+    assert result['rate'] == 0.0
+
+
+def test_month_rollup_and_lost_rent():
+    contracts = [(1, '2025-01-01', '2025-02-14')]
+    result = analyze(ROOMS, contracts, D(2025, 1, 16), D(2025, 3, 3))
+    assert result['months'] == [
+        ('2025-01', 16, 32, 0.5),
+        ('2025-02', 14, 56, 0.25),
+        ('2025-03', 0, 6, 0.0),
+    ]
+    span = 47
+    assert result['rate'] == pytest.approx(30 / (2 * span))
+    # 空置损失按 月租 * 12 / 365 折算日租金
+    assert _room(result, 1)[3:] == (span - 30, pytest.approx((span - 30) * 3650.0 * 12 / 365))
+    assert _room(result, 2)[3:] == (span, 0)
+    assert result['lost_rent'] == pytest.approx((span - 30) * 120.0)
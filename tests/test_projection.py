@@ -0,0 +1,91 @@
+# test_projection.py
+"""租金预测：与逐日推算的参考实现对比"""
+
+import datetime
+import random
+
+from payments import PAY_MONTHS, add_months
+from projection import project
+
+ONE_DAY = datetime.timedelta(days=1)
+TODAY = datetime.date(2025, 3, 15)
+
+# (合同ID, 月租金, 付款方式, 开始日期, 结束日期, 已付截止日期)
+CONTRACTS = [
+    (1, 1000.0, '月付', '2025-01-10', '2025-12-09', '2025-03-09'),   # 已付到上期
+    (2, 1500.0, '季付', '2024-11-01', '2025-10-31', None),           # 从未交租：之前各期都是欠租
+    (3, 800.0, '半年付', '2025-01-31', '2026-01-30', '2025-07-30'),  # 31号交租，跨小月
+    (4, 900.0, '年付', '2025-06-01', None, None),                    # 无结束日期
+    (5, 1200.0, '季付', '2025-02-15', '2025-05-20', None),           # 最后一期不足整期
+    (6, 0.0, '月付', '2025-01-01', '2025-12-31', None),              # 零租金不计
+    (7, 700.0, '月付', 'bad-date', '2025-12-31', None),               # 日期无法解析
+]
+
+
+def reference(contracts, today, months=12):
+    """逐日推算：从首个交租日起每天检查是否为交租日（按 add_months 取周年日），到结束日期或预测期末为止"""
+    first = datetime.date(today.year, today.month, 1)
+    horizon = add_months(first, months)
+    amounts = [0.0] * months
+    counts = [0] * months
+    arrears = 0.0
+    arrears_count = 0
+    for _, rent, method, start, end, paid_until in contracts:
+        if not rent or rent <= 0:
+            continue
+        step = PAY_MONTHS.get(method, 1)
+        try:
+            anchor = datetime.date.fromisoformat(paid_until) + ONE_DAY if paid_until else datetime.date.fromisoformat(start)
+        except ValueError:
+            continue
+        end = datetime.date.fromisoformat(end) if end else None
+        k, due, day = 0, anchor, anchor
+        while day < horizon and (end is None or day <= end):
+            if day == due:
+                periods = step
+                if end:
+                    # 最后一期：只计结束日期之前的整月周年日
+                    periods = max(1, sum(1 for j in range(step) if add_months(anchor, k * step + j) <= end))
+                if day < today:
+                    arrears += rent * periods
+                    arrears_count += 1
+                else:
+                    index = (day.year - first.year) * 12 + day.month - first.month
+                    amounts[index] += rent * periods
+                    counts[index] += 1
+                k += 1
+                due = add_months(anchor, k * step)
+            day += ONE_DAY
+    labels = [f"{d.year}-{d.month:02d}" for d in (add_months(first, i) for i in range(months))]
+    return {'months': list(zip(labels, amounts, counts)), 'arrears': arrears, 'arrears_count': arrears_count}
+
+
+def test_fixture_matches_reference():
+    assert project(CONTRACTS, TODAY) == reference(CONTRACTS, TODAY)
+
+
+def test_fixture_values():
+    result = project(CONTRACTS, TODAY)
+    months = dict((label, (amount, count)) for label, amount, count in result['months'])
+    # 已逾期：合同1 的 3/10 一期，合同2 的 2024-11、2025-02 两期，合同5 的 2/15 一期
+    assert result['arrears'] == 1000.0 + 1500.0 * 3 * 2 + 1200.0 * 3
+    assert result['arrears_count'] == 4
+    # 合同5：5/15 一期到 5/20 结束，只计 1 个月
+    assert months['2025-05'] == (1500.0 * 3 + 1200.0 + 1000.0, 3)
+    # 合同4 无结束日期：年付整期
+    assert months['2025-06'] == (1000.0 + 900.0 * 12, 2)
+    # 合同3：7/31 起半年付，交租日在 7 月 31 日
+    assert months['2025-07'][1] == 2
+
+
+def test_random_contracts_match_reference():
+    rnd = random.Random(17)
+    base = datetime.date(2024, 1, 1)
+    for _ in range(300):
+        start = base + datetime.timedelta(days=rnd.randrange(900))
+        end = start + datetime.timedelta(days=rnd.randrange(1, 800)) if rnd.random() < 0.9 else None
+        paid = start + datetime.timedelta(days=rnd.randrange(-1, 300)) if rnd.random() < 0.6 else None
+        contracts = [(1, 1000.0, rnd.choice(list(PAY_MONTHS)), start.isoformat(),
+                      end and end.isoformat(), paid and paid.isoformat())]
+        today = datetime.date(2025, 1, 1) + datetime.timedelta(days=rnd.randrange(400))
+        assert project(contracts, today) == reference(contracts, today), contracts
@@ -0,0 +1,42 @@
+# test_queries.py
+"""执行计划检查：列表查询走索引，且排序由索引提供"""
+
+import db
+import queries
+
+
+def test_all_plans_ok(conn, user_id):
+    assert queries.check_query_plans(user_id) == {}
+
+
+def test_temp_sort_flagged_for_list_queries(conn, user_id):
+    # 按未建索引的列排序：只对列表/分页查询报告临时排序
+    plan = queries.explain("SELECT * FROM room WHERE user_id=? ORDER BY room_area", (user_id,))
+    assert queries.temp_sorts(plan) == ['USE TEMP B-TREE FOR ORDER BY']
+    assert queries.plan_problems('load_rooms', plan) == ['USE TEMP B-TREE FOR ORDER BY']
+    assert queries.plan_problems('payments/monthly', plan) == []
+
+
+def test_old_contract_list_flagged(conn, user_id):
+    # 旧的多列 GROUP BY 写法每页都整表排序
+    sql = """SELECT c.contract_id, GROUP_CONCAT(rt.renter_name, ', ')
+             FROM contract c LEFT JOIN renter rt ON c.renter_id = rt.renter_id
+             WHERE c.user_id=? GROUP BY c.contract_id, c.status ORDER BY c.contract_id"""
+    assert queries.plan_problems('load_contracts', queries.explain(sql, (user_id,)))
+
+
+def test_full_scan_flagged(conn):
+    plan = queries.explain("SELECT * FROM room WHERE room_area > 10")
+    assert queries.full_scans(plan) == ['SCAN room']
+
+
+def test_total_received_includes_terminated_contracts(conn, user_id):
+    # 到期后被推进为“已终止”的合同，已收租金仍计入累计租金收入
+    with db.transaction() as c:
+        for status in ('履行中', '已终止', '已结束'):
+            c.execute("INSERT INTO contract (user_id, start_date, end_date, rent, status) "
+                      "VALUES (?, '2024-01-01', '2024-12-31', 1000, ?)", (user_id, status))
+            c.execute("INSERT INTO payment (user_id, contract_id, period_start, period_end, amount, paid_date) "
+                      "VALUES (?, ?, '2024-01-01', '2024-01-31', 1000, '2024-01-01')", (user_id, c.lastrowid))
+    summary = conn.execute(queries.DASHBOARD_SUMMARY, (user_id,)).fetchone()
+    assert summary[2:] == (1, 1000, 3000)
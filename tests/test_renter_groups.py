@@ -0,0 +1,64 @@
+# test_renter_groups.py
+"""租客分组：沿关联向上找到主租客，成环时取环内最小 id"""
+
+import db
+from database import regroup_renters, assign_group_contract
+
+
+def _renters(user_id, count):
+    with db.transaction() as c:
+        c.executemany("INSERT INTO renter (user_id, renter_name) VALUES (?, ?)",
+                      [(user_id, f"租客{i}") for i in range(1, count + 1)])
+
+
+def _link(*pairs):
+    with db.transaction() as c:
+        c.executemany("INSERT INTO renter_link (renter_id, linked_renter_id) VALUES (?, ?)", pairs)
+
+
+def _groups(conn):
+    return dict(conn.execute("SELECT renter_id, group_id FROM renter"))
+
+
+def _regroup(renter_ids=None):
+    with db.transaction() as c:
+        return regroup_renters(c, renter_ids)
+
+
+def test_new_renter_is_own_group(conn, user_id):
+    _renters(user_id, 3)
+    assert _groups(conn) == {1: 1, 2: 2, 3: 3}
+    assert _regroup() == 0
+
+
+def test_chain_cycle_and_multiple_mains(conn, user_id):
+    _renters(user_id, 8)
+    # 3 -> 2 -> 1 链式关联；4 <-> 5 成环；6 同时关联 1 和 7；8 独立
+    _link((3, 2), (2, 1), (4, 5), (5, 4), (6, 1), (6, 7))
+    assert _regroup() == 4
+    assert _groups(conn) == {1: 1, 2: 1, 3: 1, 4: 4, 5: 4, 6: 1, 7: 7, 8: 8}
+    # 再算一次没有变化
+    assert _regroup() == 0
+
+
+def test_scoped_regroup_after_unlink(conn, user_id):
+    _renters(user_id, 5)
+    _link((2, 1), (3, 2), (5, 4))
+    _regroup()
+    assert _groups(conn) == {1: 1, 2: 1, 3: 1, 4: 4, 5: 4}
+    # 解除 2 -> 1：只重算 2 原来所在的组，2、3 成为新组，4、5 不受影响
+    with db.transaction() as c:
+        c.execute("DELETE FROM renter_link WHERE renter_id=2")
+        assert regroup_renters(c, [2]) == 2
+    assert _groups(conn) == {1: 1, 2: 2, 3: 2, 4: 4, 5: 4}
+
+
+def test_contract_assigned_to_whole_group(conn, user_id):
+    _renters(user_id, 4)
+    _link((2, 1), (3, 1))
+    _regroup()
+    with db.transaction() as c:
+        c.execute("INSERT INTO contract (user_id, renter_id, status) VALUES (?, 3, '履行中')", (user_id,))
+        assign_group_contract(c, 3, c.lastrowid)
+    assigned = dict(conn.execute("SELECT renter_id, contract_id FROM renter"))
+    assert assigned == {1: 1, 2: 1, 3: 1, 4: None}
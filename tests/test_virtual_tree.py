@@ -0,0 +1,56 @@
+# test_virtual_tree.py
+"""虚拟列表按页加载：加载失败的页可以重新请求，错误显示在行数标签上"""
+
+from collections import OrderedDict
+
+import virtual_tree
+from virtual_tree import VirtualTree
+
+
+class FakeLabel:
+    def __init__(self):
+        self.options = {}
+
+    def winfo_exists(self):
+        return True
+
+    def config(self, **options):
+        self.options.update(options)
+
+
+def _virtual_tree(total=1000, visible=10):
+    # 不创建 Tk 控件，只设置按页加载用到的属性
+    vt = VirtualTree.__new__(VirtualTree)
+    vt.page_sql, vt.params = "SELECT 1", (1,)
+    vt.total, vt.offset, vt.visible = total, 0, visible
+    vt._pages, vt._loading, vt._gen = OrderedDict(), set(), 0
+    vt.count_label = FakeLabel()
+    return vt
+
+
+def test_failed_page_can_be_retried(monkeypatch):
+    requests = []
+    monkeypatch.setattr(virtual_tree, 'run_async', lambda *args, **kw: requests.append(kw))
+    vt = _virtual_tree()
+    vt._request_pages(0, 10)
+    assert vt._loading == {0} and len(requests) == 1
+    # 加载中的页不重复请求
+    vt._request_pages(0, 10)
+    assert len(requests) == 1
+    # 失败后（即使期间刷新过）页移出加载中集合，错误显示在标签上
+    vt._gen += 1
+    requests[0]['on_error'](RuntimeError("database is locked"))
+    assert vt._loading == set()
+    assert "database is locked" in vt.count_label.options['text']
+    vt._request_pages(0, 10)
+    assert vt._loading == {0} and len(requests) == 2
+
+
+def test_refresh_error_reported(monkeypatch):
+    requests = []
+    monkeypatch.setattr(virtual_tree, 'run_async', lambda *args, **kw: requests.append(kw))
+    vt = _virtual_tree()
+    vt.count_sql = "SELECT 1"
+    vt.refresh()
+    requests[0]['on_error'](RuntimeError("no such table"))
+    assert "加载失败" in vt.count_label.options['text']
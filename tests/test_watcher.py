@@ -0,0 +1,84 @@
+# test_watcher.py
+"""外部修改检测：区分本进程写入和其他进程写入"""
+
+import sqlite3
+import threading
+
+import db
+import events
+from watcher import ChangeWatcher
+
+
+def _external_write(tag):
+    # 另一个连接（等同于其他进程）写入
+    other = sqlite3.connect(db.get_db_path())
+    other.execute("INSERT INTO user (user, password) VALUES (?, 'x')", (tag,))
+    other.commit()
+    other.close()
+
+
+def _background_write(tag):
+    def work():
+        with db.transaction() as c:
+            c.execute("INSERT INTO user (user, password) VALUES (?, 'x')", (tag,))
+    t = threading.Thread(target=work)
+    t.start()
+    t.join()
+
+
+def _local_write(tag):
+    with db.transaction() as c:
+        c.execute("INSERT INTO user (user, password) VALUES (?, 'x')", (tag,))
+
+
+def _watcher(conn):
+    watcher = ChangeWatcher(root=None)
+    watcher._rebase()
+    return watcher
+
+
+def test_external_write_detected(conn):
+    watcher = _watcher(conn)
+    assert watcher.check() is False
+    _external_write('a')
+    assert watcher.check() is True
+    assert watcher.check() is False
+
+
+def test_own_writes_ignored(conn):
+    watcher = _watcher(conn)
+    _local_write('a')
+    assert watcher.check() is False
+    _background_write('b')
+    assert watcher.check() is False
+
+
+def test_external_write_after_local_save(conn):
+    watcher = _watcher(conn)
+    _local_write('a')
+    assert watcher.check() is False
+    _external_write('b')
+    assert watcher.check() is True
+
+
+def test_external_write_after_background_save(conn):
+    watcher = _watcher(conn)
+    _background_write('a')
+    assert watcher.check() is False
+    _external_write('b')
+    assert watcher.check() is True
+
+
+def test_external_change_publishes_all_entities(conn):
+    watcher = _watcher(conn)
+    seen = []
+    token = events.subscribe(events.ENTITIES, seen.extend)
+    try:
+        _external_write('a')
+        serial = db.write_serial()
+        assert watcher.check() is True
+    finally:
+        events.unsubscribe(token)
+    assert {change.entity for change in seen} == set(events.ENTITIES)
+    # 缓存按写入序号失效
+    assert db.write_serial() > serial
@@ -0,0 +1,141 @@
+# test_widgets.py
+"""TreeSync 行同步：用记录调用的假 Treeview 检查增删改和移动的顺序"""
+
+import widgets
+from widgets import TreeSync, cancel_chunked
+
+
+class FakeTree:
+    """只实现 TreeSync 用到的 Treeview 接口，after 回调由 run_after 手动执行"""
+
+    def __init__(self, name='.page.tree', height=2):
+        self.name = name
+        self.height = height
+        self.items = []
+        self.values = {}
+        self.calls = []
+        self.afters = {}
+        self.alive = True
+
+    def __str__(self):
+        return self.name
+
+    def cget(self, option):
+        return str(self.height)
+
+    def winfo_exists(self):
+        return self.alive
+
+    def insert(self, parent, index, iid, values, tags):
+        assert iid not in self.values
+        self.items.insert(len(self.items) if index == 'end' else index, iid)
+        self.values[iid] = (values, tags)
+        self.calls.append(('insert', iid, index))
+
+    def move(self, iid, parent, index):
+        self.items.remove(iid)
+        self.items.insert(index, iid)
+        self.calls.append(('move', iid, index))
+
+    def item(self, iid, values, tags):
+        self.values[iid] = (values, tags)
+        self.calls.append(('item', iid))
+
+    def delete(self, *iids):
+        for iid in iids:
+            self.items.remove(iid)
+            del self.values[iid]
+        self.calls.append(('delete',) + iids)
+
+    def get_children(self):
+        return tuple(self.items)
+
+    def after(self, ms, fn, *args):
+        after_id = len(self.calls) + len(self.afters) + 1000
+        self.afters[after_id] = (fn, args)
+        return after_id
+
+    def after_cancel(self, after_id):
+        self.afters.pop(after_id, None)
+
+    def run_after(self):
+        while self.afters:
+            fn, args = self.afters.pop(min(self.afters))
+            fn(*args)
+
+
+def _rows(*ids, value='v'):
+    return [(i, (i, value), ()) for i in ids]
+
+
+def _consistent(tree, sync):
+    assert sync.order == tree.items
+    assert set(sync.rows) == set(tree.items)
+    assert all(sync.rows[iid] == tree.values[iid] for iid in tree.items)
+
+
+def test_sync_diff_steps():
+    tree = FakeTree()
+    sync = TreeSync(tree)
+    assert sync.sync(_rows(1, 2, 3)) == (3, 0, 0)
+    assert tree.calls == [('insert', '1', 0), ('insert', '2', 1), ('insert', '3', 2)]
+    tree.calls.clear()
+    # 删除先于插入；未变化的行不动；顺序变化用 move；值变化用 item
+    rows = [(3, (3, 'v'), ()), (4, (4, 'v'), ()), (1, (1, 'new'), ('tag',))]
+    assert sync.sync(rows) == (1, 1, 1)
+    assert tree.calls == [('delete', '2'), ('move', '3', 0), ('insert', '4', 1), ('item', '1')]
+    assert tree.items == ['3', '4', '1']
+    _consistent(tree, sync)
+    tree.calls.clear()
+    assert sync.sync(rows) == (0, 0, 0)
+    assert tree.calls == []
+
+
+def test_chunked_first_screen_and_progress():
+    tree = FakeTree(height=5)
+    sync = TreeSync(tree)
+    progress = []
+    sync.sync_chunked(_rows(*range(50)), on_progress=lambda done, total: progress.append((done, total)),
+                      budget_ms=0)
+    # 第一批同步完成且至少一屏
+    assert tree.items == [str(i) for i in range(5)]
+    assert sync.pending() and progress == [(5, 50)]
+    tree.run_after()
+    assert tree.items == [str(i) for i in range(50)]
+    assert not sync.pending() and progress[-1] == (50, 50)
+    _consistent(tree, sync)
+
+
+def test_chunked_stale_rows_deleted_at_end():
+    tree = FakeTree(height=1)
+    sync = TreeSync(tree)
+    sync.sync(_rows(1, 2, 3, 4))
+    tree.calls.clear()
+    sync.sync_chunked(_rows(4, 5, 2), budget_ms=0)
+    tree.run_after()
+    assert tree.items == ['4', '5', '2']
+    assert tree.calls[-1] == ('delete', '1', '3')
+    _consistent(tree, sync)
+
+
+def test_chunked_superseded_and_cancelled():
+    tree = FakeTree(height=1)
+    sync = TreeSync(tree)
+    sync.sync_chunked(_rows(*range(10)), budget_ms=0)
+    # 新的同步替代未完成的：状态始终与列表一致
+    sync.sync_chunked(_rows(*range(20, 5, -1)), budget_ms=0)
+    _consistent(tree, sync)
+    tree.run_after()
+    assert tree.items == [str(i) for i in range(20, 5, -1)]
+    _consistent(tree, sync)
+    # 离开页面：按容器取消
+    sync.sync_chunked(_rows(*range(30)), budget_ms=0)
+    assert cancel_chunked('.other') is False
+    assert cancel_chunked('.page') is True
+    assert not sync.pending() and not tree.afters
+    _consistent(tree, sync)
+    # 控件已销毁：下一批直接放弃
+    sync.sync_chunked(_rows(*range(40)), budget_ms=0)
+    tree.alive = False
+    tree.run_after()
+    assert not sync.pending() and sync not in widgets._chunked
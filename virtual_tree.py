@@ -0,0 +1,265 @@
+# virtual_tree.py
+"""虚拟列表组件 - 按页查询、只渲染可见行的 Treeview，数据量再大刷新也不卡"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from tkinter import ttk
+from collections import OrderedDict
+from config import COLORS
+from db import get_conn
+from widgets import is_alive, TreeSync
+from worker import run_async, fetch_all
+
+
+def _query_window(count_sql, page_sql, params, limit, offset):
+    """后台线程：查询总行数和一页数据"""
+    c = get_conn().cursor()
+    total = c.execute(count_sql, params).fetchone()[0]
+    rows = c.execute(page_sql, params + (limit, offset)).fetchall()
+    return total, rows
+
+
+class VirtualTree(tk.Frame):
+    """虚拟列表
+
+    count_sql 查询总行数，page_sql 为带 ORDER BY 的列表查询（末尾自动追加 LIMIT ? OFFSET ?），
+    两条 SQL 共用参数 params。Treeview 中只保留当前可见的行，行的 iid 为第一列（主键）；
+    滚动时从页缓存取数据重新填充，缺页在后台线程加载，缓存页数有上限，内存占用与总行数无关。
+    format_row(row) 返回 (values, tags)，默认原样显示。
+    position_sql（参数 params + (主键,)）返回某行在列表中的序号，供 reveal() 定位。
+    """
+
+    PAGE_SIZE = 200
+    MAX_PAGES = 8
+    WHEEL_ROWS = 3
+
+    def __init__(self, master, columns, count_sql, page_sql, params=(), format_row=None, height=18,
+                 position_sql=None):
+        super().__init__(master, bg=COLORS['bg'])
+        self.count_sql = count_sql
+        self.position_sql = position_sql
+        self.page_sql = page_sql.rstrip() + "\nLIMIT ? OFFSET ?"
+        self.params = tuple(params)
+        self.format_row = format_row or (lambda row: (row, ()))
+        self.total = 0
+        self.offset = 0
+        self.visible = height
+        self._pages = OrderedDict()   # 页号 -> 行列表（LRU）
+        self._loading = set()
+        self._gen = 0                 # 每次 refresh 递增，丢弃旧数据的回调
+        self._selected = set()        # 用户选中的主键（滚出可见区后再滚回来仍保持选中）
+
+        body = tk.Frame(self, bg=COLORS['bg'])
+        body.pack(fill='both', expand=True)
+        self.tree = ttk.Treeview(body, columns=columns, show="headings", height=height,
+                                 yscrollcommand=self._on_tree_yview)
+        self.scrollbar = ttk.Scrollbar(body, orient='vertical', command=self._on_scrollbar)
+        self.scrollbar.pack(side='right', fill='y')
+        self.tree.pack(side='left', fill='both', expand=True)
+        self.tree.tag_configure('loading', foreground='#AAAAAA')
+        self.rows = TreeSync(self.tree)
+
+        self.count_label = tk.Label(self, text="", bg=COLORS['bg'], fg="#888",
+                                    font=('Microsoft YaHei UI', 9))
+        self.count_label.pack(anchor='e')
+
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", self._on_wheel)
+        self.tree.bind("<Button-5>", self._on_wheel)
+        self.tree.bind("<Up>", lambda e: self._on_arrow(-1))
+        self.tree.bind("<Down>", lambda e: self._on_arrow(1))
+        self.tree.bind("<Prior>", lambda e: self._on_page_key(-1))
+        self.tree.bind("<Next>", lambda e: self._on_page_key(1))
+        self.tree.bind("<ButtonRelease-1>", self._remember_selection, add='+')
+        self.tree.bind("<KeyRelease>", self._remember_selection, add='+')
+
+    # ------------------- 数据加载 -------------------
+    def refresh(self, params=None):
+        """重新查询总数和当前位置的数据（保持滚动位置和选中项）"""
+        if params is not None:
+            self.params = tuple(params)
+        self._gen += 1
+        self._loading.clear()
+        gen = self._gen
+        page = self.offset // self.PAGE_SIZE
+        run_async(_query_window, self.count_sql, self.page_sql, self.params,
+                  self.PAGE_SIZE, page * self.PAGE_SIZE,
+                  on_done=lambda result: self._on_refreshed(gen, page, result),
+                  on_error=self._on_load_error, key=(self, 'refresh'))
+
+    def _on_refreshed(self, gen, page, result):
+        if gen != self._gen:
+            return
+        self.total, rows = result
+        # 旧缓存在新数据到达后才替换，刷新期间界面不会闪成空白
+        self._pages = OrderedDict({page: rows})
+        self.scroll_to(self.offset, force=True)
+
+    def _request_pages(self, first, last):
+        """加载 [first, last) 行所在的页（前后各多预取一屏）"""
+        first = max(0, first - self.visible)
+        last = min(self.total, last + self.visible)
+        if last <= first:
+            return
+        for page in range(first // self.PAGE_SIZE, (last - 1) // self.PAGE_SIZE + 1):
+            if page in self._pages:
+                self._pages.move_to_end(page)
+            elif page not in self._loading:
+                self._loading.add(page)
+                gen = self._gen
+                run_async(fetch_all, self.page_sql,
+                          self.params + (self.PAGE_SIZE, page * self.PAGE_SIZE),
+                          on_done=lambda rows, p=page: self._on_page_loaded(gen, p, rows),
+                          on_error=lambda e, p=page: self._on_load_error(e, p), key=(self, page))
+
+    def _on_page_loaded(self, gen, page, rows):
+        if gen != self._gen:
+            return
+        self._loading.discard(page)
+        self._pages[page] = rows
+        while len(self._pages) > self.MAX_PAGES:
+            self._pages.popitem(last=False)
+        start = page * self.PAGE_SIZE
+        if start < self.offset + self.visible and self.offset < start + len(rows):
+            self._render()
+
+    def _on_load_error(self, e, page=None):
+        """查询失败：该页移出加载中集合（再次滚动到这里或刷新时重新加载），在行数标签上显示错误"""
+        if page is not None:
+            self._loading.discard(page)
+        if is_alive(self.count_label):
+            self.count_label.config(text=f"加载失败：{e}（滚动或刷新后重试）", fg='#D32F2F')
+
+    def _row(self, index):
+        rows = self._pages.get(index // self.PAGE_SIZE)
+        i = index % self.PAGE_SIZE
+        if rows is None or i >= len(rows):
+            return None
+        return rows[i]
+
+    # ------------------- 渲染 -------------------
+    def scroll_to(self, offset, force=False):
+        """滚动到第 offset 行（从0开始）"""
+        offset = max(0, min(offset, self.total - self.visible))
+        if offset != self.offset or force:
+            self.offset = offset
+            self._render()
+
+    def _render(self):
+        if not is_alive(self.tree):
+            return
+        first = self.offset
+        last = min(self.total, first + self.visible)
+        window = []
+        seen = set()
+        for index in range(first, last):
+            row = self._row(index)
+            if row is None:
+                window.append((f"loading-{index}", ("…",), ('loading',)))
+                continue
+            values, tags = self.format_row(row)
+            iid = str(row[0])
+            if iid in seen:
+                iid = f"dup-{index}"
+            seen.add(iid)
+            window.append((iid, values, tags))
+        # 只增删改有变化的行：滚动一行只涉及一进一出，编辑后刷新只更新改动的行
+        self.rows.sync(window)
+        shown = [i for i in self.rows.order if i in self._selected]
+        if shown and set(shown) != set(self.tree.selection()):
+            self.tree.selection_set(shown)
+        if self.total:
+            self.scrollbar.set(first / self.total, last / self.total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.count_label.config(text=f"共 {self.total} 条", fg="#888")
+        self._request_pages(first, last)
+
+    def select_key(self, key):
+        """选中主键为 key 的行（需在可见区内）"""
+        iid = str(key)
+        self._selected = {iid}
+        if self.tree.exists(iid):
+            self.tree.selection_set(iid)
+            self.tree.focus(iid)
+
+    def reveal(self, key):
+        """滚动到主键为 key 的行并选中（位置在后台查询）"""
+        if not self.position_sql:
+            return
+        self._selected = {str(key)}
+
+        def done(rows):
+            if not rows or rows[0][0] is None or not is_alive(self.tree):
+                return
+            self.scroll_to(rows[0][0] - self.visible // 2, force=True)
+            self.select_key(key)
+
+        run_async(fetch_all, self.position_sql, self.params + (key,),
+                  on_done=done, key=(self, 'reveal'))
+
+    def _remember_selection(self, event=None):
+        sel = [i for i in self.tree.selection() if not i.startswith('loading-')]
+        if len(sel) != len(self.tree.selection()):
+            self.tree.selection_set(sel)
+        self._selected = set(sel)
+
+    # ------------------- 滚动事件 -------------------
+    def _on_scrollbar(self, *args):
+        if args[0] == 'moveto':
+            self.scroll_to(int(float(args[1]) * self.total))
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            self.scroll_to(self.offset + int(args[1]) * step)
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.scroll_to(self.offset + (-self.WHEEL_ROWS if up else self.WHEEL_ROWS))
+        return "break"
+
+    def _on_arrow(self, step):
+        items = self.tree.get_children()
+        if not items:
+            return None
+        focus = self.tree.focus()
+        index = items.index(focus) if focus in items else -1
+        if 0 <= index + step < len(items):
+            return None  # 可见区内移动交给 Treeview 默认处理
+        self.scroll_to(self.offset + step)
+        items = self.tree.get_children()
+        if items:
+            item = items[0] if step < 0 else items[-1]
+            self.tree.selection_set(item)
+            self.tree.focus(item)
+            self._remember_selection()
+        return "break"
+
+    def _on_page_key(self, step):
+        self.scroll_to(self.offset + step * self.visible)
+        return "break"
+
+    def _on_resize(self, event):
+        rowheight = ttk.Style().lookup('Treeview', 'rowheight')
+        try:
+            rowheight = int(rowheight)
+        except (TypeError, ValueError):
+            rowheight = tkfont.nametofont('TkDefaultFont').metrics('linespace') + 2
+        visible = max(1, (event.height - rowheight - 4) // rowheight)
+        if visible != self.visible:
+            self.visible = visible
+            self.scroll_to(self.offset, force=True)
+
+    def _on_tree_yview(self, first, last):
+        # 行数估算偏大时，Treeview 会因焦点移到被遮挡的行而自行滚动；
+        # 这里收回内部滚动并换算成虚拟列表的偏移，同时把可见行数校正为实际值
+        items = self.tree.get_children()
+        first, last = float(first), float(last)
+        if not items or (first <= 0 and last >= 1):
+            return
+        shift = round(first * len(items))
+        fits = max(1, int(last * len(items) + 1e-6) - shift)
+        self.tree.yview_moveto(0)
+        if fits < self.visible or shift:
+            self.visible = min(self.visible, fits)
+            self.after_idle(lambda: self.scroll_to(self.offset + shift, force=True))
@@ -0,0 +1,77 @@
+# watcher.py
+"""外部修改检测 - 多人同时打开同一个 landlord.db 时，发现其他进程的写入后通知当前页面和仪表盘刷新
+
+每隔 DATA_POLL_MS 在 Tk 主线程执行一次 PRAGMA data_version（只读连接头，几微秒，不加锁）。
+data_version 只在“其他连接”提交后变化：主线程自己的写入不会触发；本进程数据库线程（及其他后台线程）的提交
+由 db.background_commits() 计数，计数有变化的一轮据此跳过（这些写入已各自发布变更事件）。
+同一轮内本进程后台线程和其他进程都有写入时，按本进程写入处理。
+"""
+
+import sqlite3
+
+from config import DATA_POLL_MS
+import db
+import events
+
+
+class ChangeWatcher:
+    """定时检查数据库是否被其他进程修改"""
+
+    def __init__(self, root, interval_ms=DATA_POLL_MS):
+        self.root = root
+        self.interval_ms = interval_ms
+        self._after_id = None
+        self._conn = None
+        self._cursor = None
+        self._version = None
+        self._commits = None
+
+    def start(self):
+        """开始轮询（间隔为 0 时不启动）"""
+        if self.interval_ms and self._after_id is None:
+            self._rebase()
+            self._after_id = self.root.after(self.interval_ms, self._poll)
+
+    def stop(self):
+        if self._after_id is not None:
+            try:
+                self.root.after_cancel(self._after_id)
+            except Exception:
+                pass
+            self._after_id = None
+
+    def _rebase(self):
+        """以当前连接和版本为基准（连接重建后 data_version 从头计数）"""
+        self._conn = db.get_conn()
+        # 基类游标：开启查询计时时不把每次轮询记进统计
+        self._cursor = sqlite3.Cursor(self._conn)
+        self._version = self._cursor.execute("PRAGMA data_version").fetchone()[0]
+        self._commits = db.background_commits()
+
+    def check(self):
+        """检查一次，发现外部写入时返回 True 并通知刷新"""
+        if db.get_conn() is not self._conn:
+            self._rebase()
+            return False
+        version = self._cursor.execute("PRAGMA data_version").fetchone()[0]
+        # 每轮都以当前后台提交计数为基准，之前轮次的计数变化不会被算到之后的外部写入头上
+        commits, self._commits = self._commits, db.background_commits()
+        if version == self._version:
+            return False
+        self._version = version
+        if commits != self._commits:
+            return False
+        # 其他进程改了什么不得而知：让缓存失效，按全部实体批量变更通知（可见页面刷新，隐藏页面标记待刷新）
+        db.note_external_change()
+        for entity in events.ENTITIES:
+            events.publish(entity, None, events.UPDATE)
+        return True
+
+    def _poll(self):
+        self._after_id = None
+        try:
+            self.check()
+        except sqlite3.Error:
+            # 数据库暂时不可用（被锁、正在切换文件）时下次再查
+            self._conn = None
+        self._after_id = self.root.after(self.interval_ms, self._poll)
@@ -1,8 +1,181 @@
 # widgets.py
 """自定义组件模块 - 包含WeChat风格的按钮组件"""
 
+import time
 import tkinter as tk
-from config import COLORS
+from config import COLORS, RENDER_CHUNK_MS
+
+# 正在分批插入的同步器（切换页面时按容器取消）
+_chunked = set()
+
+def is_alive(widget):
+    """控件是否仍然存在（后台查询返回时页面可能已被切换销毁）"""
+    try:
+        return widget is not None and bool(widget.winfo_exists())
+    except tk.TclError:
+        return False
+
+def cancel_chunked(container):
+    """取消 container 内所有列表的分批插入（离开页面时），返回是否有被取消的"""
+    prefix = str(container) + '.'
+    cancelled = False
+    for rows in list(_chunked):
+        if str(rows.tree).startswith(prefix):
+            cancelled = rows.cancel() or cancelled
+    return cancelled
+
+def progress_reporter(label):
+    """分批插入的进度显示在 label 上，全部完成后清空"""
+    def report(done, total):
+        if not is_alive(label):
+            return
+        if done == total:
+            label.config(text="")
+        elif total:
+            label.config(text=f"正在加载 {done}/{total} 行…")
+        else:
+            label.config(text=f"正在加载 {done} 行…")
+    return report
+
+class TreeSync:
+    """Treeview 行同步器 - 以主键为 iid 维护 id→行 映射，刷新时只增删改有变化的行
+
+    未变化的行保持原样，因此选中项、焦点和滚动位置都不受刷新影响。
+    同步器接管的 Treeview 不应再被直接 insert/delete，否则需先 clear()。
+    """
+    def __init__(self, tree):
+        self.tree = tree
+        self.rows = {}    # iid -> (values, tags)
+        self.order = []   # 当前显示顺序
+        self._job = None  # 分批插入的 (生成器, after id)
+
+    def sync(self, rows):
+        """rows: 按显示顺序的 [(iid, values, tags)]，返回 (新增, 修改, 删除) 行数"""
+        self.cancel()
+        rows = [(str(iid), tuple(values), tuple(tags)) for iid, values, tags in rows]
+        new_ids = {iid for iid, _, _ in rows}
+        removed = [iid for iid in self.order if iid not in new_ids]
+        if removed:
+            self.tree.delete(*removed)
+        cur = [iid for iid in self.order if iid in new_ids]
+        inserted = updated = 0
+        new_rows = {}
+        for index, (iid, values, tags) in enumerate(rows):
+            old = self.rows.get(iid)
+            if old is None:
+                self.tree.insert("", index, iid=iid, values=values, tags=tags)
+                cur.insert(index, iid)
+                inserted += 1
+            else:
+                if cur[index] != iid:
+                    self.tree.move(iid, "", index)
+                    cur.remove(iid)
+                    cur.insert(index, iid)
+                if old != (values, tags):
+                    self.tree.item(iid, values=values, tags=tags)
+                    updated += 1
+            new_rows[iid] = (values, tags)
+        self.rows = new_rows
+        self.order = cur
+        return inserted, updated, len(removed)
+
+    def sync_chunked(self, rows, on_progress=None, total=None, budget_ms=RENDER_CHUNK_MS):
+        """分批同步：每批最多占用主线程 budget_ms 毫秒，其余行通过 after 在后续空闲时插入
+
+        rows 可以是生成器（边格式化边插入，此时可用 total 给出总行数）。第一批同步完成且至少填满一屏，
+        再次同步、cancel() 或控件销毁时未完成的部分直接放弃；已处理的行和映射始终一致。
+        on_progress(已处理行数, 总行数或 None)，全部完成时 done 为 True 再调用一次：on_progress(n, n)。
+        """
+        self.cancel()
+        if total is None and hasattr(rows, '__len__'):
+            total = len(rows)
+        steps = self._steps(rows)
+        try:
+            first = int(self.tree.cget('height'))
+        except (tk.TclError, ValueError):
+            first = 0
+        self._job = (steps, None)
+        _chunked.add(self)
+        self._run_chunk(steps, total, on_progress, budget_ms, first)
+
+    def _run_chunk(self, steps, total, on_progress, budget_ms, min_rows=0):
+        if self._job is None or self._job[0] is not steps:
+            return
+        if not is_alive(self.tree):
+            self.cancel()
+            return
+        deadline = time.perf_counter() + budget_ms / 1000
+        done = 0
+        for done in steps:
+            if done >= min_rows and time.perf_counter() >= deadline:
+                break
+        else:
+            self._job = None
+            _chunked.discard(self)
+            if on_progress:
+                on_progress(len(self.order), len(self.order))
+            return
+        if on_progress:
+            on_progress(done, total)
+        after_id = self.tree.after(1, self._run_chunk, steps, total, on_progress, budget_ms)
+        self._job = (steps, after_id)
+
+    def _steps(self, rows):
+        """逐行同步的生成器，每处理一行产出已处理行数；旧行中不再出现的最后统一删除"""
+        seen = set()
+        cur = self.order
+        index = 0
+        for iid, values, tags in rows:
+            iid, values, tags = str(iid), tuple(values), tuple(tags)
+            if iid in seen:
+                continue
+            seen.add(iid)
+            old = self.rows.get(iid)
+            if old is None:
+                self.tree.insert("", index, iid=iid, values=values, tags=tags)
+                cur.insert(index, iid)
+            else:
+                if cur[index] != iid:
+                    self.tree.move(iid, "", index)
+                    cur.remove(iid)
+                    cur.insert(index, iid)
+                if old != (values, tags):
+                    self.tree.item(iid, values=values, tags=tags)
+            self.rows[iid] = (values, tags)
+            index += 1
+            yield index
+        removed = cur[index:]
+        if removed:
+            self.tree.delete(*removed)
+            del cur[index:]
+            for iid in removed:
+                del self.rows[iid]
+
+    def pending(self):
+        """是否还有未插入完的行"""
+        return self._job is not None
+
+    def cancel(self):
+        """放弃尚未插入的行，返回是否确有被放弃的工作"""
+        job, self._job = self._job, None
+        _chunked.discard(self)
+        if job is None:
+            return False
+        steps, after_id = job
+        if after_id is not None:
+            try:
+                self.tree.after_cancel(after_id)
+            except tk.TclError:
+                pass
+        steps.close()
+        return True
+
+    def clear(self):
+        """清空列表和映射"""
+        self.cancel()
+        self.tree.delete(*self.tree.get_children())
+        self.rows = {}
+        self.order = []
 
 class WeChatButton(tk.Button):
     """微信风格按钮"""
@@ -0,0 +1,159 @@
+# worker.py
+"""后台数据库线程 - 查询在独立线程执行，结果通过 root.after 回到 Tk 主线程"""
+
+import queue
+import threading
+import traceback
+
+from db import get_conn
+import querylog
+import events
+
+
+class DBExecutor:
+    """单线程数据库执行器
+
+    请求按提交顺序在工作线程中执行（先提交的写入对后提交的读取可见），
+    回调总是在 Tk 主线程中调用。提交时传入 key 的请求，只有同一 key 下最新一次的结果会被回调，
+    旧的结果直接丢弃，因此连续多次刷新同一列表时不会出现旧数据覆盖新数据。
+    """
+
+    POLL_MS = 15
+
+    def __init__(self):
+        self.root = None
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = None
+        self._pending = 0
+        self._seq = 0
+        self._latest = {}
+        self._polling = False
+        self._busy_listeners = []
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, root):
+        """绑定 Tk 根窗口并启动工作线程"""
+        self.root = root
+        if not self.running:
+            self._thread = threading.Thread(target=self._work, name="db-worker", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止工作线程（未执行的请求会被丢弃）"""
+        if self.running:
+            self._requests.put(None)
+            self._thread.join(timeout=2)
+        self._thread = None
+        self.root = None
+
+    def add_busy_listener(self, fn):
+        """注册忙碌状态监听 fn(busy)，在主线程中调用"""
+        self._busy_listeners.append(fn)
+
+    def remove_busy_listener(self, fn):
+        if fn in self._busy_listeners:
+            self._busy_listeners.remove(fn)
+
+    def submit(self, fn, *args, on_done=None, on_error=None, key=None):
+        """提交请求：fn(*args) 在工作线程执行，on_done(result)/on_error(exc) 在主线程执行"""
+        self._seq += 1
+        seq = self._seq
+        if key is not None:
+            self._latest[key] = seq
+        self._set_pending(self._pending + 1)
+        # 开启查询计时时记下提交位置，后台线程执行的查询归到提交它的页面方法
+        origin = querylog.caller() if querylog.enabled() else None
+        self._requests.put((seq, key, fn, args, on_done, on_error, origin))
+        self._schedule_poll()
+        return seq
+
+    def _work(self):
+        while True:
+            item = self._requests.get()
+            if item is None:
+                break
+            seq, key, fn, args, on_done, on_error, origin = item
+            if key is not None and self._latest.get(key) != seq:
+                # 已有更新的同类请求排队，跳过这次查询
+                self._results.put((seq, key, None, None, None, None))
+                continue
+            try:
+                if origin is None:
+                    result = fn(*args)
+                else:
+                    with querylog.origin(origin):
+                        result = fn(*args)
+                self._results.put((seq, key, on_done, result, None, None))
+            except Exception as e:
+                get_conn().rollback()
+                self._results.put((seq, key, None, None, on_error, e))
+
+    def _schedule_poll(self):
+        if not self._polling and self.root is not None:
+            self._polling = True
+            self.root.after(self.POLL_MS, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        while True:
+            try:
+                seq, key, on_done, result, on_error, exc = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._set_pending(self._pending - 1)
+            if key is not None:
+                if self._latest.get(key) != seq:
+                    continue
+                del self._latest[key]
+            try:
+                if exc is not None:
+                    if on_error:
+                        on_error(exc)
+                    else:
+                        traceback.print_exception(type(exc), exc, exc.__traceback__)
+                elif on_done:
+                    on_done(result)
+            except Exception:
+                traceback.print_exc()
+        # 后台线程中发布的数据变更在这里回到主线程合并通知
+        events.bus.schedule()
+        if self._pending:
+            self._schedule_poll()
+
+    def _set_pending(self, n):
+        was_busy = self._pending > 0
+        self._pending = n
+        if was_busy != (n > 0):
+            for fn in list(self._busy_listeners):
+                fn(n > 0)
+
+
+executor = DBExecutor()
+
+
+def run_async(fn, *args, on_done=None, on_error=None, key=None):
+    """在后台线程执行 fn；执行器未启动时（例如命令行工具）直接同步执行"""
+    if executor.running:
+        return executor.submit(fn, *args, on_done=on_done, on_error=on_error, key=key)
+    try:
+        result = fn(*args)
+    except Exception as e:
+        get_conn().rollback()
+        if on_error:
+            on_error(e)
+            return None
+        raise
+    if on_done:
+        on_done(result)
+    return None
+
+
+def fetch_all(sql, params=()):
+    """在当前线程的连接上执行查询并返回全部结果"""
+    c = get_conn().cursor()
+    c.execute(sql, params)
+    return c.fetchall()